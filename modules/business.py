@@ -3,6 +3,11 @@
 
 # In[ ]:
 
+import numpy as np
+import pandas as pd
+
+from modules.rules import load_rules
+
 
 def unit_economics(arpu, cac, churn, gross_margin):
     """
@@ -26,83 +31,114 @@ def unit_economics(arpu, cac, churn, gross_margin):
 
 
 def assess_unit_economics(ue):
-    ltv_cac = ue["LTV/CAC"]
-    payback = ue["Payback (tháng)"]
-    gross_margin = ue["Gross Margin"]
-    churn = ue["Churn"]
-
-    if (
-        ltv_cac >= 3
-        and payback <= 12
-        and gross_margin >= 0.5
-        and churn <= 0.08
-    ):
-        assessment = "✅ RẤT KHẢ THI"
-        color = "success"
-
-    elif (
-        ltv_cac >= 2
-        and payback <= 18
-        and gross_margin >= 0.3
-        and churn <= 0.15
-    ):
-        assessment = "⚠ CHẤP NHẬN ĐƯỢC (Early-stage)"
-        color = "warning"
-
-    else:
-        assessment = "❌ RỦI RO CAO"
-        color = "error"
-
+    # Ngưỡng & thông điệp nằm trong bảng quy tắc modules/rules.py (ruleset "ue_assessment")
+    _, assessment, color = load_rules("ue_assessment").apply(ue)[0]
     return assessment, color
 
+
+# Gợi ý theo từng nhóm chỉ số: mã -> thông điệp (ruleset "ue_recommendations")
+RECOMMENDATION_MESSAGES = {
+    group: load_rules("ue_recommendations").messages(group)
+    for group in load_rules("ue_recommendations").groups
+}
+
+
 def unit_economics_recommendations(ue):
-    suggestions = []
-
-    ltv_cac = ue["LTV/CAC"]
-    payback = ue["Payback (tháng)"]
-    churn = ue["Churn"]
-    gross_margin = ue["Gross Margin"]
-    net_profit = ue["Net Unit Profit"]
-
-    # 1. LTV / CAC
-    if ltv_cac < 1:
-        suggestions.append("🚨 Mô hình đang đốt tiền trên mỗi khách hàng (LTV < CAC). Cần dừng scale và tái cấu trúc ngay.")
-    elif ltv_cac < 3:
-        suggestions.append("⚠️ LTV/CAC thấp. Ưu tiên **giảm CAC** (kênh acquisition, tối ưu funnel) trước khi scale.")
-    else:
-        suggestions.append("✅ LTV/CAC tốt. Có thể xem xét **tăng ngân sách marketing để scale**.")
-
-    # 2. Payback Period
-    if payback > 12:
-        suggestions.append("⏳ Thời gian hoàn vốn CAC dài (>12 tháng). Rủi ro dòng tiền cao → cần cải thiện retention hoặc pricing.")
-    elif payback > 6:
-        suggestions.append("⚠️ Payback ở mức trung bình. Theo dõi chặt dòng tiền khi mở rộng.")
-    else:
-        suggestions.append("⚡ Hoàn vốn CAC nhanh → phù hợp tăng trưởng nhanh.")
-
-    # 3. Churn
-    if churn > 0.1:
-        suggestions.append("🔥 Churn cao. Cần tập trung vào **product-market fit**, onboarding và customer success.")
-    elif churn > 0.05:
-        suggestions.append("⚠️ Churn trung bình. Có thể cải thiện bằng loyalty, subscription hoặc upsell.")
-    else:
-        suggestions.append("💎 Churn thấp. Lợi thế lớn để tăng LTV dài hạn.")
-
-    # 4. Gross Margin
-    if gross_margin < 0.4:
-        suggestions.append("📉 Biên lợi nhuận thấp. Cần tối ưu chi phí biến đổi hoặc tăng giá trị sản phẩm.")
-    elif gross_margin < 0.6:
-        suggestions.append("⚠️ Biên lợi nhuận ổn nhưng chưa mạnh. Tăng hiệu quả vận hành & tự động hóa.")
-    else:
-        suggestions.append("🏆 Biên lợi nhuận cao. Phù hợp mô hình scale bằng vốn.")
-
-    # 5. Net unit profit
-    if net_profit < 0:
-        suggestions.append("❌ Lợi nhuận đơn vị âm. Tuyệt đối không scale cho tới khi sửa được economics.")
-    else:
-        suggestions.append("💰 Mỗi khách hàng tạo lợi nhuận ròng. Có thể mở rộng quy mô có kiểm soát.")
-
-    return suggestions
+    # Mỗi nhóm (LTV/CAC, Payback, Churn, Gross Margin, Net Unit Profit) cho đúng một gợi ý
+    return [message for _, message, _ in load_rules("ue_recommendations").apply(ue)]
+
+
+# --------------------
+# BATCH (bảng phân khúc x kênh)
+# --------------------
+UE_INPUTS = ("arpu", "cac", "churn", "gross_margin")
+# Thứ tự tăng dần: RỦI RO CAO < CHẤP NHẬN ĐƯỢC < RẤT KHẢ THI
+ASSESSMENT_TIERS = tuple(reversed(load_rules("ue_assessment").messages().values()))
+
+
+def _round(values, digits):
+    # np.round nhân với 10**digits nên có thể lệch round() của Python ở giá trị sát .5
+    # -> các giá trị sát nửa đơn vị được làm tròn lại bằng round()
+    result = np.round(values, digits)
+    with np.errstate(invalid="ignore"):
+        scaled = values * 10.0 ** digits
+        near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        result[near_tie] = [round(v, digits) for v in values[near_tie].tolist()]
+    return result
+
+
+def unit_economics_frame(data=None, **columns):
+    """
+    Bản theo bảng của unit_economics: mỗi dòng một hồ sơ khách hàng
+    (vd. phân khúc x kênh x tháng). Đầu vào là DataFrame có cột arpu, cac, churn,
+    gross_margin và/hoặc mảng truyền theo tên; các cột khác của DataFrame
+    (Segment, Channel...) được giữ lại ở đầu kết quả.
+    Cột chỉ số trùng tên và cách làm tròn với unit_economics.
+    """
+    if data is not None:
+        columns = {**{name: data[name] for name in UE_INPUTS if name in data}, **columns}
+    missing = [name for name in UE_INPUTS if name not in columns]
+    if missing:
+        raise ValueError(f"Thiếu cột: {missing}")
+
+    values = []
+    for name in UE_INPUTS:
+        try:
+            values.append(np.asarray(columns[name], dtype=np.float64))
+        except (TypeError, ValueError):
+            raise ValueError(f"Cột {name} phải là số") from None
+    arpu, cac, churn, gross_margin = np.broadcast_arrays(*values)
+    unit_margin = arpu * gross_margin
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Cùng nhánh "if x" của bản vô hướng: mẫu số = 0 -> 0 / inf
+        ltv = np.where(churn != 0, unit_margin / churn, 0.0)
+        ltv_cac = np.where(cac != 0, ltv / cac, np.inf)
+        payback = np.where(unit_margin != 0, cac / unit_margin, np.inf)
+
+    result = pd.DataFrame({
+        "ARPU": _round(arpu, 2),
+        "CAC": _round(cac, 2),
+        "LTV": _round(ltv, 2),
+        "LTV/CAC": _round(ltv_cac, 2),
+        "Payback (tháng)": _round(payback, 1),
+        "Net Unit Profit": _round(ltv - cac, 2),
+        "Churn": churn,
+        "Gross Margin": gross_margin
+    }, index=data.index if isinstance(data, pd.DataFrame) else None)
+
+    if isinstance(data, pd.DataFrame):
+        keys = data.drop(columns=[c for c in UE_INPUTS if c in data])
+        result = pd.concat([keys, result], axis=1)
+    return result
 
 
+def assess_unit_economics_frame(ue):
+    """
+    Bản theo bảng của assess_unit_economics: cột categorical (thứ tự RỦI RO CAO <
+    CHẤP NHẬN ĐƯỢC < RẤT KHẢ THI) tính bằng mask trên các cột của unit_economics_frame.
+    """
+    rules = load_rules("ue_assessment")
+    codes = rules.codes(ue)["Assessment"].cat.rename_categories(rules.messages())
+    return codes.cat.reorder_categories(list(ASSESSMENT_TIERS), ordered=True).rename("Assessment")
+
 
+def unit_economics_recommendation_codes(ue):
+    """
+    Mã gợi ý theo từng nhóm chỉ số (cột categorical, khóa của RECOMMENDATION_MESSAGES),
+    cùng ngưỡng với unit_economics_recommendations. NaN rơi vào nhánh cuối như bản vô hướng.
+    """
+    return load_rules("ue_recommendations").codes(ue)
+
+
+def unit_economics_table(data=None, **columns):
+    """
+    Bảng vào, bảng ra: chỉ số unit economics + cột Assessment + mã gợi ý
+    (cột "Rec <nhóm>") cho mọi dòng.
+    """
+    ue = unit_economics_frame(data, **columns)
+    ue["Assessment"] = assess_unit_economics_frame(ue)
+    codes = unit_economics_recommendation_codes(ue)
+    for group in codes:
+        ue[f"Rec {group}"] = codes[group]
+    return ue
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import copy
+import datetime
+import functools
+import hashlib
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class SimulationCache:
+    """
+    Cache LRU giới hạn theo dung lượng (byte) cho kết quả mô phỏng.
+    Sống ở cấp module nên được giữ qua các lần Streamlit chạy lại script.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = int(max_bytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+simulation_cache = SimulationCache()
+
+
+def normalize_params(value):
+    """
+    Chuẩn hóa tham số thành khóa hashable: số nguyên/thực cùng giá trị cho cùng khóa,
+    dict không phụ thuộc thứ tự, mảng numpy băm theo nội dung.
+    Kiểu không hỗ trợ (vd. hàm) -> TypeError, khi đó bỏ qua cache.
+    """
+    if value is None or isinstance(value, (bool, str, bytes)):
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return 0.0 if value == 0 else value
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((str(k), normalize_params(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(normalize_params(v) for v in value))
+    if isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value)
+        digest = hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+        return ("ndarray", data.dtype.str, data.shape, digest)
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return ("date", pd.Timestamp(value).isoformat())
+    if isinstance(value, np.random.SeedSequence):
+        return ("seedseq", normalize_params(value.entropy), tuple(value.spawn_key))
+    raise TypeError(f"Không tạo được khóa cache cho kiểu {type(value).__name__}")
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    # Bản sao riêng: giá trị trong cache không bị người gọi sửa và ngược lại
+    if isinstance(value, (np.ndarray, pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy(v) for v in value)
+    if value is None or isinstance(value, (bool, int, float, str, bytes, np.generic)):
+        return value
+    return copy.deepcopy(value)
+
+
+def cached(cache=None, seed_arg="seed", resolve=None):
+    """
+    Decorator đặt cache trước một hàm mô phỏng. Khóa = tên hàm + tham số đã chuẩn hóa
+    (kể cả seed). Hàm có tham số seed mà được gọi với seed=None thì không cache,
+    vì mỗi lần gọi phải cho kết quả ngẫu nhiên mới.
+    resolve: hàm nhận dict tham số, thay giá trị mặc định phụ thuộc thời điểm gọi
+    (vd. start=None -> hôm nay) bằng giá trị cụ thể trước khi tạo khóa và gọi hàm.
+
+    Cache giữ bản sao riêng của kết quả; mỗi lần lấy từ cache trả về một bản sao mới,
+    nên người gọi sửa kết quả không ảnh hưởng các lần gọi sau.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = cache if cache is not None else simulation_cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if resolve is not None:
+                bound.arguments.update(resolve(dict(bound.arguments)))
+            params = bound.arguments
+
+            if seed_arg in params and params[seed_arg] is None:
+                return fn(*bound.args, **bound.kwargs)
+            try:
+                key = (name, normalize_params(dict(params)))
+            except TypeError:
+                return fn(*bound.args, **bound.kwargs)
+
+            entry = store.get(key)
+            if entry is not None:
+                return _copy(entry[0])
+
+            result = fn(*bound.args, **bound.kwargs)
+            store.put(key, _copy(result))
+            return result
+
+        wrapper.cache_info = lambda: (cache if cache is not None else simulation_cache).info()
+        wrapper.cache_clear = lambda: (cache if cache is not None else simulation_cache).clear()
+        return wrapper
+
+    return decorator
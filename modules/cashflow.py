@@ -3,37 +3,240 @@
 
 # In[ ]:
 
+import numpy as np
 import pandas as pd
 
-def cash_flow_forecast(
+from modules.cache import cached
+
+FREQUENCIES = ("M", "W", "D")
+
+
+class CashFlowForecast:
+    """
+    Kết quả dự báo dòng tiền dạng mảng numpy (trục cuối = bước thời gian).
+    DataFrame chỉ được tạo khi gọi to_frame().
+
+    freq = "M" (tháng), "W" (tuần) hoặc "D" (ngày). `month` là số thứ tự tháng 1..n
+    của từng bước theo tháng; `dates` là ngày bắt đầu của từng bước (có thể None
+    với dự báo theo tháng không gắn lịch).
+    """
+
+    columns = ("Month", "Revenue", "Total Cost", "Net Cash Flow", "Cash Balance")
+
+    def __init__(self, month, revenue, total_cost, net_cash_flow, cash_balance, dates=None, freq="M"):
+        self.month = month
+        self.revenue = revenue
+        self.total_cost = total_cost
+        self.net_cash_flow = net_cash_flow
+        self.cash_balance = cash_balance
+        self.dates = dates
+        self.freq = freq
+
+    @property
+    def shape(self):
+        return self.cash_balance.shape
+
+    def _index_columns(self):
+        if self.freq == "M":
+            index = {"Month": self.month}
+            if self.dates is not None:
+                index["Date"] = self.dates
+            return index
+        return {"Date": self.dates}
+
+    def to_frame(self):
+        """
+        Dạng bảng giống cash_flow_forecast (cột "Date" thay cho "Month" khi theo ngày/tuần).
+        Với kết quả nhiều bộ tham số (mảng nhiều chiều), trả về bảng dạng dài có thêm
+        cột "Batch" = chỉ số bộ tham số.
+        """
+        values = dict(zip(self.columns[1:], [self.revenue, self.total_cost, self.net_cash_flow, self.cash_balance]))
+        index = self._index_columns()
+        if self.cash_balance.ndim == 1:
+            return pd.DataFrame({**index, **values})
+
+        n_batch = int(np.prod(self.shape[:-1]))
+        steps = self.shape[-1]
+        frame = pd.DataFrame({"Batch": np.repeat(np.arange(n_batch), steps)})
+        for name, value in index.items():
+            frame[name] = np.tile(np.asarray(value), n_batch)
+        for name, value in values.items():
+            frame[name] = np.broadcast_to(value, self.shape).reshape(-1)
+        return frame
+
+    def resample(self, freq):
+        """
+        Gộp về bước thời gian thô hơn ("W", "M", "Q", "Y") để vẽ biểu đồ:
+        dòng tiền được cộng dồn trong kỳ, số dư lấy giá trị cuối kỳ. Không lặp theo bước.
+        "M" gộp theo tháng mô hình (`month`, tính từ ngày bắt đầu) và "W" theo tuần trong
+        tháng mô hình như freq = "W", nên kết quả khớp dự báo chạy thẳng ở bước đó;
+        "Q" / "Y" gộp theo lịch.
+        """
+        if freq == "M":
+            starts = np.flatnonzero(np.r_[True, self.month[1:] != self.month[:-1]])
+        elif freq == "W" and self.freq == "D":
+            starts = _week_starts(self.month)
+        elif freq == self.freq:
+            starts = np.arange(self.month.size)
+        else:
+            if self.dates is None:
+                raise ValueError("Cần dự báo có ngày (dates) để gộp theo lịch")
+            codes = pd.DatetimeIndex(self.dates).to_period(freq).asi8
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], self.month.size] - 1
+
+        def total(value):
+            return np.add.reduceat(np.broadcast_to(value, self.shape), starts, axis=-1)
+
+        period_month = self.month[starts] if freq in ("W", "M") else np.arange(1, starts.size + 1)
+        return CashFlowForecast(
+            period_month,
+            total(self.revenue),
+            total(self.total_cost),
+            total(self.net_cash_flow),
+            self.cash_balance[..., ends],
+            dates=None if self.dates is None else pd.DatetimeIndex(self.dates)[starts],
+            freq="M" if freq == "M" else freq
+        )
+
+
+def _week_starts(month):
+    # Tuần = khối 7 ngày liên tiếp tính từ đầu mỗi tháng mô hình (tuần cuối tháng có thể
+    # ngắn hơn), nên không tuần nào vắt qua hai tháng
+    position = np.arange(month.size) - np.searchsorted(month, month)
+    return np.flatnonzero(position % 7 == 0)
+
+
+def _month_starts(start, months):
+    # Ngày bắt đầu tháng mô hình k = start + k tháng (không cộng dồn, nên 31/01 -> 28/02 -> 31/03)
+    start = pd.Timestamp(start).normalize()
+    return pd.DatetimeIndex([start + pd.DateOffset(months=k) for k in range(months)])
+
+
+def _daily_schedule(start, months, payment_day):
+    """
+    Lịch theo ngày cho `months` tháng kể từ `start`: chỉ số tháng (0..months-1) của từng
+    ngày, số ngày của tháng đó và cờ ngày trả chi phí cố định (None = chia đều theo ngày).
+    """
+    boundaries = _month_starts(start, months + 1)
+    days = pd.date_range(boundaries[0], boundaries[-1], freq="D", inclusive="left")
+    period = np.searchsorted(boundaries.asi8, days.asi8, side="right") - 1
+    period_days = np.asarray((boundaries[1:] - boundaries[:-1]).days)
+
+    if payment_day is None:
+        pay = None
+    else:
+        due_day = np.minimum(int(payment_day), days.days_in_month)
+        pay = (days.day == due_day).astype(np.float64)
+    return days, period, period_days[period], pay
+
+
+def cash_flow_arrays(
     initial_cash,
     monthly_revenue,
     monthly_growth,
     fixed_cost,
     variable_cost_ratio,
-    months=24
+    months=24,
+    freq="M",
+    start=None,
+    payment_day=None
 ):
-    data = []
-    cash = initial_cash
-    revenue = monthly_revenue
+    """
+    Dự báo dòng tiền dạng đóng (closed-form), không vòng lặp theo tháng:
+    doanh thu tháng m = R0 * (1 + g)^(m - 1), số dư = tiền ban đầu + cumsum(dòng tiền ròng).
+    Các tham số có thể là mảng (broadcast được với nhau) để tính nhiều bộ tham số
+    cùng lúc; kết quả có shape (*broadcast_shape, số bước).
+
+    freq = "D" / "W": bước theo ngày / tuần trong `months` tháng kể từ `start`
+    (mặc định hôm nay); tháng mô hình thứ m bắt đầu từ start + (m - 1) tháng, tuần tính
+    từ đầu mỗi tháng mô hình. Doanh thu tháng được chia đều cho các ngày của tháng, nên
+    gộp lại theo tháng (resample("M")) cho đúng kết quả freq = "M". Chi phí cố định chia
+    đều theo ngày, hoặc trả một lần vào `payment_day` (ngày trong tháng, ví dụ 25 = ngày
+    trả lương) nếu có.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"freq phải là một trong {FREQUENCIES}")
+
+    initial_cash, monthly_revenue, monthly_growth, fixed_cost, variable_cost_ratio = (
+        np.asarray(x, dtype=np.float64)[..., None]
+        for x in (initial_cash, monthly_revenue, monthly_growth, fixed_cost, variable_cost_ratio)
+    )
+
+    if freq == "M":
+        month = np.arange(1, months + 1)
+        dates = None if start is None else _month_starts(start, months)
+        revenue = monthly_revenue * (1 + monthly_growth) ** (month - 1)
+        fixed = fixed_cost
+    else:
+        days, period, period_days, pay = _daily_schedule(
+            start if start is not None else pd.Timestamp.today(), months, payment_day
+        )
+        month = period + 1
+        dates = days
+        revenue = monthly_revenue * (1 + monthly_growth) ** period / period_days
+        fixed = fixed_cost / period_days if pay is None else fixed_cost * pay
 
-    for m in range(1, months + 1):
-        variable_cost = revenue * variable_cost_ratio
-        total_cost = fixed_cost + variable_cost
-        net_cash_flow = revenue - total_cost
-        cash += net_cash_flow
+    total_cost = fixed + revenue * variable_cost_ratio
+    net_cash_flow = revenue - total_cost
 
-        data.append({
-            "Month": m,
-            "Revenue": revenue,
-            "Total Cost": total_cost,
-            "Net Cash Flow": net_cash_flow,
-            "Cash Balance": cash
-        })
+    if freq == "W":
+        starts = _week_starts(month)
+        shape = np.broadcast_shapes(net_cash_flow.shape, revenue.shape)
+        revenue, total_cost, net_cash_flow = (
+            np.add.reduceat(np.broadcast_to(x, shape), starts, axis=-1)
+            for x in (revenue, total_cost, net_cash_flow)
+        )
+        month = month[starts]
+        dates = dates[starts]
 
-        revenue *= (1 + monthly_growth)
+    cash_balance = initial_cash + np.cumsum(net_cash_flow, axis=-1)
 
-    return pd.DataFrame(data)
+    shape = cash_balance.shape
+    return CashFlowForecast(
+        month,
+        np.broadcast_to(revenue, shape),
+        np.broadcast_to(total_cost, shape),
+        np.broadcast_to(net_cash_flow, shape),
+        cash_balance,
+        dates=dates,
+        freq=freq
+    )
+
+
+def resolve_start(params):
+    """
+    Dự báo theo ngày / tuần không truyền start thì bắt đầu từ hôm nay: điền ngày cụ thể
+    để khóa cache đổi theo ngày (dùng với cached(resolve=...)).
+    """
+    if params.get("start") is None and params.get("freq", "M") != "M":
+        return {"start": pd.Timestamp.today().normalize()}
+    return {}
+
+
+@cached(resolve=resolve_start)
+def cash_flow_forecast(
+    initial_cash,
+    monthly_revenue,
+    monthly_growth,
+    fixed_cost,
+    variable_cost_ratio,
+    months=24,
+    freq="M",
+    start=None,
+    payment_day=None
+):
+    return cash_flow_arrays(
+        initial_cash,
+        monthly_revenue,
+        monthly_growth,
+        fixed_cost,
+        variable_cost_ratio,
+        months,
+        freq=freq,
+        start=start,
+        payment_day=payment_day
+    ).to_frame()
 
 
 def calculate_runway(initial_cash, burn_rate):
@@ -42,4 +245,152 @@ def calculate_runway(initial_cash, burn_rate):
     return initial_cash / abs(burn_rate)
 
 
+def _first_true(pred, lo, hi):
+    """
+    Tìm nhị phân (vector hóa) số nguyên k nhỏ nhất trong [lo, hi] thỏa pred(k),
+    với pred đơn điệu (False ... True) trên đoạn đó. Không có -> hi + 1.
+    """
+    lo = lo.copy()
+    end = hi + 1
+    active = lo < end
+    while active.any():
+        mid = (lo + end) // 2
+        hit = pred(mid) & active
+        end = np.where(hit, mid, end)
+        lo = np.where(active & ~hit, mid + 1, lo)
+        active = lo < end
+    return lo
+
+
+def solve_runway(
+    initial_cash,
+    monthly_revenue,
+    monthly_growth,
+    fixed_cost,
+    variable_cost_ratio,
+    months=1200
+):
+    """
+    Tìm chính xác tháng đầu tiên số dư tiền mặt < 0 và số dư thấp nhất trong `months`
+    tháng, trực tiếp từ tham số (không cần dựng bảng dự báo), cùng mô hình với
+    cash_flow_forecast. Các tham số có thể là mảng (broadcast) để giải nhiều bộ cùng lúc.
+
+    Số dư sau m tháng có dạng đóng C(m) = C0 + a * S(m) - F * m, với a = R0 * (1 - v),
+    S(m) = ((1 + g)^m - 1) / g. Dòng tiền ròng tháng k = a * (1 + g)^(k - 1) - F đơn điệu
+    theo k, nên đoạn tiền mặt giảm là một khoảng liên tục; ranh giới của nó và tháng
+    cắt 0 đều được tìm bằng chia đôi, O(log months) cho mỗi bộ tham số.
+
+    Trả về dict các mảng: "cash_out_month" (inf nếu không hết tiền trong `months` tháng),
+    "min_cash", "min_cash_month".
+    """
+    c0, r0, g, f, v = np.broadcast_arrays(*(
+        np.asarray(x, dtype=np.float64)
+        for x in (initial_cash, monthly_revenue, monthly_growth, fixed_cost, variable_cost_ratio)
+    ))
+    shape = c0.shape
+    c0, r0, g, f, v = (x.ravel() for x in (c0, r0, g, f, v))
+    a = r0 * (1 - v)
+    log_growth = np.log1p(g)
+    zero_growth = g == 0
+    safe_g = np.where(zero_growth, 1.0, g)
+
+    def net(k):
+        return a * np.exp((k - 1) * log_growth) - f
+
+    def cash(m):
+        growth_sum = np.where(zero_growth, m, np.expm1(m * log_growth) / safe_g)
+        return c0 + a * growth_sum - f * m
+
+    one = np.ones(c0.shape, dtype=np.int64)
+    horizon = np.full(c0.shape, int(months), dtype=np.int64)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        # Dòng tiền ròng tăng dần khi a * g > 0: tiền giảm ở các tháng 1..K rồi tăng.
+        # Ngược lại (giảm dần hoặc không đổi): tiền tăng tới tháng J - 1 rồi giảm ở J..months.
+        increasing = a * g > 0
+        first_nonneg = _first_true(lambda k: net(k) >= 0, one, horizon)
+        first_neg = _first_true(lambda k: net(k) < 0, one, horizon)
+        seg_lo = np.where(increasing, 1, first_neg)
+        seg_hi = np.where(increasing, first_nonneg - 1, horizon)
+
+        crossing = _first_true(lambda m: cash(m) < 0, seg_lo, seg_hi)
+        cash_out = np.where(crossing <= seg_hi, crossing, np.inf)
+        cash_out = np.where(cash(one) < 0, 1, cash_out)
+
+        # Số dư thấp nhất: tại tháng 1, tháng cuối, hoặc đáy K của trường hợp tăng dần
+        valley = np.clip(first_nonneg - 1, 1, horizon)
+        candidates = np.stack([one, horizon, np.where(increasing, valley, one)])
+        values = cash(candidates)
+        pick = np.argmin(values, axis=0)
+        cols = np.arange(c0.size)
+        min_cash = values[pick, cols]
+        min_cash_month = candidates[pick, cols]
+
+    return {
+        "cash_out_month": cash_out.reshape(shape),
+        "min_cash": min_cash.reshape(shape),
+        "min_cash_month": min_cash_month.reshape(shape)
+    }
+
+
+@cached()
+def simulate_cash_paths(
+    initial_cash,
+    monthly_revenue,
+    monthly_growth,
+    fixed_cost,
+    variable_cost_ratio,
+    months=24,
+    n_simulations=10000,
+    growth_std=0.02,
+    revenue_std=0.1,
+    cost_std=0.05,
+    quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+    seed=None
+):
+    """
+    Mô phỏng ma trận đường tiền mặt (n_simulations x months), không có vòng lặp theo tháng.
+    - Tăng trưởng mỗi tháng ~ N(monthly_growth, growth_std)
+    - Doanh thu nhân với nhiễu (1 + N(0, revenue_std))
+    - Chi phí cố định nhân với nhiễu (1 + N(0, cost_std))
+    Tháng hết tiền = tháng đầu tiên số dư < 0 (inf nếu không hết tiền trong kỳ).
+    """
+    rng = np.random.default_rng(seed)
+    # Ma trận tính theo bố cục (months x n_simulations) để cumsum/quantile
+    # chạy trên các hàng liền kề trong bộ nhớ
+    shape = (months, n_simulations)
+
+    # Doanh thu tháng 1 = monthly_revenue, các tháng sau nhân dồn (1 + g)
+    growth = rng.normal(monthly_growth, growth_std, shape)
+    growth[0] = 0.0
+    growth += 1.0
+    revenue = np.cumprod(growth, axis=0, out=growth)
+    revenue *= monthly_revenue
+    revenue *= rng.normal(1.0, revenue_std, shape)
+
+    # Dòng tiền ròng = doanh thu * (1 - tỷ lệ biến phí) - chi phí cố định
+    net_cash_flow = revenue
+    net_cash_flow *= 1 - variable_cost_ratio
+    net_cash_flow -= fixed_cost * rng.normal(1.0, cost_std, shape)
+
+    cash = np.cumsum(net_cash_flow, axis=0, out=net_cash_flow)
+    cash += initial_cash
+
+    negative = cash < 0
+    ever = negative.any(axis=0)
+    cash_out_month = np.where(ever, negative.argmax(axis=0) + 1, np.inf)
+
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    bands = np.quantile(cash, quantiles, axis=1)
+    cash_quantiles = pd.DataFrame(bands.T, columns=[f"P{q * 100:g}" for q in quantiles])
+    cash_quantiles.insert(0, "Month", np.arange(1, months + 1))
+
+    runway_quantiles = dict(zip(quantiles.tolist(), np.quantile(cash_out_month, quantiles, method="inverted_cdf").tolist()))
 
+    return {
+        "cash_out_month": cash_out_month,
+        "cash_out_probability": float(ever.mean()),
+        "runway_quantiles": runway_quantiles,
+        "cash_quantiles": cash_quantiles,
+        "ending_cash": cash[-1].copy()
+    }
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+
+from modules.business import unit_economics
+
+TRANSACTION_COLUMNS = ("customer_id", "date", "amount")
+
+# Khóa (khách hàng, tháng) = mã khách * _MONTH_SPAN + tháng; tháng tính từ 01/1970
+# cộng _MONTH_OFFSET để ngày trước 1970 vẫn không âm
+_MONTH_SPAN = 1 << 14
+_MONTH_OFFSET = _MONTH_SPAN // 2
+
+
+class CohortAnalysis:
+    """
+    Ma trận cohort (tháng mua đầu tiên) x tuổi (số tháng kể từ tháng đầu):
+    active = số khách có giao dịch, revenue = doanh thu.
+    Ô chưa quan sát được (cohort mới chưa đủ tuổi) là NaN.
+    """
+
+    def __init__(self, cohorts, active, revenue):
+        self.cohorts = cohorts
+        self.active = active
+        self.revenue = revenue
+        self.sizes = active[:, 0] if active.size else np.zeros(0)
+
+    @property
+    def observed(self):
+        return ~np.isnan(self.active)
+
+    def retention(self):
+        """
+        Tỷ lệ khách còn hoạt động theo tuổi (DataFrame cohort x tuổi).
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = self.active / self.sizes[:, None]
+        return self._frame(values)
+
+    def revenue_matrix(self):
+        return self._frame(self.revenue)
+
+    def _frame(self, values):
+        return pd.DataFrame(
+            values,
+            index=pd.Index(self.cohorts, name="Cohort"),
+            columns=pd.RangeIndex(values.shape[1], name="Age")
+        )
+
+    def churn(self):
+        """
+        Churn tháng thực nghiệm: 1 - tỷ lệ khách hoạt động kỳ sau / kỳ trước,
+        gộp trên mọi cặp tuổi liên tiếp đã quan sát được của tất cả cohort.
+        """
+        if self.active.shape[1] < 2:
+            return np.nan
+        both = self.observed[:, 1:] & self.observed[:, :-1]
+        previous = np.where(both, self.active[:, :-1], 0.0).sum()
+        current = np.where(both, self.active[:, 1:], 0.0).sum()
+        return 1 - current / previous if previous else np.nan
+
+    def arpu(self):
+        """
+        Doanh thu tháng bình quân trên mỗi khách hoạt động.
+        """
+        customer_months = np.nansum(self.active)
+        return np.nansum(self.revenue) / customer_months if customer_months else np.nan
+
+    def age_revenue(self, gross_margin=1.0):
+        """
+        Lãi gộp trên mỗi khách mới ở từng tuổi, ước lượng kiểu chain-ladder: tuổi 0 lấy
+        trên mọi cohort, hệ số tuổi a -> a + 1 = doanh thu tuổi a + 1 / doanh thu tuổi a
+        trên cùng các cohort quan sát được tới tuổi a + 1. Cohort mới chưa đủ tuổi
+        không làm lệch các tuổi sau về phía cohort cũ.
+        """
+        n_ages = self.revenue.shape[1]
+        if n_ages == 0:
+            return pd.Series([], index=pd.RangeIndex(0, name="Age"), name="Revenue", dtype=np.float64)
+        both = self.observed[:, 1:]
+        current = np.where(both, self.revenue[:, 1:], 0.0).sum(axis=0)
+        previous = np.where(both, self.revenue[:, :-1], 0.0).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factors = np.where(previous > 0, current / previous, 0.0)
+            first = self.revenue[:, 0].sum() / self.sizes.sum()
+        per_customer = first * np.cumprod(np.r_[1.0, factors])
+        return pd.Series(per_customer * gross_margin, index=pd.RangeIndex(n_ages, name="Age"), name="Revenue")
+
+    def ltv_curve(self, gross_margin=1.0):
+        """
+        Lãi gộp lũy kế trên mỗi khách mới theo tuổi (cộng dồn age_revenue).
+        """
+        return self.age_revenue(gross_margin).cumsum().rename("LTV")
+
+    def ltv(self, gross_margin=1.0):
+        """
+        LTV thực nghiệm: phần lũy kế đã quan sát + phần đuôi ngoại suy
+        (lãi gộp ở tuổi cuối giảm dần theo churn thực nghiệm).
+        """
+        age_revenue = self.age_revenue(gross_margin)
+        if age_revenue.empty:
+            return np.nan
+        churn = self.churn()
+        last = age_revenue.iloc[-1]
+        tail = last * (1 - churn) / churn if churn and churn > 0 else 0.0
+        return float(age_revenue.sum() + tail)
+
+    def payback(self, cac, gross_margin=1.0):
+        """
+        Tháng đầu tiên lãi gộp lũy kế trên mỗi khách >= CAC (inf nếu chưa hoàn vốn).
+        """
+        curve = self.ltv_curve(gross_margin).to_numpy()
+        reached = np.flatnonzero(curve >= cac)
+        return float(reached[0] + 1) if reached.size else float("inf")
+
+    def unit_economics(self, cac, gross_margin):
+        """
+        unit_economics với ARPU và churn lấy từ dữ liệu thay cho giá trị nhập tay.
+        """
+        return unit_economics(float(self.arpu()), cac, float(self.churn()), gross_margin)
+
+
+def _month_index(dates, date_format=None):
+    # Số tháng kể từ 01/1970 (+ _MONTH_OFFSET); ngày lỗi -> -1
+    parsed = pd.to_datetime(dates, format=date_format, errors="coerce").to_numpy()
+    months = parsed.astype("datetime64[M]").astype(np.int64) + _MONTH_OFFSET
+    months[np.isnat(parsed)] = -1
+    return months
+
+
+def _compact(keys, amounts):
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=amounts, minlength=unique.size)
+
+
+def _pandas_chunks(source, columns, chunksize, date_format):
+    customer_col, date_col, amount_col = columns
+    if isinstance(source, pd.DataFrame):
+        chunks = (source[start:start + chunksize] for start in range(0, len(source), chunksize))
+    else:
+        chunks = pd.read_csv(
+            source,
+            usecols=list(columns),
+            dtype={customer_col: object, amount_col: np.float64},
+            chunksize=chunksize
+        )
+    for chunk in chunks:
+        # Ngày lặp lại rất nhiều: chỉ parse các giá trị khác nhau trong chunk
+        date_codes, unique_dates = pd.factorize(chunk[date_col])
+        months = _month_index(unique_dates, date_format)[date_codes]
+        months[date_codes < 0] = -1
+        local_codes, unique_ids = pd.factorize(chunk[customer_col])
+        yield local_codes, np.asarray(unique_ids.astype(str), dtype=object), months, chunk[amount_col].to_numpy(dtype=np.float64)
+
+
+def _arrow_chunks(source, columns, block_size, date_format):
+    # Đọc CSV dạng luồng bằng pyarrow (đa luồng, mỗi lần một block); mã hóa từ điển cho
+    # khách hàng và ngày nên chỉ các giá trị khác nhau được chuyển sang Python / parse
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+
+    customer_col, date_col, amount_col = columns
+    reader = pv.open_csv(
+        source,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(
+            include_columns=list(columns),
+            strings_can_be_null=True,
+            column_types={customer_col: pa.string(), date_col: pa.string(), amount_col: pa.float64()}
+        )
+    )
+    for batch in reader:
+        ids = pc.dictionary_encode(batch.column(customer_col))
+        dates = pc.dictionary_encode(batch.column(date_col))
+        date_codes = pc.fill_null(dates.indices, -1).to_numpy(zero_copy_only=False).astype(np.int64)
+        months = _month_index(dates.dictionary.to_pandas(), date_format)[date_codes]
+        months[date_codes < 0] = -1
+        yield (
+            pc.fill_null(ids.indices, -1).to_numpy(zero_copy_only=False).astype(np.int64),
+            np.asarray(ids.dictionary.to_pylist(), dtype=object),
+            months,
+            batch.column(amount_col).to_numpy(zero_copy_only=False).astype(np.float64)
+        )
+
+
+def cohort_analysis(
+    source,
+    chunksize=1_000_000,
+    columns=TRANSACTION_COLUMNS,
+    date_format=None,
+    engine="auto",
+    block_size=32 * 1024 ** 2,
+    compact_every=8
+):
+    """
+    Đọc log giao dịch (CSV: customer_id, date, amount) theo từng chunk và dựng ma trận
+    cohort. Mỗi chunk được gộp ngay thành cặp (khách hàng, tháng) -> doanh thu, nên bộ nhớ
+    tỉ lệ với số cặp khách-tháng chứ không với số dòng giao dịch.
+    source: đường dẫn / file-like, hoặc DataFrame đã có sẵn.
+    columns: tên cột (khách hàng, ngày, số tiền) trong file.
+    engine: "pyarrow" (đọc luồng theo block_size byte), "c" (pandas, chunksize dòng),
+    "auto" = pyarrow nếu đã cài.
+    """
+    if engine == "auto":
+        try:
+            import pyarrow.csv  # noqa: F401
+            engine = "pyarrow"
+        except ImportError:
+            engine = "c"
+    if engine == "pyarrow" and not isinstance(source, pd.DataFrame):
+        chunks = _arrow_chunks(source, columns, block_size, date_format)
+    else:
+        chunks = _pandas_chunks(source, columns, chunksize, date_format)
+
+    customer_ids = pd.Index([], dtype=object)
+    keys = np.zeros(0, dtype=np.int64)
+    amounts = np.zeros(0)
+    pending_keys, pending_amounts = [], []
+
+    for i, (local_codes, unique_ids, months, chunk_amounts) in enumerate(chunks):
+        # Mã số nguyên toàn cục cho khách hàng: tra danh mục chung chỉ với khách khác nhau của chunk
+        global_codes = customer_ids.get_indexer(unique_ids)
+        new = global_codes < 0
+        if new.any():
+            global_codes[new] = np.arange(len(customer_ids), len(customer_ids) + new.sum())
+            customer_ids = customer_ids.append(pd.Index(unique_ids[new], dtype=object))
+        codes = np.append(global_codes.astype(np.int64), -1)[local_codes]
+
+        valid = (months >= 0) & (months < _MONTH_SPAN) & (local_codes >= 0)
+        chunk_keys, chunk_amounts = _compact(
+            codes[valid] * _MONTH_SPAN + months[valid],
+            np.nan_to_num(chunk_amounts[valid])
+        )
+        pending_keys.append(chunk_keys)
+        pending_amounts.append(chunk_amounts)
+        if (i + 1) % compact_every == 0:
+            keys, amounts = _compact(np.concatenate([keys, *pending_keys]), np.concatenate([amounts, *pending_amounts]))
+            pending_keys, pending_amounts = [], []
+
+    keys, amounts = _compact(np.concatenate([keys, *pending_keys]), np.concatenate([amounts, *pending_amounts]))
+    return _build_cohorts(keys, amounts)
+
+
+def _build_cohorts(keys, amounts):
+    if keys.size == 0:
+        return CohortAnalysis(pd.PeriodIndex([], freq="M"), np.zeros((0, 0)), np.zeros((0, 0)))
+
+    # keys đã sắp xếp -> lần xuất hiện đầu của mỗi khách là tháng đầu tiên
+    customers = keys // _MONTH_SPAN
+    months = keys % _MONTH_SPAN
+    _, first_index, inverse = np.unique(customers, return_index=True, return_inverse=True)
+    first_month = months[first_index][inverse]
+
+    cohort_months, cohort_index = np.unique(first_month, return_inverse=True)
+    age = months - first_month
+    last_month = months.max()
+    n_cohorts, n_ages = cohort_months.size, int(last_month - cohort_months.min()) + 1
+
+    cell = cohort_index * n_ages + age
+    active = np.bincount(cell, minlength=n_cohorts * n_ages).reshape(n_cohorts, n_ages).astype(np.float64)
+    revenue = np.bincount(cell, weights=amounts, minlength=n_cohorts * n_ages).reshape(n_cohorts, n_ages)
+
+    # Tuổi vượt quá tháng cuối của dữ liệu: chưa quan sát được
+    unobserved = np.arange(n_ages)[None, :] > (last_month - cohort_months)[:, None]
+    active[unobserved] = np.nan
+    revenue[unobserved] = np.nan
+
+    cohorts = pd.PeriodIndex((cohort_months - _MONTH_OFFSET).astype("datetime64[M]"), freq="M")
+    return CohortAnalysis(cohorts, active, revenue)
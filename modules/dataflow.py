@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+from modules.cache import normalize_params
+
+
+class Graph:
+    """
+    Đồ thị phụ thuộc tính toán cho một trang Streamlit.
+
+    - set(...) gán giá trị đầu vào (thường là giá trị widget); đầu vào không đổi
+      thì phiên bản (version) giữ nguyên.
+    - node(name, inputs) đăng ký một nút tính toán; nút chỉ được tính lại khi phiên
+      bản của một đầu vào/nút phía trên thay đổi, ngược lại trả về kết quả đã nhớ.
+    - get(name) tính lười (lazy): chỉ những nút thực sự được hỏi mới chạy.
+
+    Lưu đối tượng Graph trong st.session_state để giữ kết quả qua các lần chạy lại
+    script của từng phiên người dùng.
+    """
+
+    def __init__(self):
+        self._values = {}       # tên đầu vào -> (giá trị, khóa chuẩn hóa, version)
+        self._nodes = {}        # tên nút -> (hàm, tuple tên đầu vào)
+        self._memo = {}         # tên nút -> (tuple version đầu vào, kết quả, version)
+        self._clock = 0
+        self.recomputed = []    # các nút đã tính lại kể từ lần reset_log() gần nhất
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def set(self, **values):
+        for name, value in values.items():
+            if name in self._nodes:
+                raise ValueError(f"'{name}' là nút tính toán, không phải đầu vào")
+            try:
+                key = normalize_params(value)
+            except TypeError:
+                key = ("id", id(value))
+            old = self._values.get(name)
+            if old is not None and old[1] == key:
+                continue
+            self._values[name] = (value, key, self._tick())
+        return self
+
+    def node(self, name, inputs=()):
+        """
+        Decorator đăng ký nút `name`; hàm nhận các đầu vào theo tên.
+        Đăng ký lại cùng tên và cùng danh sách đầu vào (mỗi lần chạy lại script)
+        giữ nguyên kết quả đã nhớ.
+        """
+        inputs = tuple(inputs)
+
+        def register(fn):
+            if name in self._values:
+                raise ValueError(f"'{name}' đã là đầu vào")
+            old = self._nodes.get(name)
+            if old is not None and old[1] != inputs:
+                self._memo.pop(name, None)
+            self._nodes[name] = (fn, inputs)
+            return fn
+
+        return register
+
+    def _resolve(self, name, stack=()):
+        if name in self._values:
+            value, _, version = self._values[name]
+            return value, version
+        if name not in self._nodes:
+            raise KeyError(f"Chưa có đầu vào hoặc nút '{name}'")
+        if name in stack:
+            raise ValueError(f"Phụ thuộc vòng: {' -> '.join(stack + (name,))}")
+
+        fn, inputs = self._nodes[name]
+        resolved = [self._resolve(dep, stack + (name,)) for dep in inputs]
+        versions = tuple(version for _, version in resolved)
+
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == versions:
+            return memo[1], memo[2]
+
+        result = fn(**{dep: value for dep, (value, _) in zip(inputs, resolved)})
+        version = self._tick()
+        self._memo[name] = (versions, result, version)
+        self.recomputed.append(name)
+        return result, version
+
+    def get(self, name):
+        return self._resolve(name)[0]
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(name, None)
+
+    def reset_log(self):
+        self.recomputed = []
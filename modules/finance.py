@@ -4,6 +4,10 @@
 # In[ ]:
 
 import numpy as np
+import pandas as pd
+
+from modules.metrics import MetricRegistry
+
 
 def break_even_point(fixed_cost, price, variable_cost):
     contribution_margin = price - variable_cost
@@ -12,6 +16,82 @@ def break_even_point(fixed_cost, price, variable_cost):
     return fixed_cost / contribution_margin
 
 
+def break_even_points(fixed_cost, price, variable_cost):
+    """
+    Phiên bản vector hóa của break_even_point cho mảng tham số (broadcast được).
+    Trường hợp không có điểm hòa vốn (biên đóng góp <= 0) trả về NaN thay cho None.
+    """
+    fixed_cost, price, variable_cost = (
+        np.asarray(x, dtype=np.float64) for x in (fixed_cost, price, variable_cost)
+    )
+    contribution_margin = price - variable_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(contribution_margin > 0, fixed_cost / contribution_margin, np.nan)
+
+
+def product_mix_break_even(fixed_cost, price, variable_cost, mix=None, mix_basis="units", price_changes=None):
+    """
+    Điểm hòa vốn cho danh mục nhiều sản phẩm dùng chung chi phí cố định.
+    price, variable_cost, mix: mảng (..., k) với k = số SKU ở trục cuối; các trục đầu
+    (nhiều danh mục / kịch bản) được broadcast và tính trong cùng một lần.
+    mix: tỷ trọng theo số lượng bán (mix_basis="units") hoặc theo doanh thu ("revenue"),
+    mặc định đều nhau; được chuẩn hóa về tổng = 1. Tỷ trọng âm hoặc tổng = 0 -> ValueError.
+    price_changes: lưới thay đổi giá tương đối (vd. np.linspace(-0.2, 0.2, 41)),
+    mọi SKU cùng đổi giá, giữ nguyên cơ cấu số lượng -> đường BEP theo giá.
+
+    Trả về dict mảng: bep_units / bep_revenue (danh mục, NaN nếu biên đóng góp bình quân
+    <= 0), weighted_margin, unit_mix, sku_units / sku_revenue (BEP từng SKU),
+    unit_margin, contribution_share; và curve_units / curve_revenue
+    (trục đầu = price_changes) nếu có lưới giá.
+    """
+    price, variable_cost = (np.asarray(x, dtype=np.float64) for x in (price, variable_cost))
+    fixed_cost = np.asarray(fixed_cost, dtype=np.float64)
+    mix = np.ones(np.broadcast_shapes(price.shape, variable_cost.shape)) if mix is None else np.asarray(mix, dtype=np.float64)
+    if (mix < 0).any():
+        raise ValueError("Tỷ trọng mix không được âm")
+    if mix_basis == "revenue":
+        # Tỷ trọng doanh thu -> tỷ trọng số lượng: số lượng tỷ lệ với doanh thu / giá
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mix = np.where(price > 0, mix / price, 0.0)
+    elif mix_basis != "units":
+        raise ValueError("mix_basis phải là 'units' hoặc 'revenue'")
+
+    total = mix.sum(axis=-1, keepdims=True)
+    if not (total > 0).all():
+        raise ValueError("Tổng tỷ trọng mix phải > 0 (với tỷ trọng doanh thu: SKU có tỷ trọng phải có giá > 0)")
+    unit_mix = mix / total
+
+    unit_margin = price - variable_cost
+    weighted_margin = (unit_mix * unit_margin).sum(axis=-1)
+    weighted_price = (unit_mix * price).sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bep_units = np.where(weighted_margin > 0, fixed_cost / weighted_margin, np.nan)
+        contribution_share = unit_mix * unit_margin / weighted_margin[..., None]
+
+    result = {
+        "bep_units": bep_units,
+        "bep_revenue": bep_units * weighted_price,
+        "weighted_margin": weighted_margin,
+        "unit_mix": unit_mix,
+        "sku_units": bep_units[..., None] * unit_mix,
+        "sku_revenue": bep_units[..., None] * unit_mix * price,
+        "unit_margin": unit_margin,
+        "contribution_share": contribution_share
+    }
+
+    if price_changes is not None:
+        # Lưới giá ở trục đầu: (g, ..., k)
+        changes = np.asarray(price_changes, dtype=np.float64).reshape((-1,) + (1,) * price.ndim)
+        grid_price = price * (1 + changes)
+        grid_margin = (unit_mix * (grid_price - variable_cost)).sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            curve_units = np.where(grid_margin > 0, fixed_cost / grid_margin, np.nan)
+        result["curve_units"] = curve_units
+        result["curve_revenue"] = curve_units * (unit_mix * grid_price).sum(axis=-1)
+    return result
+
+
 # modules/finance.py
 def extended_financial_ratios(
     revenue,
@@ -64,6 +144,145 @@ def extended_financial_ratios(
     return ratios
 
 
+RATIO_INPUTS = (
+    "revenue",
+    "cogs",
+    "operating_cost",
+    "total_cost",
+    "net_profit",
+    "total_assets",
+    "equity",
+    "current_assets",
+    "current_liabilities",
+    "cash",
+    "total_debt"
+)
+
+
+def _safe_divide(numerator, denominator, fill):
+    # Giống nhánh "if denominator" của bản vô hướng: mẫu số = 0 -> fill, NaN vẫn lan truyền
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, fill)
+
+
+def extended_financial_ratios_frame(data=None, **columns):
+    """
+    Phiên bản vector hóa của extended_financial_ratios: mỗi dòng là một kỳ hoặc một
+    công ty. Đầu vào là DataFrame có các cột trùng tên tham số của bản vô hướng
+    (revenue, cogs, ..., total_debt) và/hoặc các mảng truyền theo tên.
+    Trả về DataFrame 13 cột tỷ số, xử lý mẫu số bằng 0 giống hệt bản vô hướng.
+    """
+    if data is not None:
+        columns = {**{name: data[name] for name in RATIO_INPUTS if name in data}, **columns}
+    missing = [name for name in RATIO_INPUTS if name not in columns]
+    if missing:
+        raise ValueError(f"Thiếu cột: {missing}")
+
+    index = data.index if isinstance(data, pd.DataFrame) else next(
+        (columns[name].index for name in RATIO_INPUTS if isinstance(columns[name], pd.Series)), None
+    )
+    (
+        revenue, cogs, operating_cost, total_cost, net_profit, total_assets,
+        equity, current_assets, current_liabilities, cash, total_debt
+    ) = np.broadcast_arrays(*(np.asarray(columns[name], dtype=np.float64) for name in RATIO_INPUTS))
+
+    ratios = {}
+
+    # --------------------
+    # PROFITABILITY
+    # --------------------
+    ratios["Gross Margin"] = _safe_divide(revenue - cogs, revenue, 0.0)
+    ratios["Operating Margin"] = _safe_divide(revenue - cogs - operating_cost, revenue, 0.0)
+    ratios["Net Profit Margin"] = _safe_divide(net_profit, revenue, 0.0)
+
+    # --------------------
+    # RETURN
+    # --------------------
+    ratios["ROA"] = _safe_divide(net_profit, total_assets, 0.0)
+    ratios["ROE"] = _safe_divide(net_profit, equity, 0.0)
+
+    # --------------------
+    # EFFICIENCY
+    # --------------------
+    ratios["Asset Turnover"] = _safe_divide(revenue, total_assets, 0.0)
+    ratios["Cost-to-Revenue"] = _safe_divide(total_cost, revenue, 0.0)
+    ratios["Operating Cost Ratio"] = _safe_divide(operating_cost, revenue, 0.0)
+
+    # --------------------
+    # LIQUIDITY
+    # --------------------
+    ratios["Current Ratio"] = _safe_divide(current_assets, current_liabilities, np.inf)
+    ratios["Cash Ratio"] = _safe_divide(cash, current_liabilities, np.inf)
+
+    # --------------------
+    # SOLVENCY / LEVERAGE
+    # --------------------
+    ratios["Debt-to-Equity"] = _safe_divide(total_debt, equity, np.inf)
+    ratios["Debt Ratio"] = _safe_divide(total_debt, total_assets, 0.0)
+    ratios["Equity Ratio"] = _safe_divide(equity, total_assets, 0.0)
+
+    return pd.DataFrame(ratios, index=index)
+
+
+STATEMENT_COLUMNS = ("Revenue", "COGS", "Operating_Expense", "Financial_Expense", "Tax", "Total_Assets")
+
+# Chỉ tiêu phái sinh của báo cáo tài chính (trang 6) và báo cáo kinh doanh (trang 5)
+FINANCIAL_STATEMENT_METRICS = MetricRegistry(
+    {
+        "Gross_Profit": "Revenue - COGS",
+        "Operating_Profit": "Gross_Profit - Operating_Expense",
+        "EBT": "Operating_Profit - Financial_Expense",
+        "Net_Profit": "EBT - Tax",
+        "Total_Debt": "Short_Term_Debt + Long_Term_Debt",
+        "Gross_Margin": "div0(Gross_Profit, Revenue)",
+        "Operating_Margin": "div0(Operating_Profit, Revenue)",
+        "Net_Margin": "div0(Net_Profit, Revenue)"
+    },
+    defaults={"Short_Term_Debt": 0, "Long_Term_Debt": 0}
+)
+
+BUSINESS_REPORT_METRICS = MetricRegistry({
+    "Total_Cost": "COGS + Operating_Cost + Marketing_Cost + Other_Cost",
+    "Gross_Profit": "Revenue - COGS",
+    "Operating_Profit": "Gross_Profit - Operating_Cost",
+    "Net_Profit": "Revenue - Total_Cost",
+    "Gross_Margin": "Gross_Profit / Revenue",
+    "Operating_Margin": "Operating_Profit / Revenue",
+    "Net_Margin": "Net_Profit / Revenue",
+    "Cost_to_Revenue": "Total_Cost / Revenue"
+})
+
+
+def financial_statement_ratios(df):
+    """
+    Bổ sung vào df (tại chỗ) các cột của FINANCIAL_STATEMENT_METRICS
+    (Gross_Profit, Operating_Profit, EBT, Net_Profit, Total_Debt, các margin)
+    và trả về DataFrame tỷ số từng kỳ (extended_financial_ratios_frame).
+    Cột Current_Assets, Cash là tùy chọn: thiếu thì Current Ratio dùng Total_Assets
+    (như trang báo cáo), Cash Ratio = NaN (trụ cột Liquidity không chấm được, xem
+    financial_health_assessment_frame(missing="skip")).
+    """
+    missing = [c for c in STATEMENT_COLUMNS if c not in df]
+    if missing:
+        raise ValueError(f"Thiếu cột: {missing}")
+
+    FINANCIAL_STATEMENT_METRICS.evaluate(df, inplace=True)
+
+    return extended_financial_ratios_frame(
+        revenue=df["Revenue"],
+        cogs=df["COGS"],
+        operating_cost=df["Operating_Expense"],
+        total_cost=df["Revenue"] - df["Net_Profit"],
+        net_profit=df["Net_Profit"],
+        total_assets=df["Total_Assets"],
+        equity=df.get("Equity", np.nan),
+        current_assets=df.get("Current_Assets", df["Total_Assets"]),
+        current_liabilities=df.get("Short_Term_Debt", np.nan),
+        cash=df.get("Cash", np.nan),
+        total_debt=df["Total_Debt"]
+    )
+
+
 def financial_health_assessment(ratios):
     """
     Đánh giá sức khỏe tài chính theo 3 nhóm: Profitability, Liquidity, Leverage/Return
@@ -133,3 +352,61 @@ def financial_health_assessment(ratios):
         assessment["Return on Capital"] = "Weak"
 
     return assessment, score
+
+
+# (trụ cột, [(tỷ số, giá trị mặc định, chiều so sánh, ngưỡng Strong, ngưỡng Acceptable), ...])
+# Cùng ngưỡng với financial_health_assessment
+HEALTH_PILLARS = (
+    ("Profitability", (("Gross Margin", 0, ">=", 0.4, 0.25), ("Cost-to-Revenue", 1, "<=", 0.7, 0.9))),
+    ("Liquidity", (("Current Ratio", 0, ">=", 1.5, 1), ("Cash Ratio", 0, ">=", 0.5, 0.25))),
+    ("Leverage / Risk", (("Debt-to-Equity", 0, "<=", 1, 2), ("Debt Ratio", 0, "<=", 0.5, 0.7))),
+    ("Return on Capital", (("ROE", 0, ">=", 0.15, 0.05), ("ROA", 0, ">=", 0.05, 0.02)))
+)
+HEALTH_LABELS = ("Weak", "Acceptable", "Strong")
+
+
+def financial_health_assessment_frame(ratios, missing="weak"):
+    """
+    Chấm điểm sức khỏe tài chính hàng loạt: ratios là DataFrame (vd. kết quả
+    extended_financial_ratios_frame) hoặc dict cột tỷ số, mỗi dòng một kỳ / công ty.
+    Mỗi ngưỡng được đánh giá thành mask boolean trên cả cột, kết quả trùng khớp
+    financial_health_assessment từng dòng. Trả về DataFrame gồm nhãn từng trụ cột
+    (categorical Weak < Acceptable < Strong), cột Score và Max Score.
+
+    missing="weak": tỷ số NaN không thỏa ngưỡng nào (như bản vô hướng).
+    missing="skip": trụ cột có tỷ số NaN (thiếu dữ liệu, vd. báo cáo không có cột Cash)
+    để nhãn NaN và không tính vào Score / Max Score.
+    """
+    if missing not in ("weak", "skip"):
+        raise ValueError("missing phải là 'weak' hoặc 'skip'")
+    index = ratios.index if isinstance(ratios, pd.DataFrame) else None
+    n = len(ratios) if index is not None else len(next(iter(ratios.values())))
+
+    result = {}
+    score = np.zeros(n, dtype=np.int64)
+    max_score = np.zeros(n, dtype=np.int64)
+    for pillar, checks in HEALTH_PILLARS:
+        strong = np.ones(n, dtype=bool)
+        acceptable = np.ones(n, dtype=bool)
+        available = np.ones(n, dtype=bool)
+        for name, default, direction, strong_at, acceptable_at in checks:
+            # Thiếu cột -> giá trị mặc định như ratios.get(...); NaN không thỏa ngưỡng nào
+            values = np.asarray(ratios[name], dtype=np.float64) if name in ratios else np.full(n, float(default))
+            if missing == "skip":
+                available &= ~np.isnan(values)
+            if direction == ">=":
+                strong &= values >= strong_at
+                acceptable &= values >= acceptable_at
+            else:
+                strong &= values <= strong_at
+                acceptable &= values <= acceptable_at
+
+        # Điểm trụ cột = mã nhãn: Strong 2, Acceptable 1, Weak 0; không có dữ liệu -> -1 (NaN)
+        codes = np.where(available, np.where(strong, 2, np.where(acceptable, 1, 0)), -1)
+        result[pillar] = pd.Categorical.from_codes(codes, categories=HEALTH_LABELS, ordered=True)
+        score += np.maximum(codes, 0)
+        max_score += 2 * available
+
+    result["Score"] = score
+    result["Max Score"] = max_score
+    return pd.DataFrame(result, index=index)
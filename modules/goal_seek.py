@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+
+from modules.finance import break_even_points
+from modules.sensitivity import DRIVERS, METRICS, evaluate_metric
+
+OUTPUTS = METRICS + ("break_even",)
+BREAK_EVEN_INPUTS = ("fixed_cost", "price", "variable_cost")
+
+
+def _model(output, params, months):
+    if output == "break_even":
+        return break_even_points(params["fixed_cost"], params["price"], params["variable_cost"])
+    return evaluate_metric(params, months, output)
+
+
+def goal_seek(
+    output,
+    target,
+    solve_for,
+    params,
+    lower,
+    upper,
+    months=24,
+    tol=1e-6,
+    max_iter=200
+):
+    """
+    Giải ngược: tìm giá trị của một đầu vào `solve_for` để đầu ra `output` đạt `target`.
+
+    output: "ending_cash", "min_cash", "runway" (theo cash_flow_forecast / scenario_analysis,
+        tham số: initial_cash, revenue, growth, fixed_cost, var_ratio)
+        hoặc "break_even" (theo break_even_point, tham số: fixed_cost, price, variable_cost).
+    target, lower, upper và các giá trị trong params có thể là mảng: mọi mục tiêu được
+    giải cùng lúc bằng chia đôi vector hóa trên khoảng [lower, upper].
+
+    Đầu ra cần đơn điệu theo `solve_for` trong khoảng. Kết quả là ranh giới nằm ở phía
+    output >= target (với runway là chỉ số nguyên, đó là giá trị xa nhất còn đạt mục tiêu).
+    Cả hai đầu khoảng đều đạt mục tiêu -> lower (vd. tăng trưởng thấp nhất của khoảng đã đủ);
+    không đầu nào đạt -> NaN.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"output phải là một trong {OUTPUTS}")
+    inputs = BREAK_EVEN_INPUTS if output == "break_even" else DRIVERS
+    if solve_for not in inputs:
+        raise ValueError(f"solve_for phải là một trong {inputs}")
+    missing = [name for name in inputs if name != solve_for and name not in params]
+    if missing:
+        raise ValueError(f"Thiếu tham số: {missing}")
+
+    others = {name: np.asarray(params[name], dtype=np.float64) for name in inputs if name != solve_for}
+    target, lo, hi = np.broadcast_arrays(*(
+        np.asarray(x, dtype=np.float64) for x in (target, lower, upper)
+    ))
+    shape = np.broadcast_shapes(target.shape, *(x.shape for x in others.values()))
+    target, lo, hi = (np.broadcast_to(x, shape).astype(np.float64) for x in (target, lo, hi))
+
+    def reached(x):
+        with np.errstate(invalid="ignore"):
+            return _model(output, {**others, solve_for: x}, months) >= target
+
+    ok_lo = reached(lo)
+    ok_hi = reached(hi)
+    solvable = ok_lo != ok_hi
+
+    # Giữ `good` ở phía đạt mục tiêu, `bad` ở phía không đạt
+    good = np.where(ok_lo, lo, hi)
+    bad = np.where(ok_lo, hi, lo)
+    for _ in range(max_iter):
+        active = solvable & (np.abs(bad - good) > tol * np.maximum(1.0, np.abs(good)))
+        if not active.any():
+            break
+        mid = (good + bad) / 2
+        hit = reached(mid)
+        good = np.where(active & hit, mid, good)
+        bad = np.where(active & ~hit, mid, bad)
+
+    good = np.where(solvable, good, np.where(ok_lo & ok_hi, lo, np.nan))
+    return good if good.ndim else float(good)
+
+
+def required_growth(
+    min_cash_floor,
+    initial_cash,
+    revenue,
+    fixed_cost,
+    var_ratio,
+    months=24,
+    lower=-0.5,
+    upper=1.0
+):
+    """
+    Tăng trưởng doanh thu hàng tháng tối thiểu để số dư tiền mặt không xuống dưới
+    `min_cash_floor` trong `months` tháng. Trả về lower nếu ngay tăng trưởng lower đã đủ.
+    """
+    return goal_seek(
+        "min_cash", min_cash_floor, "growth",
+        {"initial_cash": initial_cash, "revenue": revenue, "fixed_cost": fixed_cost, "var_ratio": var_ratio},
+        lower, upper, months
+    )
+
+
+def max_fixed_cost(
+    runway_months,
+    initial_cash,
+    revenue,
+    growth,
+    var_ratio,
+    upper=None
+):
+    """
+    Chi phí cố định hàng tháng cao nhất mà vẫn giữ số dư >= 0 trong `runway_months` tháng.
+    runway_months có thể là mảng (nhiều mục tiêu runway).
+    """
+    runway_months = np.asarray(runway_months, dtype=np.int64)
+    if upper is None:
+        # Chi phí cố định vượt tiền ban đầu + doanh thu tháng 1 thì chắc chắn âm ngay tháng 1
+        upper = np.abs(initial_cash) + np.abs(revenue) + 1.0
+    if runway_months.ndim == 0:
+        return goal_seek(
+            "min_cash", 0.0, "fixed_cost",
+            {"initial_cash": initial_cash, "revenue": revenue, "growth": growth, "var_ratio": var_ratio},
+            0.0, upper, int(runway_months)
+        )
+
+    # Mỗi mục tiêu runway một kỳ hạn khác nhau: nhóm theo kỳ hạn
+    result = np.empty(np.broadcast_shapes(runway_months.shape, np.shape(upper)), dtype=np.float64)
+    runway_months = np.broadcast_to(runway_months, result.shape)
+    for m in np.unique(runway_months):
+        mask = runway_months == m
+        result[mask] = np.broadcast_to(goal_seek(
+            "min_cash", 0.0, "fixed_cost",
+            {"initial_cash": initial_cash, "revenue": revenue, "growth": growth, "var_ratio": var_ratio},
+            0.0, upper, int(m)
+        ), result.shape)[mask]
+    return result
+
+
+def min_price(target_volume, fixed_cost, variable_cost):
+    """
+    Giá bán tối thiểu để hòa vốn tại sản lượng `target_volume`: p = v + F / Q.
+    Dạng đóng của goal_seek("break_even", Q, "price", ...), vector hóa theo mảng.
+    """
+    target_volume, fixed_cost, variable_cost = (
+        np.asarray(x, dtype=np.float64) for x in (target_volume, fixed_cost, variable_cost)
+    )
+    with np.errstate(divide="ignore"):
+        price = variable_cost + fixed_cost / target_volume
+    return price if price.ndim else float(price)
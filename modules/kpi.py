@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+# Định dạng ngày thử lần lượt khi dò; ngày-trước-tháng đứng trước tháng-trước-ngày
+# vì file xuất ở Việt Nam thường dùng dd/mm/yyyy
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%m/%d/%Y",
+    "%Y%m%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S"
+)
+DATE_SAMPLE_SIZE = 50
+
+
+@functools.lru_cache(maxsize=256)
+def detect_date_format(sample):
+    """
+    Định dạng đầu tiên trong DATE_FORMATS parse được mọi giá trị của sample
+    (tuple chuỗi ngày). None nếu không định dạng nào khớp -> để pandas tự suy luận.
+    """
+    if not sample:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            pd.to_datetime(pd.Series(sample, dtype=object), format=date_format)
+        except (ValueError, TypeError):
+            continue
+        return date_format
+    return None
+
+
+def _parse_dates(codes, uniques, date_format):
+    # Chỉ parse các giá trị khác nhau của chunk; mã -1 (ô trống) -> NaT.
+    # Giá trị không khớp date_format (file đổi định dạng giữa chừng) được dò lại định dạng
+    # trên chính các giá trị đó. Trả về (ngày, các định dạng đã dùng, số dòng không đọc được).
+    present = np.array([v is not None and v == v and bool(str(v).strip()) for v in uniques], dtype=bool)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=date_format, errors="coerce").to_numpy(copy=True)
+    formats = [date_format]
+    failed = present & np.isnat(parsed)
+    while failed.any():
+        retry = detect_date_format(_sample(uniques[failed])) or _best_format(uniques[failed], formats)
+        if retry is None or retry in formats:
+            break
+        formats.append(retry)
+        parsed[failed] = pd.to_datetime(pd.Series(uniques[failed], dtype=object), format=retry, errors="coerce").to_numpy()
+        failed = present & np.isnat(parsed)
+
+    if not len(parsed):
+        return np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]"), formats, 0
+    dates = parsed[np.maximum(codes, 0)]
+    dates[codes < 0] = np.datetime64("NaT")
+    unparsed = int(np.count_nonzero(failed[codes[codes >= 0]]))
+    return dates, formats, unparsed
+
+
+def _best_format(values, exclude):
+    # Định dạng (chưa dùng) parse được nhiều giá trị nhất trong mẫu, khi mẫu lẫn ô rác
+    sample = pd.Series(_sample(values), dtype=object)
+    best, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        if date_format in exclude:
+            continue
+        count = pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum()
+        if count > best_count:
+            best, best_count = date_format, count
+    return best
+
+
+def _sample(uniques):
+    values = [str(v) for v in uniques[:DATE_SAMPLE_SIZE] if v is not None and v == v and str(v).strip()]
+    return tuple(values)
+
+
+def _downcast(values):
+    # float64 -> float32 chỉ khi mọi giá trị giữ nguyên sau khi đổi (không mất chính xác);
+    # int64 -> int32 khi nằm trong miền int32. Các chunk khác kiểu được nâng lại khi ghép.
+    if values.dtype == np.float64:
+        narrow = values.astype(np.float32)
+        with np.errstate(invalid="ignore"):
+            if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                return narrow
+    elif values.dtype == np.int64 and values.size:
+        info = np.iinfo(np.int32)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(np.int32)
+    return values
+
+
+def _arrow_chunks(source, date_col, dtype, block_size):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+
+    column_types = {name: pa.from_numpy_dtype(np.dtype(t)) for name, t in (dtype or {}).items()}
+    column_types[date_col] = pa.string()
+    reader = pv.open_csv(
+        source,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    empty = True
+    for batch in reader:
+        empty = False
+        columns = {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            if name == date_col:
+                encoded = pc.dictionary_encode(column)
+                codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False).astype(np.int64)
+                columns[name] = (codes, np.asarray(encoded.dictionary.to_pylist(), dtype=object))
+            elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+                # Cột số có ô trống -> float64 (NaN) như pandas
+                if column.null_count and not pa.types.is_floating(column.type):
+                    column = column.cast(pa.float64())
+                columns[name] = column.to_numpy(zero_copy_only=False)
+            else:
+                columns[name] = column.to_pandas()
+        yield columns
+
+    if empty:
+        # File chỉ có dòng tiêu đề: một chunk rỗng như C engine để kiểm tra cột giống nhau
+        yield {
+            name: (np.empty(0, dtype=np.int64), np.empty(0, dtype=object)) if name == date_col else np.empty(0)
+            for name in reader.schema.names
+        }
+
+
+def _pandas_chunks(source, date_col, dtype, chunksize):
+    reader = pd.read_csv(source, dtype={**(dtype or {}), date_col: object}, chunksize=chunksize)
+    for chunk in reader:
+        columns = {}
+        for name in chunk.columns:
+            if name == date_col:
+                codes, uniques = pd.factorize(chunk[name])
+                columns[name] = (codes, np.asarray(uniques, dtype=object))
+            elif pd.api.types.is_numeric_dtype(chunk[name]) and not pd.api.types.is_bool_dtype(chunk[name]):
+                columns[name] = chunk[name].to_numpy()
+            else:
+                columns[name] = chunk[name].reset_index(drop=True)
+        yield columns
+
+
+def read_kpi_csv(
+    source,
+    date_col="date",
+    dtype=None,
+    date_format=None,
+    engine="auto",
+    chunksize=1_000_000,
+    block_size=32 * 1024 ** 2,
+    downcast=True
+):
+    """
+    Đọc file KPI (CSV có cột ngày) theo từng chunk: pyarrow đọc luồng theo block_size byte
+    (engine "pyarrow"), hoặc pandas C engine theo chunksize dòng (engine "c");
+    "auto" = pyarrow nếu đã cài, tự quay về C engine nếu kiểu dữ liệu giữa các block không khớp.
+    dtype: kiểu khai báo cho từng cột (không khai báo -> suy luận từ dữ liệu).
+    Cột ngày parse theo date_format, hoặc định dạng dò trên chunk đầu (có cache); giá trị
+    không khớp được dò lại định dạng, phần vẫn không đọc được thành NaT và được đếm.
+    downcast=True: cột số chưa khai báo kiểu được thu về float32 / int32 khi không mất giá trị.
+
+    Trả về DataFrame sắp xếp theo ngày; attrs chứa engine, date_format, date_formats
+    (mọi định dạng đã dùng), unparsed_dates (số dòng có ngày không đọc được) và chunks.
+    """
+    if engine == "auto":
+        try:
+            import pyarrow.csv  # noqa: F401
+            engine = "pyarrow"
+        except ImportError:
+            engine = "c"
+
+    if engine == "pyarrow":
+        import pyarrow as pa
+        try:
+            return _read_kpi_chunks(
+                _arrow_chunks(source, date_col, dtype, block_size), "pyarrow", date_col, dtype, date_format, downcast
+            )
+        except pa.ArrowInvalid:
+            # Đường dẫn: C engine tự mở lại file; file-like phải tua lại được
+            if not isinstance(source, (str, os.PathLike)):
+                if not hasattr(source, "seek"):
+                    raise
+                source.seek(0)
+    return _read_kpi_chunks(
+        _pandas_chunks(source, date_col, dtype, chunksize), "c", date_col, dtype, date_format, downcast
+    )
+
+
+def _read_kpi_chunks(chunks, engine, date_col, dtype, date_format, downcast):
+    declared = set(dtype or {})
+    parts = {}
+    n_chunks = 0
+    date_formats = []
+    unparsed = 0
+    for columns in chunks:
+        if date_col not in columns:
+            raise ValueError(f"Thiếu cột: {[date_col]}")
+        codes, uniques = columns[date_col]
+        if date_format is None:
+            date_format = detect_date_format(_sample(uniques)) or _best_format(uniques, ())
+        columns[date_col], formats, chunk_unparsed = _parse_dates(codes, uniques, date_format)
+        date_formats += [f for f in formats if f not in date_formats]
+        unparsed += chunk_unparsed
+        for name, values in columns.items():
+            if downcast and name not in declared and isinstance(values, np.ndarray) and name != date_col:
+                values = _downcast(values)
+            parts.setdefault(name, []).append(values)
+        n_chunks += 1
+
+    if not parts:
+        raise ValueError(f"Thiếu cột: {[date_col]}")
+
+    data = {}
+    for name, values in parts.items():
+        if all(isinstance(v, np.ndarray) for v in values):
+            data[name] = np.concatenate(values) if len(values) > 1 else values[0]
+        else:
+            # Cột số ở chunk này nhưng là chuỗi ở chunk khác (C engine suy luận theo chunk)
+            data[name] = pd.concat([pd.Series(v) for v in values], ignore_index=True)
+    df = pd.DataFrame(data)
+    if df.empty:
+        raise ValueError("File không có dòng dữ liệu nào")
+
+    if not df[date_col].is_monotonic_increasing:
+        df = df.sort_values(date_col, kind="stable").reset_index(drop=True)
+    df.attrs.update({
+        "engine": engine,
+        "date_format": date_format,
+        "date_formats": date_formats,
+        "unparsed_dates": unparsed,
+        "chunks": n_chunks
+    })
+    return df
+
+
+def page_frame(df, page=1, page_size=100):
+    """
+    Một trang của df để xem trước (thay vì gửi cả bảng lên trình duyệt).
+    Trả về (các dòng của trang, số trang).
+    """
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(int(page), 1), n_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], n_pages
+
+
+def plot_frame(df, columns, date_col="date", max_points=2000):
+    """
+    Bảng gọn để vẽ biểu đồ (thay vì gửi cả df lên trình duyệt): tối đa max_points điểm.
+    File lớn được gom theo thứ tự thời gian thành các nhóm dòng liên tiếp
+    (ngày đầu nhóm, trung bình giá trị); dòng thiếu ngày bị bỏ.
+    Trả về (bảng, số dòng mỗi nhóm; 1 = không gom).
+    """
+    columns = list(dict.fromkeys(columns))
+    data = df.loc[df[date_col].notna(), [date_col, *columns]]
+    if len(data) <= max_points:
+        return data, 1
+
+    size = -(-len(data) // max_points)
+    groups = np.arange(len(data)) // size
+    values = data[columns].groupby(groups).mean()
+    values.insert(0, date_col, data[date_col].to_numpy()[::size])
+    return values.reset_index(drop=True), size
+
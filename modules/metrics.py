@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import ast
+
+import numpy as np
+import pandas as pd
+
+_BINARY = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power
+}
+_UNARY = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive
+}
+
+
+def _div0(numerator, denominator, out=None):
+    # Mẫu số = 0 -> 0 (quy ước của extended_financial_ratios); out có thể trùng mẫu số
+    zero = np.asarray(denominator) == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.divide(numerator, denominator, out=out)
+    if np.ndim(result) == 0:
+        return np.float64(0.0) if zero else result
+    result[np.broadcast_to(zero, result.shape)] = 0.0
+    return result
+
+
+_FUNCTIONS = {
+    "div0": _div0,
+    "abs": np.abs,
+    "maximum": np.maximum,
+    "minimum": np.minimum
+}
+
+
+class MetricRegistry:
+    """
+    Bộ định nghĩa chỉ tiêu phái sinh dạng biểu thức trên các cột gốc,
+    vd. {"Gross_Profit": "Revenue - COGS", "Gross_Margin": "Gross_Profit / Revenue"}.
+    Biểu thức chỉ gồm tên cột, hằng số, + - * / **, và hàm div0 / abs / maximum / minimum.
+    Thứ tự tính được suy ra từ phụ thuộc; biểu thức con lặp lại chỉ tính một lần.
+    defaults: giá trị thay cho cột gốc không có trong dữ liệu (vd. {"Long_Term_Debt": 0}).
+    """
+
+    def __init__(self, metrics=None, defaults=None):
+        self._trees = {}
+        self._expressions = {}
+        self.defaults = dict(defaults or {})
+        for name, expression in (metrics or {}).items():
+            self.define(name, expression)
+
+    def define(self, name, expression):
+        tree = ast.parse(expression, mode="eval").body
+        for node in ast.walk(tree):
+            _check_node(node)
+        self._trees[name] = tree
+        self._expressions[name] = expression
+        return self
+
+    @property
+    def names(self):
+        return list(self._trees)
+
+    def expression(self, name):
+        return self._expressions[name]
+
+    def dependencies(self, name):
+        """
+        Các tên (cột gốc hoặc chỉ tiêu khác) mà biểu thức của name tham chiếu.
+        """
+        return {
+            node.id for node in ast.walk(self._trees[name])
+            if isinstance(node, ast.Name) and node.id not in _FUNCTIONS
+        }
+
+    def order(self, targets=None):
+        """
+        Các chỉ tiêu cần tính (gồm cả chỉ tiêu trung gian) theo thứ tự phụ thuộc.
+        """
+        targets = self.names if targets is None else list(targets)
+        ordered, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Phụ thuộc vòng: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in sorted(self.dependencies(name)):
+                if dep in self._trees:
+                    visit(dep, path + [name])
+            state[name] = "done"
+            ordered.append(name)
+
+        for name in targets:
+            if name not in self._trees:
+                raise KeyError(f"Chưa định nghĩa chỉ tiêu {name}")
+            visit(name, [])
+        return ordered
+
+    def base_columns(self, targets=None):
+        """
+        Các cột gốc mà targets cần tới.
+        """
+        needed = set()
+        for name in self.order(targets):
+            needed |= {d for d in self.dependencies(name) if d not in self._trees}
+        return needed
+
+    def evaluate(self, data, targets=None, inplace=False):
+        """
+        Tính các chỉ tiêu trên DataFrame / dict cột trong một lượt.
+        Biểu thức con xuất hiện nhiều lần (kể cả giữa các chỉ tiêu) được tính một lần;
+        kết quả trung gian không dùng chung được ghi đè tại chỗ (out=) thay vì cấp phát mới.
+        inplace=True ghi các cột vào data (DataFrame) và trả về data,
+        ngược lại trả về DataFrame mới chỉ gồm các chỉ tiêu.
+        """
+        order = self.order(targets)
+        targets = self.names if targets is None else list(targets)
+        targets = [name for name in self.names if name in set(targets)]
+
+        missing = [c for c in self.base_columns(targets) if c not in data and c not in self.defaults]
+        if missing:
+            raise ValueError(f"Thiếu cột: {sorted(missing)}")
+
+        index = data.index if isinstance(data, pd.DataFrame) else None
+        evaluator = _Evaluator(self, data, [self._trees[name] for name in order])
+        for name in order:
+            evaluator.values[name] = evaluator.evaluate(self._trees[name])
+
+        if inplace:
+            for name in targets:
+                data[name] = evaluator.values[name]
+            return data
+        return pd.DataFrame({name: evaluator.values[name] for name in targets}, index=index)
+
+
+def _check_node(node):
+    allowed = (
+        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Constant, ast.Call, ast.Load,
+        *_BINARY, *_UNARY
+    )
+    if not isinstance(node, allowed):
+        raise ValueError(f"Biểu thức không hỗ trợ: {type(node).__name__}")
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ValueError("Chỉ hỗ trợ các hàm: " + ", ".join(_FUNCTIONS))
+    if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+        raise ValueError("Hằng số phải là số")
+
+
+class _Evaluator:
+    """
+    Duyệt cây biểu thức một lượt. Khóa biểu thức con = ast.dump (đã chuẩn hóa),
+    biểu thức con xuất hiện >= 2 lần được giữ lại để dùng chung.
+    """
+
+    def __init__(self, registry, data, trees):
+        self.registry = registry
+        self.data = data
+        self.values = {}
+        self.shared = {}
+        counts = {}
+        for tree in trees:
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Call)):
+                    key = ast.dump(node)
+                    counts[key] = counts.get(key, 0) + 1
+        self.repeated = {key for key, count in counts.items() if count > 1}
+
+    def column(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name in self.data:
+            values = np.asarray(self.data[name], dtype=np.float64)
+        else:
+            values = np.float64(self.registry.defaults[name])
+        self.values[name] = values
+        return values
+
+    def evaluate(self, node):
+        return self._eval(node)[0]
+
+    def _eval(self, node):
+        # -> (giá trị, owned): owned = mảng tạm không ai khác tham chiếu, ghi đè được
+        if isinstance(node, ast.Name):
+            return self.column(node.id), False
+        if isinstance(node, ast.Constant):
+            return np.float64(node.value), False
+
+        key = ast.dump(node)
+        if key in self.shared:
+            return self.shared[key], False
+
+        if isinstance(node, ast.BinOp):
+            left, left_owned = self._eval(node.left)
+            right, right_owned = self._eval(node.right)
+            out = _out_buffer((left, left_owned), (right, right_owned))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result = _BINARY[type(node.op)](left, right, out=out)
+        elif isinstance(node, ast.UnaryOp):
+            operand, owned = self._eval(node.operand)
+            result = _UNARY[type(node.op)](operand, out=_out_buffer((operand, owned)))
+        else:
+            args = [self._eval(arg) for arg in node.args]
+            result = _FUNCTIONS[node.func.id](*(a for a, _ in args), out=_out_buffer(*args))
+
+        if key in self.repeated:
+            self.shared[key] = result
+            return result, False
+        return result, isinstance(result, np.ndarray) and result.ndim > 0
+
+
+def _out_buffer(*operands):
+    # Dùng lại mảng tạm của toán hạng nếu cùng shape với kết quả
+    shape = np.broadcast_shapes(*(np.shape(value) for value, _ in operands))
+    for value, owned in operands:
+        if owned and value.shape == shape and value.dtype == np.float64:
+            return value
+    return None
@@ -3,16 +3,62 @@
 
 # In[ ]:
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
+from scipy.stats import norm, qmc, t as student_t
+
+from modules.cache import cached
+
+SAMPLING_METHODS = ("random", "sobol", "lhs")
+
+
+def _standard_normals(n, d, sampling, rng, antithetic=False):
+    """
+    Ma trận (n, d) các biến N(0, 1) độc lập theo phương pháp lấy mẫu:
+    "random" (giả ngẫu nhiên), "sobol" (Sobol xáo trộn), "lhs" (Latin Hypercube).
+    antithetic=True dùng một nửa số điểm và ghép thêm các điểm đối xứng -z.
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"sampling phải là một trong {SAMPLING_METHODS}")
 
+    m = (n + 1) // 2 if antithetic else n
+    if sampling == "random":
+        z = rng.standard_normal((m, d))
+    else:
+        if sampling == "sobol":
+            # Sobol giữ tính cân bằng khi số điểm là lũy thừa của 2
+            engine = qmc.Sobol(d, scramble=True, seed=rng)
+            u = engine.random_base2(max(int(np.ceil(np.log2(max(m, 1)))), 0))[:m]
+        else:
+            u = qmc.LatinHypercube(d, seed=rng).random(m)
+        z = norm.ppf(np.clip(u, 1e-12, 1 - 1e-12))
+
+    if antithetic:
+        z = np.concatenate([z, -z])[:n]
+    return z
+
+
+@cached()
 def monte_carlo_profit(
     n_simulations,
     price_mean, price_std,
     demand_mean, demand_std,
-    fixed_cost, variable_cost
+    fixed_cost, variable_cost,
+    seed=None,
+    sampling="random",
+    antithetic=False
 ):
-    price = np.random.normal(price_mean, price_std, n_simulations)
-    demand = np.random.normal(demand_mean, demand_std, n_simulations)
+    rng = np.random.default_rng(seed)
+    if sampling == "random" and not antithetic:
+        price = rng.normal(price_mean, price_std, n_simulations)
+        demand = rng.normal(demand_mean, demand_std, n_simulations)
+    else:
+        z = _standard_normals(n_simulations, 2, sampling, rng, antithetic)
+        price = price_mean + price_std * z[:, 0]
+        demand = demand_mean + demand_std * z[:, 1]
 
     revenue = price * demand
     total_cost = fixed_cost + variable_cost * demand
@@ -21,3 +67,410 @@ def monte_carlo_profit(
     return profit
 
 
+class SimulationStats:
+    """
+    Thống kê cộng dồn của lợi nhuận mô phỏng: mean, variance, xác suất lỗ
+    và histogram bin cố định (kèm 2 bin tràn) để ước lượng quantile.
+    Hai bản thống kê cùng biên [lower, upper] và cùng số bin có thể gộp (merge).
+    """
+
+    def __init__(self, lower, upper, bins=4096):
+        if not upper > lower:
+            raise ValueError("upper phải lớn hơn lower")
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.bins = int(bins)
+        # counts[0]: < lower, counts[1..bins]: các bin, counts[-1]: >= upper
+        self.counts = np.zeros(self.bins + 2, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.losses = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values, bins=4096):
+        """
+        Tóm tắt một mảng kết quả có sẵn: biên histogram = [min, max] của mảng.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return cls(0.0, 1.0, bins)
+        lower, upper = float(values.min()), float(values.max())
+        if upper == lower:
+            upper = lower + max(abs(lower), 1.0)
+        return cls(lower, upper, bins).update(values)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        n = values.size
+        if n == 0:
+            return self
+
+        chunk_mean = values.mean()
+        dev = values - chunk_mean
+        self._merge_moments(n, chunk_mean, float(np.dot(dev, dev)))
+        del dev
+
+        self.losses += int(np.count_nonzero(values < 0))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        self.counts += np.bincount(self.bin_index(values), minlength=self.bins + 2)
+        return self
+
+    def bin_index(self, values):
+        """
+        Chỉ số bin trong self.counts của từng giá trị (0 = tràn dưới, bins + 1 = tràn trên).
+        """
+        scale = self.bins / (self.upper - self.lower)
+        idx = np.floor((np.asarray(values, dtype=np.float64) - self.lower) * scale)
+        np.clip(idx, -1, self.bins, out=idx)
+        return idx.astype(np.int64) + 1
+
+    def merge(self, other):
+        if (other.lower, other.upper, other.bins) != (self.lower, self.upper, self.bins):
+            raise ValueError("Chỉ gộp được thống kê có cùng biên và số bin")
+        if other.count == 0:
+            return self
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.losses += other.losses
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.counts += other.counts
+        return self
+
+    def _merge_moments(self, n, mean, m2):
+        # Công thức gộp song song (Chan et al.)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    @property
+    def loss_probability(self):
+        return self.losses / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """
+        Quantile xấp xỉ từ histogram (nội suy tuyến tính trong bin),
+        sai số tối đa bằng độ rộng một bin.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        width = (self.upper - self.lower) / self.bins
+        left = np.empty(self.bins + 2)
+        left[0] = min(self.min, self.lower)
+        left[1:-1] = self.lower + width * np.arange(self.bins)
+        left[-1] = self.upper
+        right = np.empty(self.bins + 2)
+        right[:-1] = np.append(left[1:-1], self.upper)
+        right[-1] = max(self.max, self.upper)
+
+        cum = np.cumsum(self.counts)
+        target = np.clip(q, 0.0, 1.0) * self.count
+        i = np.minimum(np.searchsorted(cum, target, side="left"), self.bins + 1)
+        before = cum[i] - self.counts[i]
+        frac = np.where(self.counts[i] > 0, (target - before) / np.maximum(self.counts[i], 1), 0.0)
+        value = left[i] + frac * (right[i] - left[i])
+        return np.clip(value, self.min, self.max)
+
+    def quantile_curve(self, points=200):
+        """
+        Hàm phân vị rời rạc (thay cho việc vẽ np.sort(mảng đầy đủ)):
+        DataFrame `points` dòng, index là phân vị theo %, kích thước không phụ thuộc n.
+        """
+        q = np.linspace(0.0, 1.0, points)
+        return pd.DataFrame({"Value": self.quantile(q)}, index=pd.Index(q * 100, name="Percentile"))
+
+    def to_dict(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        return {
+            "n": self.count,
+            "mean": float(self.mean),
+            "std": self.std,
+            "variance": float(self.variance),
+            "loss_probability": self.loss_probability,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": dict(zip(quantiles, self.quantile(quantiles).tolist()))
+        }
+
+
+def profit_bounds(price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost, width=8.0):
+    """
+    Biên histogram lấy từ mean/std giải tích của profit = D * (P - v) - F
+    (P, D độc lập) để mọi chunk dùng chung bin mà không cần đọc trước dữ liệu.
+    """
+    margin = price_mean - variable_cost
+    mean = demand_mean * margin - fixed_cost
+    var = (
+        demand_std ** 2 * price_std ** 2
+        + demand_std ** 2 * margin ** 2
+        + demand_mean ** 2 * price_std ** 2
+    )
+    half = width * np.sqrt(var)
+    if half == 0:
+        half = max(abs(mean), 1.0)
+    return mean - half, mean + half
+
+
+def _chunk_seed(root, index):
+    # Tương đương root.spawn(...)[index] nhưng không phải tạo trước mọi con
+    return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (index,))
+
+
+def _simulate_chunk_values(size, seed_seq, params):
+    price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost = params
+
+    rng = np.random.default_rng(seed_seq)
+    profit = rng.normal(price_mean, price_std, size)
+    demand = rng.normal(demand_mean, demand_std, size)
+
+    # profit = (price - variable_cost) * demand - fixed_cost, tính tại chỗ
+    profit -= variable_cost
+    profit *= demand
+    profit -= fixed_cost
+    return profit
+
+
+def _simulate_chunk(task):
+    size, seed_seq, params, lower, upper, bins = task
+    profit = _simulate_chunk_values(size, seed_seq, params)
+    return SimulationStats(lower, upper, bins).update(profit)
+
+
+def _chunk_tasks(n_simulations, params, chunk_size, seed, bins):
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    lower, upper = profit_bounds(*params)
+    n_chunks = -(-n_simulations // chunk_size)
+    for i in range(n_chunks):
+        size = min(chunk_size, n_simulations - i * chunk_size)
+        yield size, _chunk_seed(root, i), params, lower, upper, bins
+
+
+def profit_chunks(
+    n_simulations,
+    price_mean, price_std,
+    demand_mean, demand_std,
+    fixed_cost, variable_cost,
+    chunk_size=1_000_000,
+    seed=None
+):
+    """
+    Sinh lần lượt mảng lợi nhuận của từng chunk (tối đa chunk_size phần tử), cùng luồng
+    ngẫu nhiên với monte_carlo_profit_stream: cùng seed và chunk_size cho đúng các giá trị
+    mà hàm đó thống kê. Dùng khi cần xử lý / lưu từng chunk mà không giữ cả mảng.
+    """
+    params = (price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost)
+    for size, seed_seq, params, *_ in _chunk_tasks(int(n_simulations), params, int(chunk_size), seed, 0):
+        yield _simulate_chunk_values(size, seed_seq, params)
+
+
+@cached()
+def monte_carlo_profit_stream(
+    n_simulations,
+    price_mean, price_std,
+    demand_mean, demand_std,
+    fixed_cost, variable_cost,
+    chunk_size=1_000_000,
+    seed=None,
+    bins=4096,
+    n_workers=None
+):
+    """
+    Mô phỏng Monte Carlo theo từng chunk với bộ nhớ cố định (~ chunk_size phần tử),
+    không giữ mảng lợi nhuận đầy đủ. Trả về SimulationStats.
+    Với n nhỏ cần mảng kết quả, dùng monte_carlo_profit.
+
+    n_workers > 1 (hoặc -1 = số CPU) chạy các chunk trên process pool. Mỗi chunk
+    có luồng ngẫu nhiên con riêng sinh từ seed gốc và kết quả được gộp theo thứ tự
+    chunk, nên cùng seed và chunk_size cho kết quả giống hệt với mọi số worker.
+    Trang 1 gọi tuần tự (tối đa 1 triệu lần = một chunk); n_workers dành cho việc gọi
+    từ script / notebook với n lớn hơn nhiều chunk.
+    """
+    params = (price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost)
+    tasks = _chunk_tasks(int(n_simulations), params, int(chunk_size), seed, bins)
+
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+
+    stats = None
+    if n_workers and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for chunk_stats in executor.map(_simulate_chunk, tasks):
+                stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+    else:
+        for chunk_stats in map(_simulate_chunk, tasks):
+            stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+
+    if stats is None:
+        stats = SimulationStats(*profit_bounds(*params), bins=bins)
+    return stats
+
+
+@cached()
+def monte_carlo_profit_auto(
+    price_mean, price_std,
+    demand_mean, demand_std,
+    fixed_cost, variable_cost,
+    tol_mean=None,
+    tol_loss=0.005,
+    confidence=0.95,
+    sampling="sobol",
+    antithetic=False,
+    n_replicates=8,
+    initial_size=256,
+    max_simulations=1_000_000,
+    seed=None
+):
+    """
+    Mô phỏng tự dừng khi khoảng tin cậy của lợi nhuận kỳ vọng và xác suất lỗ
+    đủ hẹp (nửa độ rộng <= tol_mean và <= tol_loss).
+
+    Dùng n_replicates chuỗi mẫu độc lập (Sobol/LHS xáo trộn ngẫu nhiên); sai số được
+    ước lượng từ độ phân tán giữa các chuỗi. Mỗi vòng gấp đôi số điểm của mỗi chuỗi.
+    tol_mean=None nghĩa là 1% của max(|lợi nhuận kỳ vọng|, độ lệch chuẩn lợi nhuận):
+    quanh điểm hòa vốn kỳ vọng ~ 0 nên sai số được so với độ phân tán thay vì với 0.
+    Kết quả kèm "stats" (SimulationStats của mọi điểm đã mô phỏng) để vẽ phân phối.
+    """
+    if n_replicates < 2:
+        raise ValueError("n_replicates phải >= 2 để ước lượng sai số")
+
+    root = np.random.SeedSequence(seed)
+    rngs = [np.random.default_rng(s) for s in root.spawn(n_replicates)]
+    engines = [qmc.Sobol(2, scramble=True, seed=rng) for rng in rngs] if sampling == "sobol" else None
+
+    sums = np.zeros(n_replicates)
+    losses = np.zeros(n_replicates)
+    stats = SimulationStats(*profit_bounds(price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost))
+    per_replicate = 0
+    batch = int(initial_size)
+    t_crit = student_t.ppf(0.5 + confidence / 2, n_replicates - 1)
+
+    while True:
+        for r in range(n_replicates):
+            if engines is not None:
+                # Tiếp tục cùng một dãy Sobol để tổng số điểm luôn là lũy thừa của 2
+                u = engines[r].random(batch)
+                z = norm.ppf(np.clip(u, 1e-12, 1 - 1e-12))
+                if antithetic:
+                    z = np.concatenate([z, -z])
+            else:
+                z = _standard_normals(batch * (2 if antithetic else 1), 2, sampling, rngs[r], antithetic)
+
+            price = price_mean + price_std * z[:, 0]
+            demand = demand_mean + demand_std * z[:, 1]
+            profit = (price - variable_cost) * demand - fixed_cost
+            sums[r] += profit.sum()
+            losses[r] += np.count_nonzero(profit < 0)
+            stats.update(profit)
+
+        per_replicate += batch * (2 if antithetic else 1)
+        means = sums / per_replicate
+        loss_probs = losses / per_replicate
+
+        mean = float(means.mean())
+        loss_probability = float(loss_probs.mean())
+        mean_ci = float(t_crit * means.std(ddof=1) / np.sqrt(n_replicates))
+        loss_ci = float(t_crit * loss_probs.std(ddof=1) / np.sqrt(n_replicates))
+
+        target_mean = tol_mean if tol_mean is not None else 0.01 * max(abs(mean), stats.std)
+        converged = mean_ci <= target_mean and loss_ci <= tol_loss
+        n_total = per_replicate * n_replicates
+        if converged or n_total * 2 > max_simulations:
+            break
+        batch = per_replicate // (2 if antithetic else 1)
+
+    return {
+        "mean": mean,
+        "loss_probability": loss_probability,
+        "mean_ci": mean_ci,
+        "loss_ci": loss_ci,
+        "n_simulations": n_total,
+        "converged": converged,
+        "stats": stats
+    }
+
+
+def _driver_values(z, spec):
+    dist = spec.get("dist", "normal")
+    if dist == "normal":
+        return spec["mean"] + spec["std"] * z
+    if dist == "lognormal":
+        # mean/std là của chính biến (vd. giá, tỷ giá), không phải của log
+        cv2 = (spec["std"] / spec["mean"]) ** 2
+        sigma = np.sqrt(np.log1p(cv2))
+        mu = np.log(spec["mean"]) - sigma ** 2 / 2
+        return np.exp(mu + sigma * z)
+    if dist == "uniform":
+        return spec["low"] + (spec["high"] - spec["low"]) * norm.cdf(z)
+    raise ValueError(f"Phân phối không hỗ trợ: {dist}")
+
+
+@cached()
+def monte_carlo_drivers(
+    n_simulations,
+    drivers,
+    correlation=None,
+    profit=None,
+    seed=None,
+    sampling="random",
+    antithetic=False,
+    return_draws=False
+):
+    """
+    Mô phỏng nhiều biến đầu vào (driver) có tương quan trong một lần lấy mẫu.
+
+    drivers: dict tên -> spec, ví dụ
+        {"price": {"mean": 100, "std": 10},
+         "fx": {"dist": "lognormal", "mean": 24000, "std": 800},
+         "churn": {"dist": "uniform", "low": 0.02, "high": 0.08}}
+    correlation: ma trận tương quan (k x k) theo thứ tự của drivers, None = độc lập.
+        Tương quan áp lên các biến chuẩn gốc (Gaussian copula), rồi mới biến đổi
+        sang phân phối của từng driver.
+    profit: hàm nhận các driver theo tên (mảng numpy) hoặc chuỗi biểu thức cho
+        pandas.eval, ví dụ "(price - unit_cost) * demand - fixed_cost".
+        None thì trả về dict các mảng driver.
+    """
+    names = list(drivers)
+    k = len(names)
+    rng = np.random.default_rng(seed)
+    z = _standard_normals(n_simulations, k, sampling, rng, antithetic)
+
+    if correlation is not None:
+        corr = np.asarray(correlation, dtype=np.float64)
+        if corr.shape != (k, k):
+            raise ValueError(f"Ma trận tương quan phải có kích thước ({k}, {k})")
+        if not np.allclose(corr, corr.T) or not np.allclose(np.diag(corr), 1.0):
+            raise ValueError("Ma trận tương quan phải đối xứng và có đường chéo bằng 1")
+        try:
+            chol = np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("Ma trận tương quan không xác định dương")
+        z = z @ chol.T
+
+    draws = {name: _driver_values(z[:, i], drivers[name]) for i, name in enumerate(names)}
+    del z
+
+    if profit is None:
+        return draws
+
+    if callable(profit):
+        result = profit(**draws)
+    else:
+        result = pd.eval(profit, local_dict=draws)
+    result = np.asarray(result, dtype=np.float64)
+
+    return (result, draws) if return_draws else result
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from modules.finance import FINANCIAL_STATEMENT_METRICS
+
+# Dòng tiền (cộng dồn theo cửa sổ) và số dư (lấy bình quân theo cửa sổ)
+ROLLING_FLOWS = ("Revenue", "Gross_Profit", "Operating_Profit", "Net_Profit")
+ROLLING_BALANCES = ("Total_Assets", "Equity")
+ROLLING_COLUMNS = ROLLING_FLOWS + ROLLING_BALANCES
+
+# Tỷ số trượt: (tử số, mẫu số). Mẫu số là số dư -> dùng số dư bình quân trong cửa sổ
+ROLLING_RATIOS = {
+    "TTM ROE": ("Net_Profit", "Equity"),
+    "TTM ROA": ("Net_Profit", "Total_Assets"),
+    "Rolling Asset Turnover": ("Revenue", "Total_Assets"),
+    "Rolling Gross Margin": ("Gross_Profit", "Revenue"),
+    "Rolling Operating Margin": ("Operating_Profit", "Revenue"),
+    "Rolling Net Margin": ("Net_Profit", "Revenue")
+}
+
+
+def _window_ratios(sums, count, ready):
+    """
+    sums: dict cột -> tổng trong cửa sổ (mảng), count: số kỳ trong cửa sổ.
+    Mẫu số = 0 -> 0 như extended_financial_ratios; chưa đủ kỳ -> NaN.
+    """
+    ratios = {}
+    for name, (numerator, denominator) in ROLLING_RATIOS.items():
+        den = sums[denominator] / count if denominator in ROLLING_BALANCES else sums[denominator]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(den != 0, sums[numerator] / den, 0.0)
+        ratios[name] = np.where(ready, value, np.nan)
+    return ratios
+
+
+def _statement_columns(df):
+    # Thiếu cột phái sinh (Gross_Profit, Net_Profit...) -> tính từ cột gốc qua registry
+    derived = [c for c in ROLLING_COLUMNS if c not in df and c in FINANCIAL_STATEMENT_METRICS.names]
+    values = FINANCIAL_STATEMENT_METRICS.evaluate(df, targets=derived) if derived else {}
+    return {
+        c: np.asarray(df[c] if c in df else values[c] if c in values else np.full(len(df), np.nan), dtype=np.float64)
+        for c in ROLLING_COLUMNS
+    }
+
+
+def rolling_ratios(df, window=12, entity_col=None, date_col="Date", min_periods=None):
+    """
+    Tỷ số trượt / TTM (ROE, ROA, vòng quay tài sản, các margin) cho từng kỳ,
+    tính theo từng thực thể nếu có entity_col (dữ liệu panel).
+    Tổng cửa sổ lấy từ hiệu tổng lũy kế trong từng nhóm: O(n) thay vì O(n·window).
+    Trả về DataFrame (thứ tự dòng như df) gồm entity / date và các cột tỷ số.
+    """
+    min_periods = window if min_periods is None else min_periods
+    n = len(df)
+
+    # Sắp xếp theo thực thể rồi ngày, nhớ vị trí gốc để trả về đúng thứ tự
+    keys = [c for c in (entity_col, date_col) if c is not None and c in df]
+    order = np.lexsort([df[c].to_numpy() for c in reversed(keys)]) if keys else np.arange(n)
+    columns = {c: v[order] for c, v in _statement_columns(df).items()}
+
+    if entity_col is not None:
+        entity = df[entity_col].to_numpy()[order]
+        starts = np.flatnonzero(np.r_[True, entity[1:] != entity[:-1]]) if n else np.array([], dtype=np.int64)
+    else:
+        starts = np.array([0] if n else [], dtype=np.int64)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+
+    # Vị trí trong nhóm và điểm bắt đầu cửa sổ
+    position = np.arange(n) - group_start
+    lower = np.maximum(np.arange(n) - window + 1, group_start)
+    count = np.arange(n) - lower + 1
+    ready = position + 1 >= min_periods
+
+    # NaN đếm riêng để một kỳ thiếu dữ liệu chỉ ảnh hưởng các cửa sổ chứa nó
+    sums = {}
+    for c, values in columns.items():
+        missing = np.isnan(values)
+        cum = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, values))])
+        cum_missing = np.concatenate([[0], np.cumsum(missing)])
+        window_sum = cum[np.arange(n) + 1] - cum[lower]
+        sums[c] = np.where(cum_missing[np.arange(n) + 1] - cum_missing[lower] > 0, np.nan, window_sum)
+
+    ratios = _window_ratios(sums, count, ready)
+    result = pd.DataFrame(ratios)
+    for c in reversed(keys):
+        result.insert(0, c, df[c].to_numpy()[order])
+
+    # Trả về theo thứ tự dòng gốc
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = np.arange(n)
+    return result.iloc[inverse].set_index(df.index)
+
+
+class RollingRatioEngine:
+    """
+    Bản tăng dần của rolling_ratios: giữ tổng cửa sổ theo từng thực thể,
+    append một kỳ mới chỉ cộng giá trị mới và trừ giá trị rơi khỏi cửa sổ (O(1)).
+    """
+
+    def __init__(self, window=12, min_periods=None):
+        self.window = int(window)
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self._windows = {}
+        self._sums = {}
+        self._missing = {}
+
+    def append(self, row, entity=None):
+        """
+        row: mapping có các cột ROLLING_COLUMNS (thiếu -> NaN). Trả về dict tỷ số trượt
+        của thực thể sau khi thêm kỳ này.
+        """
+        values = np.array([row.get(c, np.nan) for c in ROLLING_COLUMNS], dtype=np.float64)
+        missing = np.isnan(values)
+        values[missing] = 0.0
+
+        window = self._windows.setdefault(entity, deque())
+        sums = self._sums.setdefault(entity, np.zeros(len(ROLLING_COLUMNS)))
+        missing_count = self._missing.setdefault(entity, np.zeros(len(ROLLING_COLUMNS), dtype=np.int64))
+
+        window.append((values, missing))
+        sums += values
+        missing_count += missing
+        if len(window) > self.window:
+            old_values, old_missing = window.popleft()
+            sums -= old_values
+            missing_count -= old_missing
+        return self.ratios(entity)
+
+    def ratios(self, entity=None):
+        window = self._windows.get(entity)
+        count = len(window) if window else 0
+        if not count:
+            sums = dict.fromkeys(ROLLING_COLUMNS, np.nan)
+        else:
+            sums = dict(zip(ROLLING_COLUMNS, np.where(self._missing[entity] > 0, np.nan, self._sums[entity])))
+        ratios = _window_ratios(sums, max(count, 1), count >= self.min_periods and count > 0)
+        return {name: float(value) for name, value in ratios.items()}
+
+    def extend(self, df, entity_col=None):
+        """
+        Thêm nhiều kỳ (theo thứ tự dòng của df); trả về DataFrame tỷ số sau mỗi kỳ.
+        """
+        columns = _statement_columns(df)
+        entities = df[entity_col].to_numpy() if entity_col is not None else [None] * len(df)
+        records = [
+            self.append({c: columns[c][i] for c in ROLLING_COLUMNS}, entity)
+            for i, entity in enumerate(entities)
+        ]
+        return pd.DataFrame(records, index=df.index, columns=list(ROLLING_RATIOS))
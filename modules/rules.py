@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import functools
+import operator
+
+import numpy as np
+import pandas as pd
+
+# --------------------
+# BẢNG QUY TẮC
+# --------------------
+# Mỗi dòng: (ruleset, group, code, when, message, severity)
+# when: các điều kiện (chỉ số, phép so sánh, ngưỡng) nối bằng AND; ngưỡng có thể là
+# tên một chỉ số khác. when rỗng = nhánh "else" của nhóm (mode "first") hoặc
+# gợi ý mặc định khi không quy tắc nào khác khớp (mode "all").
+RULE_TABLE = (
+    # Đánh giá unit economics (assess_unit_economics)
+    ("ue_assessment", "Assessment", "strong",
+     (("LTV/CAC", ">=", 3), ("Payback (tháng)", "<=", 12), ("Gross Margin", ">=", 0.5), ("Churn", "<=", 0.08)),
+     "✅ RẤT KHẢ THI", "success"),
+    ("ue_assessment", "Assessment", "acceptable",
+     (("LTV/CAC", ">=", 2), ("Payback (tháng)", "<=", 18), ("Gross Margin", ">=", 0.3), ("Churn", "<=", 0.15)),
+     "⚠ CHẤP NHẬN ĐƯỢC (Early-stage)", "warning"),
+    ("ue_assessment", "Assessment", "risky", (),
+     "❌ RỦI RO CAO", "error"),
+
+    # Gợi ý unit economics (unit_economics_recommendations)
+    ("ue_recommendations", "LTV/CAC", "negative", (("LTV/CAC", "<", 1),),
+     "🚨 Mô hình đang đốt tiền trên mỗi khách hàng (LTV < CAC). Cần dừng scale và tái cấu trúc ngay.", "error"),
+    ("ue_recommendations", "LTV/CAC", "low", (("LTV/CAC", "<", 3),),
+     "⚠️ LTV/CAC thấp. Ưu tiên **giảm CAC** (kênh acquisition, tối ưu funnel) trước khi scale.", "warning"),
+    ("ue_recommendations", "LTV/CAC", "good", (),
+     "✅ LTV/CAC tốt. Có thể xem xét **tăng ngân sách marketing để scale**.", "success"),
+    ("ue_recommendations", "Payback", "slow", (("Payback (tháng)", ">", 12),),
+     "⏳ Thời gian hoàn vốn CAC dài (>12 tháng). Rủi ro dòng tiền cao → cần cải thiện retention hoặc pricing.", "warning"),
+    ("ue_recommendations", "Payback", "medium", (("Payback (tháng)", ">", 6),),
+     "⚠️ Payback ở mức trung bình. Theo dõi chặt dòng tiền khi mở rộng.", "warning"),
+    ("ue_recommendations", "Payback", "fast", (),
+     "⚡ Hoàn vốn CAC nhanh → phù hợp tăng trưởng nhanh.", "info"),
+    ("ue_recommendations", "Churn", "high", (("Churn", ">", 0.1),),
+     "🔥 Churn cao. Cần tập trung vào **product-market fit**, onboarding và customer success.", "error"),
+    ("ue_recommendations", "Churn", "medium", (("Churn", ">", 0.05),),
+     "⚠️ Churn trung bình. Có thể cải thiện bằng loyalty, subscription hoặc upsell.", "warning"),
+    ("ue_recommendations", "Churn", "low", (),
+     "💎 Churn thấp. Lợi thế lớn để tăng LTV dài hạn.", "info"),
+    ("ue_recommendations", "Gross Margin", "low", (("Gross Margin", "<", 0.4),),
+     "📉 Biên lợi nhuận thấp. Cần tối ưu chi phí biến đổi hoặc tăng giá trị sản phẩm.", "error"),
+    ("ue_recommendations", "Gross Margin", "medium", (("Gross Margin", "<", 0.6),),
+     "⚠️ Biên lợi nhuận ổn nhưng chưa mạnh. Tăng hiệu quả vận hành & tự động hóa.", "warning"),
+    ("ue_recommendations", "Gross Margin", "high", (),
+     "🏆 Biên lợi nhuận cao. Phù hợp mô hình scale bằng vốn.", "info"),
+    ("ue_recommendations", "Net Unit Profit", "negative", (("Net Unit Profit", "<", 0),),
+     "❌ Lợi nhuận đơn vị âm. Tuyệt đối không scale cho tới khi sửa được economics.", "error"),
+    ("ue_recommendations", "Net Unit Profit", "positive", (),
+     "💰 Mỗi khách hàng tạo lợi nhuận ròng. Có thể mở rộng quy mô có kiểm soát.", "info"),
+
+    # Kết luận PMF (trang Phân tích chiến lược)
+    ("pmf_verdict", "PMF", "Scale-ready",
+     (("emotional_fit_score", ">=", 40), ("value_fit_score", ">=", 60), ("economic_fit_score", ">=", 60)),
+     "🚀 STRONG PMF – Có thể scale có kiểm soát", "success"),
+    ("pmf_verdict", "PMF", "Optimize",
+     (("value_fit_score", ">=", 50), ("emotional_fit_score", ">=", 30)),
+     "🟡 PARTIAL PMF – Cần tối ưu sản phẩm trước khi scale", "warning"),
+    ("pmf_verdict", "PMF", "Fix", (),
+     "🔴 WEAK PMF – Chưa phù hợp thị trường", "error"),
+
+    # Gợi ý hành động PMF
+    ("pmf_actions", "Retention", "retention", (("retention_90d", "<", 0.4),),
+     "🔧 Cải thiện core value và onboarding để tăng retention", "warning"),
+    ("pmf_actions", "ICP", "icp", (("very_disappointed", "<", 0.4),),
+     "🎯 Làm rõ ICP và pain point chính của khách hàng", "warning"),
+    ("pmf_actions", "Pricing", "pricing", (("ltv_cac_ratio", "<", 3),),
+     "💰 Tối ưu pricing, packaging hoặc giảm CAC", "warning"),
+    ("pmf_actions", "Organic", "organic", (("organic_revenue_growth", "<", 0.05),),
+     "📣 Đẩy mạnh referral, word-of-mouth và usage loop", "warning"),
+    ("pmf_actions", "Default", "scale", (),
+     "✅ Có thể bắt đầu scale từng kênh với ngân sách kiểm soát", "success"),
+
+    # Kết luận chiến lược tăng trưởng
+    ("growth_verdict", "Growth", "Scale", (("growth_master_score", ">=", 70),),
+     "🚀 Tăng trưởng hiệu quả – Có thể scale", "success"),
+    ("growth_verdict", "Growth", "Optimize", (("growth_master_score", ">=", 50),),
+     "🟡 Tăng trưởng trung bình – Cần tối ưu", "warning"),
+    ("growth_verdict", "Growth", "Hold", (),
+     "🔴 Tăng trưởng rủi ro – Không nên scale", "error"),
+
+    # Gợi ý hành động tăng trưởng
+    ("growth_actions", "Organic", "organic", (("organic_ratio", "<", 0.5),),
+     "📣 Tăng referral & organic growth", "warning"),
+    ("growth_actions", "CAC", "cac", (("cac_growth_rate", ">", "revenue_growth_rate"),),
+     "💸 CAC tăng nhanh hơn doanh thu – tối ưu funnel", "warning"),
+    ("growth_actions", "Burn", "burn", (("burn_rate_pressure", ">", 0.6),),
+     "🔥 Kiểm soát burn rate trước khi scale", "warning"),
+    ("growth_actions", "Default", "stable", (),
+     "✅ Chiến lược tăng trưởng ổn định", "success")
+)
+
+# first: trong mỗi nhóm lấy quy tắc đầu tiên khớp (if / elif / else)
+# all: mọi quy tắc khớp đều áp dụng, quy tắc when rỗng chỉ dùng khi không có quy tắc nào khớp
+RULESET_MODES = {
+    "ue_assessment": "first",
+    "ue_recommendations": "first",
+    "pmf_verdict": "first",
+    "pmf_actions": "all",
+    "growth_verdict": "first",
+    "growth_actions": "all"
+}
+
+_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne
+}
+
+
+def rule_table():
+    """
+    Bảng quy tắc dạng DataFrame (để xem / xuất).
+    """
+    return pd.DataFrame(RULE_TABLE, columns=["ruleset", "group", "code", "when", "message", "severity"])
+
+
+class RuleSet:
+    """
+    Một ruleset đã biên dịch: mỗi điều kiện là một phép so sánh vector hóa trên cột
+    chỉ số, nên cùng bộ quy tắc áp dụng được cho một hồ sơ hay một bảng hàng triệu dòng.
+    So sánh với NaN luôn sai, giống if / elif của Python.
+    """
+
+    def __init__(self, name, rules, mode):
+        self.name = name
+        self.mode = mode
+        self.rules = rules
+        self.groups = list(dict.fromkeys(rule["group"] for rule in rules))
+        self.metrics = sorted({
+            term for rule in rules for metric, _, threshold in rule["when"]
+            for term in (metric, threshold) if isinstance(term, str)
+        })
+
+    def _columns(self, data):
+        missing = [m for m in self.metrics if m not in data]
+        if missing:
+            raise ValueError(f"Thiếu chỉ số cho ruleset {self.name}: {missing}")
+        return {m: np.atleast_1d(np.asarray(data[m], dtype=np.float64)) for m in self.metrics}
+
+    def masks(self, data):
+        """
+        Ma trận boolean (n x số quy tắc): quy tắc có khớp điều kiện hay không
+        (chưa xét thứ tự ưu tiên / nhánh else).
+        """
+        columns = self._columns(data)
+        n = len(next(iter(columns.values()))) if columns else 1
+        out = np.ones((n, len(self.rules)), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for j, rule in enumerate(self.rules):
+                for metric, op, threshold in rule["when"]:
+                    value = columns[threshold] if isinstance(threshold, str) else threshold
+                    out[:, j] &= _OPERATORS[op](columns[metric], value)
+        return out
+
+    def fired(self, data):
+        """
+        Ma trận boolean (n x số quy tắc) các quy tắc được áp dụng sau khi xét
+        thứ tự trong nhóm (mode "first") hoặc quy tắc mặc định (mode "all").
+        """
+        matched = self.masks(data)
+        if self.mode == "all":
+            default = np.array([not rule["when"] for rule in self.rules])
+            any_specific = matched[:, ~default].any(axis=1)
+            matched[:, default] = ~any_specific[:, None]
+            return matched
+
+        fired = np.zeros_like(matched)
+        for group in self.groups:
+            columns = [j for j, rule in enumerate(self.rules) if rule["group"] == group]
+            first = np.argmax(matched[:, columns], axis=1)
+            has_match = matched[:, columns].any(axis=1)
+            rows = np.flatnonzero(has_match)
+            fired[rows, np.asarray(columns)[first[rows]]] = True
+        return fired
+
+    def codes(self, data, index=None):
+        """
+        Mode "first": một cột categorical mã quy tắc cho mỗi nhóm.
+        Mode "all": một cột boolean cho mỗi quy tắc.
+        """
+        fired = self.fired(data)
+        if index is None and isinstance(data, pd.DataFrame):
+            index = data.index
+        if self.mode == "all":
+            return pd.DataFrame(fired, columns=[rule["code"] for rule in self.rules], index=index)
+
+        result = {}
+        for group in self.groups:
+            columns = [j for j, rule in enumerate(self.rules) if rule["group"] == group]
+            # Nhóm luôn có nhánh else nên mỗi dòng khớp đúng một quy tắc
+            position = np.argmax(fired[:, columns], axis=1)
+            result[group] = pd.Categorical.from_codes(
+                position, categories=[self.rules[j]["code"] for j in columns]
+            )
+        return pd.DataFrame(result, index=index)
+
+    def apply(self, values):
+        """
+        Áp dụng cho một hồ sơ (dict chỉ số vô hướng): danh sách (code, message, severity)
+        các quy tắc được áp dụng theo thứ tự bảng.
+        """
+        fired = self.fired(values)[0]
+        return [(rule["code"], rule["message"], rule["severity"]) for rule, hit in zip(self.rules, fired) if hit]
+
+    def messages(self, group=None):
+        """
+        Mã -> thông điệp (của một nhóm nếu có group).
+        """
+        return {
+            rule["code"]: rule["message"] for rule in self.rules
+            if group is None or rule["group"] == group
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(name):
+    """
+    Biên dịch ruleset name từ RULE_TABLE (một lần cho mỗi process).
+    """
+    if name not in RULESET_MODES:
+        raise KeyError(f"Không có ruleset {name}")
+    rules = [
+        {"group": group, "code": code, "when": when, "message": message, "severity": severity}
+        for ruleset, group, code, when, message, severity in RULE_TABLE
+        if ruleset == name
+    ]
+    for rule in rules:
+        for _, op, _ in rule["when"]:
+            if op not in _OPERATORS:
+                raise ValueError(f"Phép so sánh không hỗ trợ: {op}")
+    return RuleSet(name, rules, RULESET_MODES[name])
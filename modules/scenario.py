@@ -3,37 +3,92 @@
 
 # In[ ]:
 
+import numpy as np
 import pandas as pd
 
-def scenario_analysis(initial_cash, scenarios, months=24):
-    results = {}
-
-    for name, params in scenarios.items():
-        cash = initial_cash
-        revenue = params["revenue"]
-        growth = params["growth"]
-        fixed_cost = params["fixed_cost"]
-        var_ratio = params["var_ratio"]
-
-        data = []
-
-        for m in range(1, months + 1):
-            cost = fixed_cost + revenue * var_ratio
-            net_cf = revenue - cost
-            cash += net_cf
+from modules.cache import cached
+from modules.cashflow import cash_flow_arrays, resolve_start
 
-            data.append({
-                "Month": m,
-                "Cash Balance": cash,
-                "Revenue": revenue,
-                "Net Cash Flow": net_cf
-            })
+@cached(resolve=resolve_start)
+def scenario_analysis(initial_cash, scenarios, months=24, freq="M", start=None, payment_day=None):
+    names = list(scenarios)
+    forecast = scenario_batch(
+        initial_cash,
+        [scenarios[name]["revenue"] for name in names],
+        [scenarios[name]["growth"] for name in names],
+        [scenarios[name]["fixed_cost"] for name in names],
+        [scenarios[name]["var_ratio"] for name in names],
+        months,
+        layout="arrays",
+        freq=freq,
+        start=start,
+        payment_day=payment_day
+    )
+    step = {"Month": forecast.month} if freq == "M" else {"Date": forecast.dates}
 
-            revenue *= (1 + growth)
-
-        results[name] = pd.DataFrame(data)
+    results = {}
+    for i, name in enumerate(names):
+        results[name] = pd.DataFrame({
+            **step,
+            "Cash Balance": forecast.cash_balance[i],
+            "Revenue": forecast.revenue[i],
+            "Net Cash Flow": forecast.net_cash_flow[i]
+        })
 
     return results
 
 
+@cached(resolve=resolve_start)
+def scenario_batch(
+    initial_cash,
+    revenue,
+    growth,
+    fixed_cost,
+    var_ratio,
+    months=24,
+    names=None,
+    layout="wide",
+    freq="M",
+    start=None,
+    payment_day=None
+):
+    """
+    Tính đồng thời nhiều kịch bản dưới dạng ma trận (kịch bản x tháng).
+    revenue, growth, fixed_cost, var_ratio: mảng 1 chiều cùng độ dài (hoặc số vô hướng).
+    layout:
+        "wide"   - DataFrame index Month, mỗi cột là Cash Balance của một kịch bản
+        "long"   - DataFrame dạng dài: Scenario, Month, Cash Balance, Revenue, Net Cash Flow
+        "arrays" - CashFlowForecast (mảng numpy shape (n_scenarios, số bước))
+    freq / start / payment_day: bước thời gian theo ngày/tuần/tháng như cash_flow_arrays;
+    với "D"/"W" các bảng dùng cột/index "Date" thay cho "Month".
+    """
+    revenue, growth, fixed_cost, var_ratio = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (revenue, growth, fixed_cost, var_ratio))
+    )
+    forecast = cash_flow_arrays(
+        initial_cash, revenue, growth, fixed_cost, var_ratio, months,
+        freq=freq, start=start, payment_day=payment_day
+    )
+    if layout == "arrays":
+        return forecast
+
+    n_scenarios, steps = forecast.shape
+    if names is None:
+        names = np.arange(n_scenarios)
+    step_name, step = ("Month", forecast.month) if freq == "M" else ("Date", forecast.dates)
 
+    if layout == "wide":
+        return pd.DataFrame(
+            forecast.cash_balance.T,
+            index=pd.Index(step, name=step_name),
+            columns=list(names)
+        )
+    if layout == "long":
+        return pd.DataFrame({
+            "Scenario": np.repeat(np.asarray(names), steps),
+            step_name: np.tile(np.asarray(step), n_scenarios),
+            "Cash Balance": forecast.cash_balance.reshape(-1),
+            "Revenue": forecast.revenue.reshape(-1),
+            "Net Cash Flow": forecast.net_cash_flow.reshape(-1)
+        })
+    raise ValueError('layout phải là "wide", "long" hoặc "arrays"')
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.finance import (
+    HEALTH_LABELS,
+    HEALTH_PILLARS,
+    RATIO_INPUTS,
+    extended_financial_ratios_frame,
+    financial_health_assessment_frame,
+    financial_statement_ratios
+)
+
+STATEMENT_EXTENSIONS = (".csv", ".xlsx")
+# Cột kết quả của screen_statement: tổng hợp, Error rồi trung bình các tỷ số
+# (cùng thứ tự với extended_financial_ratios_frame)
+SUMMARY_COLUMNS = ("Company", "File", "Periods", "Last Date", "Revenue", "Net_Profit", "Total_Assets", "Error")
+RATIO_COLUMNS = tuple(extended_financial_ratios_frame(**{name: np.empty(0) for name in RATIO_INPUTS}).columns)
+
+
+def read_statement(path):
+    """
+    Đọc một file báo cáo tài chính (CSV / Excel) với cột như trang báo cáo tài chính.
+    """
+    df = pd.read_csv(path) if str(path).lower().endswith(".csv") else pd.read_excel(path)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.sort_values("Date").reset_index(drop=True)
+
+
+def screen_statement(path):
+    """
+    Chỉ tiêu sàng lọc của một công ty: tổng doanh thu / lợi nhuận, kỳ cuối và
+    trung bình các tỷ số từng kỳ (như trang báo cáo tài chính).
+    File lỗi không làm dừng cả lượt sàng lọc: trả về dòng có cột Error.
+    """
+    row = {"Company": os.path.splitext(os.path.basename(path))[0], "File": str(path)}
+    try:
+        df = read_statement(path)
+        period_ratios = financial_statement_ratios(df)
+    except Exception as exc:
+        row["Error"] = f"{type(exc).__name__}: {exc}"
+        return row
+
+    row.update({
+        "Periods": len(df),
+        "Last Date": df["Date"].iloc[-1] if len(df) else pd.NaT,
+        "Revenue": float(df["Revenue"].sum()),
+        "Net_Profit": float(df["Net_Profit"].sum()),
+        "Total_Assets": float(df["Total_Assets"].iloc[-1]) if len(df) else np.nan,
+        "Error": None
+    })
+    row.update(period_ratios.mean().to_dict())
+    return row
+
+
+def statement_files(directory):
+    """
+    Danh sách file CSV / Excel trong thư mục (sắp xếp theo tên).
+    """
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(STATEMENT_EXTENSIONS)
+    )
+
+
+def screen_directory(directory, n_workers=None, chunksize=8, output=None):
+    """
+    Sàng lọc toàn bộ file báo cáo trong một thư mục. n_workers > 1 (hoặc -1 = số CPU)
+    đọc và tính tỷ số trên process pool; mỗi worker chỉ trả về một dòng kết quả.
+    Sức khỏe tài chính chấm bằng financial_health_assessment_frame (cùng quy tắc với
+    financial_health_assessment) trên cả bảng; trụ cột thiếu dữ liệu (vd. không có cột
+    Cash) để trống và không tính điểm. Xếp hạng theo Score % (Score / Max Score) rồi ROE.
+
+    Trả về DataFrame (một dòng / công ty, file lỗi ở cuối với cột Error) luôn đủ các cột
+    chỉ tiêu, điểm và nhãn, kể cả khi thư mục rỗng hoặc mọi file đều lỗi; Rank kiểu Int64
+    (trống ở dòng lỗi). attrs chứa elapsed (giây) và files_per_second.
+    output = đường dẫn .csv / .xlsx để ghi bảng.
+    """
+    files = statement_files(directory)
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if n_workers and n_workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            rows = list(executor.map(screen_statement, files, chunksize=chunksize))
+    else:
+        rows = [screen_statement(path) for path in files]
+
+    results = pd.DataFrame(rows, columns=list(SUMMARY_COLUMNS + RATIO_COLUMNS))
+    results[list(RATIO_COLUMNS)] = results[list(RATIO_COLUMNS)].astype(np.float64)
+    ok = results["Error"].isna()
+    health = financial_health_assessment_frame(results.loc[ok], missing="skip")
+    for column in health.columns:
+        results[column] = health[column]
+    results["Score %"] = results["Score"] / results["Max Score"].where(results["Max Score"] > 0)
+
+    ranked = results.loc[ok].sort_values(["Score %", "ROE"], ascending=False, na_position="last")
+    ranked.insert(0, "Rank", pd.array(np.arange(1, len(ranked) + 1), dtype="Int64"))
+    errors = results.loc[~ok].assign(Rank=pd.array([pd.NA] * int((~ok).sum()), dtype="Int64"))
+    results = pd.concat([ranked, errors[ranked.columns]], ignore_index=True) if len(errors) else ranked.reset_index(drop=True)
+
+    elapsed = time.perf_counter() - start
+    results.attrs["elapsed"] = elapsed
+    results.attrs["files_per_second"] = len(files) / elapsed if elapsed > 0 else np.inf
+
+    if output:
+        if str(output).lower().endswith(".xlsx"):
+            results.to_excel(output, index=False)
+        else:
+            results.to_csv(output, index=False)
+    return results
+
+
+def filter_screening(results, min_score_pct=None, min_labels=None, include_errors=False):
+    """
+    Lọc bảng sàng lọc: Score % tối thiểu (tỷ lệ 0–1 trên điểm tối đa của các trụ cột
+    có dữ liệu, cùng thang với xếp hạng) và nhãn tối thiểu theo trụ cột,
+    vd. min_labels={"Liquidity": "Acceptable"}. Công ty không trụ cột nào có dữ liệu
+    được tính là 0%.
+    """
+    mask = results["Error"].isna() if not include_errors else pd.Series(True, index=results.index)
+    if min_score_pct is not None:
+        mask &= results["Score %"].fillna(0.0) >= min_score_pct
+    for pillar, label in (min_labels or {}).items():
+        if pillar not in {p for p, _ in HEALTH_PILLARS}:
+            raise ValueError(f"Không có trụ cột {pillar}")
+        mask &= results[pillar].cat.codes >= HEALTH_LABELS.index(label)
+    return results.loc[mask]
+
+
+def benchmark_screening(directory, worker_counts=(None, -1), chunksize=8):
+    """
+    Đo thông lượng sàng lọc (file / giây) theo số worker.
+    """
+    records = []
+    for n_workers in worker_counts:
+        results = screen_directory(directory, n_workers=n_workers, chunksize=chunksize)
+        records.append({
+            "Workers": (os.cpu_count() or 1) if n_workers == -1 else (n_workers or 1),
+            "Files": len(results),
+            "Seconds": results.attrs["elapsed"],
+            "Files/s": results.attrs["files_per_second"]
+        })
+    return pd.DataFrame(records)
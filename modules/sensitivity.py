@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+
+from modules.cashflow import cash_flow_arrays, solve_runway
+
+DRIVERS = ("initial_cash", "revenue", "growth", "fixed_cost", "var_ratio")
+METRICS = ("ending_cash", "min_cash", "runway")
+
+
+def evaluate_metric(params, months, metric):
+    """
+    params: dict driver -> mảng (broadcast được). Mọi tổ hợp được tính trong một
+    lần gọi vector hóa, trả về mảng chỉ số có shape broadcast của params.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric phải là một trong {METRICS}")
+
+    if metric == "ending_cash":
+        forecast = cash_flow_arrays(
+            params["initial_cash"],
+            params["revenue"],
+            params["growth"],
+            params["fixed_cost"],
+            params["var_ratio"],
+            months
+        )
+        return forecast.cash_balance[..., -1]
+
+    # Runway (tháng đầu tiên số dư < 0) và số dư thấp nhất: giải dạng đóng, không dựng ma trận tháng
+    solved = solve_runway(
+        params["initial_cash"],
+        params["revenue"],
+        params["growth"],
+        params["fixed_cost"],
+        params["var_ratio"],
+        months
+    )
+    return solved["cash_out_month"] if metric == "runway" else solved["min_cash"]
+
+
+def _check_base(base):
+    missing = [d for d in DRIVERS if d not in base]
+    if missing:
+        raise ValueError(f"Thiếu tham số gốc: {missing}")
+
+
+def tornado(base, months=24, metric="ending_cash", change=0.2, ranges=None, drivers=DRIVERS):
+    """
+    Dữ liệu biểu đồ tornado: mỗi driver được đặt ở mức thấp/cao (mặc định ±change
+    tương đối quanh giá trị gốc, hoặc theo ranges = {driver: (thấp, cao)}),
+    các driver khác giữ nguyên. Mọi kịch bản được tính trong một lần broadcast.
+    Kết quả sắp xếp theo độ ảnh hưởng (Swing) giảm dần; giá trị chỉ số tại
+    tham số gốc nằm trong result.attrs["base_value"].
+    """
+    _check_base(base)
+    ranges = ranges or {}
+    drivers = list(drivers)
+
+    low = np.array([ranges.get(d, (base[d] * (1 - change), None))[0] for d in drivers], dtype=np.float64)
+    high = np.array([ranges.get(d, (None, base[d] * (1 + change)))[1] for d in drivers], dtype=np.float64)
+
+    # Hàng 0..k-1: driver i ở mức thấp; hàng k..2k-1: driver i ở mức cao
+    k = len(drivers)
+    params = {d: np.full(2 * k, base[d], dtype=np.float64) for d in DRIVERS}
+    for i, d in enumerate(drivers):
+        params[d][i] = low[i]
+        params[d][k + i] = high[i]
+
+    values = evaluate_metric(params, months, metric)
+    base_value = float(evaluate_metric({d: base[d] for d in DRIVERS}, months, metric))
+
+    # Runway không hết tiền (inf) được tính là months + 1 khi đo độ ảnh hưởng
+    capped = np.where(np.isinf(values), months + 1, values) if metric == "runway" else values
+    swing = np.abs(capped[k:] - capped[:k])
+    result = pd.DataFrame({
+        "Driver": drivers,
+        "Low": low,
+        "High": high,
+        "Result (Low)": values[:k],
+        "Result (High)": values[k:],
+        "Swing": swing
+    })
+    result.attrs["base_value"] = base_value
+    return result.sort_values("Swing", ascending=False).reset_index(drop=True)
+
+
+def sensitivity_curve(base, driver, values, months=24, metric="ending_cash"):
+    """
+    Độ nhạy một chiều: chỉ số theo lưới giá trị của một driver.
+    """
+    _check_base(base)
+    values = np.asarray(values, dtype=np.float64)
+    params = {d: base[d] for d in DRIVERS}
+    params[driver] = values
+    return pd.Series(evaluate_metric(params, months, metric), index=pd.Index(values, name=driver), name=metric)
+
+
+def sensitivity_surface(base, x_driver, x_values, y_driver, y_values, months=24, metric="ending_cash"):
+    """
+    Bề mặt độ nhạy hai chiều (dữ liệu heatmap): DataFrame index = y_values,
+    columns = x_values. Toàn bộ lưới (ny x nx x months) tính trong một lần broadcast.
+    """
+    _check_base(base)
+    if x_driver == y_driver:
+        raise ValueError("x_driver và y_driver phải khác nhau")
+
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    params = {d: base[d] for d in DRIVERS}
+    params[x_driver] = x_values[None, :]
+    params[y_driver] = y_values[:, None]
+
+    surface = evaluate_metric(params, months, metric)
+    return pd.DataFrame(
+        surface,
+        index=pd.Index(y_values, name=y_driver),
+        columns=pd.Index(x_values, name=x_driver)
+    )
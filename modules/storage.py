@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+
+import numpy as np
+
+from modules.monte_carlo import SimulationStats, profit_bounds, profit_chunks
+
+
+def monte_carlo_profit_to_disk(
+    path,
+    n_simulations,
+    price_mean, price_std,
+    demand_mean, demand_std,
+    fixed_cost, variable_cost,
+    chunk_size=1_000_000,
+    seed=None,
+    bins=4096,
+    dtype=np.float64
+):
+    """
+    Ghi toàn bộ lợi nhuận mô phỏng ra file .npy (memory-mapped) theo từng chunk,
+    bộ nhớ chỉ ~ chunk_size phần tử. Cùng seed và chunk_size cho đúng các giá trị
+    mà monte_carlo_profit_stream đã thống kê. Trả về SimulationStats của lần chạy.
+    """
+    params = (price_mean, price_std, demand_mean, demand_std, fixed_cost, variable_cost)
+    n_simulations = int(n_simulations)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n_simulations,))
+
+    lower, upper = profit_bounds(*params)
+    stats = None
+    start = 0
+    for profit in profit_chunks(n_simulations, *params, chunk_size=chunk_size, seed=seed):
+        out[start:start + profit.size] = profit
+        chunk_stats = SimulationStats(lower, upper, bins).update(profit)
+        stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+        start += profit.size
+
+    out.flush()
+    del out
+    return stats
+
+
+def open_simulation(path):
+    """
+    Mở lại một lần chạy đã lưu ở chế độ chỉ đọc, không sao chép vào RAM.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def _as_array(source):
+    return open_simulation(source) if isinstance(source, (str, os.PathLike)) else source
+
+
+def _chunks(values, chunk_size):
+    for start in range(0, values.shape[0], chunk_size):
+        yield np.asarray(values[start:start + chunk_size], dtype=np.float64)
+
+
+def summarize_file(source, chunk_size=1_000_000, bins=4096):
+    """
+    SimulationStats của một file/mảng lớn, đọc hai lượt theo chunk
+    (lượt 1: min/max làm biên histogram, lượt 2: cập nhật thống kê).
+    """
+    values = _as_array(source)
+    lower, upper = np.inf, -np.inf
+    for chunk in _chunks(values, chunk_size):
+        lower = min(lower, float(chunk.min()))
+        upper = max(upper, float(chunk.max()))
+
+    if not np.isfinite(lower):
+        return SimulationStats(0.0, 1.0, bins)
+    if upper == lower:
+        upper = lower + max(abs(lower), 1.0)
+
+    stats = SimulationStats(lower, upper, bins)
+    for chunk in _chunks(values, chunk_size):
+        stats.update(chunk)
+    return stats
+
+
+def file_quantile(source, q, chunk_size=1_000_000, bins=4096, stats=None):
+    """
+    Quantile chính xác (nội suy tuyến tính như np.quantile) trên file/mảng lớn.
+    Histogram xác định bin chứa từng thứ hạng cần tìm; lượt đọc thứ hai chỉ
+    giữ lại các giá trị thuộc những bin đó rồi chọn phần tử đúng thứ hạng.
+    """
+    values = _as_array(source)
+    stats = stats if stats is not None else summarize_file(values, chunk_size, bins)
+    q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+    n = stats.count
+    if n == 0:
+        return np.full(q.shape, np.nan)
+
+    h = np.clip(q, 0.0, 1.0) * (n - 1)
+    lo = np.floor(h).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    ranks = np.unique(np.concatenate([lo, hi]))
+
+    cum = np.cumsum(stats.counts)
+    rank_bins = np.searchsorted(cum, ranks, side="right")
+    needed = np.unique(rank_bins)
+
+    collected = {b: [] for b in needed.tolist()}
+    for chunk in _chunks(values, chunk_size):
+        idx = stats.bin_index(chunk)
+        mask = np.isin(idx, needed)
+        if not mask.any():
+            continue
+        for b in np.unique(idx[mask]).tolist():
+            collected[b].append(chunk[idx == b])
+
+    order_stats = {}
+    for rank, b in zip(ranks.tolist(), rank_bins.tolist()):
+        in_bin = np.sort(np.concatenate(collected[b]))
+        order_stats[rank] = in_bin[rank - (cum[b] - stats.counts[b])]
+
+    v_lo = np.array([order_stats[k] for k in lo.tolist()])
+    v_hi = np.array([order_stats[k] for k in hi.tolist()])
+    return v_lo + (h - lo) * (v_hi - v_lo)
+
+
+def tail_stats(source, alpha=0.05, chunk_size=1_000_000, bins=4096, stats=None):
+    """
+    Thống kê đuôi trái (rủi ro lỗ) trên file/mảng lớn:
+    VaR = quantile mức alpha, Expected Shortfall = trung bình các giá trị <= VaR,
+    cùng xác suất lỗ (giá trị < 0).
+    """
+    values = _as_array(source)
+    stats = stats if stats is not None else summarize_file(values, chunk_size, bins)
+    var = float(file_quantile(values, alpha, chunk_size, bins, stats=stats)[0])
+
+    tail_sum = 0.0
+    tail_count = 0
+    for chunk in _chunks(values, chunk_size):
+        tail = chunk[chunk <= var]
+        tail_sum += float(tail.sum())
+        tail_count += tail.size
+
+    return {
+        "alpha": alpha,
+        "value_at_risk": var,
+        "expected_shortfall": tail_sum / tail_count if tail_count else np.nan,
+        "tail_count": tail_count,
+        "loss_probability": stats.loss_probability
+    }
@@ -8,10 +8,17 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from modules.finance import break_even_point
-from modules.monte_carlo import monte_carlo_profit
-from modules.cashflow import cash_flow_forecast, calculate_runway
+from modules.finance import break_even_point, product_mix_break_even
+from modules.monte_carlo import (
+    monte_carlo_profit,
+    monte_carlo_profit_auto,
+    monte_carlo_profit_stream,
+    SimulationStats
+)
+from modules.cashflow import cash_flow_arrays, simulate_cash_paths, solve_runway
 from modules.finance import extended_financial_ratios, financial_health_assessment
+from modules.goal_seek import required_growth, max_fixed_cost
+from modules.dataflow import Graph
 
 st.title("📊 Tính toán & Lập kế hoạch tài chính")
 
@@ -21,25 +28,30 @@ fixed_cost = st.number_input("Chi phí cố định", 0.0)
 price = st.number_input("Giá bán mỗi sp", 0.0)
 variable_cost = st.number_input("Chi phí biến đổi mỗi sp", 0.0)
 
-# Tính toán BEP
-bep = None
-show_warning = False
+# Đồ thị phụ thuộc của trang: mỗi nút chỉ tính lại khi đầu vào phía trên thay đổi,
+# kết quả được nhớ theo từng phiên người dùng
+graph = st.session_state.setdefault("finance_plan_graph", Graph())
+graph.reset_log()
+graph.set(bep_fixed_cost=fixed_cost, price=price, variable_cost=variable_cost)
 
-if price > 0 and variable_cost >= 0 and fixed_cost >= 0:
-    if price > variable_cost:
-        bep = fixed_cost / (price - variable_cost)
-    else:
-        show_warning = True  # Biên lợi nhuận ≤ 0
 
-# Hiển thị kết quả nếu đã tính
-if bep:
-    st.success(f"Số lượng tại điểm hòa vốn: {bep:.2f} đơn vị")
+@graph.node("bep", ["bep_fixed_cost", "price", "variable_cost"])
+def compute_bep(bep_fixed_cost, price, variable_cost):
+    # Tính toán BEP, trả về (bep, show_warning)
+    if price > 0 and variable_cost >= 0 and bep_fixed_cost >= 0:
+        if price > variable_cost:
+            return break_even_point(bep_fixed_cost, price, variable_cost), False
+        return None, True  # Biên lợi nhuận ≤ 0
+    return None, False
+
 
-    # Vẽ biểu đồ
+@graph.node("bep_chart", ["bep", "bep_fixed_cost", "price", "variable_cost"])
+def draw_bep_chart(bep, bep_fixed_cost, price, variable_cost):
+    bep = bep[0]
     q = np.linspace(0, bep * 1.5, 100)
     revenue = price * q
-    total_cost = fixed_cost + variable_cost * q
-    fixed_cost_line = np.full_like(q, fixed_cost)
+    total_cost = bep_fixed_cost + variable_cost * q
+    fixed_cost_line = np.full_like(q, bep_fixed_cost)
 
     fig, ax = plt.subplots()
     ax.plot(q, revenue, label="Tổng doanh thu")
@@ -54,30 +66,138 @@ if bep:
     ax.set_title("Phân tích điểm hòa vốn")
     ax.legend()
     ax.grid(True)
-    st.pyplot(fig)
+    return fig
+
+
+bep, show_warning = graph["bep"]
+
+# Hiển thị kết quả nếu đã tính
+if bep:
+    st.success(f"Số lượng tại điểm hòa vốn: {bep:.2f} đơn vị")
+    st.pyplot(graph["bep_chart"])
 
 elif show_warning:
     st.warning("⚠️ Giá bán phải lớn hơn chi phí biến đổi mỗi sản phẩm để đạt điểm hòa vốn.")
 
+with st.expander("📦 Hòa vốn nhiều sản phẩm (cơ cấu sản phẩm dùng chung chi phí cố định)"):
+    mix_table = st.data_editor(
+        pd.DataFrame({
+            "Sản phẩm": ["SP A", "SP B", "SP C"],
+            "Giá bán": [100.0, 150.0, 80.0],
+            "Chi phí biến đổi": [60.0, 90.0, 50.0],
+            "Tỷ trọng": [0.5, 0.3, 0.2]
+        }),
+        num_rows="dynamic",
+        key="product_mix_table"
+    ).dropna()
+    mix_basis = st.radio("Tỷ trọng theo", ["Số lượng", "Doanh thu"], horizontal=True)
+
+    mix_price = mix_table["Giá bán"].to_numpy(dtype=float)
+    mix_weight = mix_table["Tỷ trọng"].to_numpy(dtype=float)
+    graph.set(
+        mix_price=mix_price,
+        mix_cost=mix_table["Chi phí biến đổi"].to_numpy(dtype=float),
+        mix_weight=mix_weight,
+        mix_basis="units" if mix_basis == "Số lượng" else "revenue"
+    )
+
+    @graph.node("product_mix", ["bep_fixed_cost", "mix_price", "mix_cost", "mix_weight", "mix_basis"])
+    def compute_product_mix(bep_fixed_cost, mix_price, mix_cost, mix_weight, mix_basis):
+        return product_mix_break_even(
+            bep_fixed_cost, mix_price, mix_cost, mix_weight,
+            mix_basis=mix_basis, price_changes=np.linspace(-0.3, 0.3, 61)
+        )
+
+    if len(mix_table) and ((mix_weight < 0).any() or mix_weight.sum() <= 0):
+        st.warning("⚠️ Tỷ trọng phải không âm và có tổng lớn hơn 0.")
+    elif len(mix_table) and mix_basis == "Doanh thu" and mix_weight[mix_price > 0].sum() <= 0:
+        st.warning("⚠️ Với tỷ trọng theo doanh thu, cần ít nhất một sản phẩm có giá bán > 0 và tỷ trọng > 0.")
+    elif len(mix_table) and fixed_cost > 0:
+        mix_result = graph["product_mix"]
+        if np.isnan(mix_result["bep_units"]):
+            st.warning("⚠️ Biên đóng góp bình quân của danh mục ≤ 0, không có điểm hòa vốn.")
+        else:
+            col1, col2 = st.columns(2)
+            col1.metric("Tổng số lượng hòa vốn", f"{mix_result['bep_units']:,.0f}")
+            col2.metric("Doanh thu hòa vốn", f"{mix_result['bep_revenue']:,.0f}")
+            st.dataframe(pd.DataFrame({
+                "Sản phẩm": mix_table["Sản phẩm"].to_numpy(),
+                "Cơ cấu số lượng": mix_result["unit_mix"],
+                "Lãi gộp / sp": mix_result["unit_margin"],
+                "Đóng góp (%)": mix_result["contribution_share"] * 100,
+                "Số lượng hòa vốn": mix_result["sku_units"],
+                "Doanh thu hòa vốn": mix_result["sku_revenue"]
+            }), use_container_width=True)
+            st.line_chart(pd.DataFrame(
+                {"Số lượng hòa vốn": mix_result["curve_units"]},
+                index=pd.Index(np.linspace(-30, 30, 61), name="Thay đổi giá (%)")
+            ))
+    else:
+        st.info("Nhập chi phí cố định ở trên và ít nhất một sản phẩm.")
+
 st.divider()
 
 st.subheader("2️⃣ Mô phỏng Monte Carlo (Rủi ro lợi nhuận)")
 
-n = st.slider("Số lần mô phỏng", 100, 10000, 1000)
+sampling_labels = {
+    "Ngẫu nhiên": "random",
+    "Sobol (quasi-Monte Carlo)": "sobol",
+    "Latin Hypercube": "lhs"
+}
+sampling_label = st.selectbox("Phương pháp lấy mẫu", list(sampling_labels))
+auto_stop = st.checkbox("Tự động dừng khi kết quả hội tụ", value=False)
+
+graph.set(sampling=sampling_labels[sampling_label])
+
+
+@graph.node("mc_params", ["bep", "bep_fixed_cost", "price", "variable_cost"])
+def build_mc_params(bep, bep_fixed_cost, price, variable_cost):
+    return dict(
+        price_mean=price,
+        price_std=price*0.1,
+        demand_mean=bep[0] if bep[0] else 100,
+        demand_std=20,
+        fixed_cost=bep_fixed_cost,
+        variable_cost=variable_cost,
+        seed=0
+    )
+
+
+@graph.node("mc_auto", ["mc_params", "sampling"])
+def run_monte_carlo_auto(mc_params, sampling):
+    return monte_carlo_profit_auto(sampling=sampling, **mc_params)
+
+
+@graph.node("profit_stats", ["mc_params", "sampling", "n_simulations"])
+def run_monte_carlo(mc_params, sampling, n_simulations):
+    # Chỉ dùng bản tóm tắt phân phối (histogram + moment) để vẽ và tính chỉ số,
+    # không sắp xếp / gửi toàn bộ mảng mô phỏng lên trình duyệt
+    if sampling == "random":
+        return monte_carlo_profit_stream(n_simulations, **mc_params)
+    profit_sim = monte_carlo_profit(n_simulations, sampling=sampling, **mc_params)
+    return SimulationStats.from_values(profit_sim)
 
-profit_sim = monte_carlo_profit(
-    n,
-    price_mean=price,
-    price_std=price*0.1,
-    demand_mean=bep if bep else 100,
-    demand_std=20,
-    fixed_cost=fixed_cost,
-    variable_cost=variable_cost
-)
 
-st.line_chart(np.sort(profit_sim))
-st.metric("Lợi nhuận kì vọng", f"{profit_sim.mean():,.0f}")
-st.metric("Khả năng thua lỗ", f"{(profit_sim<0).mean()*100:.2f}%")
+if auto_stop:
+    # Dùng trực tiếp kết quả đã kiểm tra hội tụ, không mô phỏng lại lần thứ hai
+    auto = graph["mc_auto"]
+    profit_stats = auto["stats"]
+    st.caption(
+        f"Đã dùng {auto['n_simulations']:,} lần mô phỏng"
+        + (" (đã hội tụ)" if auto["converged"] else " (chưa hội tụ, đạt giới hạn số lần)")
+    )
+else:
+    n = st.slider("Số lần mô phỏng", 100, 1000000, 1000, step=100)
+    graph.set(n_simulations=n)
+    profit_stats = graph["profit_stats"]
+
+st.line_chart(profit_stats.quantile_curve().rename(columns={"Value": "Lợi nhuận"}))
+if auto_stop:
+    st.metric("Lợi nhuận kì vọng", f"{auto['mean']:,.0f} ± {auto['mean_ci']:,.0f}")
+    st.metric("Khả năng thua lỗ", f"{auto['loss_probability']*100:.2f}% ± {auto['loss_ci']*100:.2f}%")
+else:
+    st.metric("Lợi nhuận kì vọng", f"{profit_stats.mean:,.0f}")
+    st.metric("Khả năng thua lỗ", f"{profit_stats.loss_probability*100:.2f}%")
 st.divider()
 
 st.subheader("3️⃣ Phân tích chỉ tiêu và sức khỏe tài chính")
@@ -162,19 +282,66 @@ with col1:
 with col2:
      fixed_cost = st.number_input("Chi phí cố định hàng tháng", 0.0)
      variable_cost_ratio = st.slider("Tỷ lệ chi phí biến đổi", 0.0, 1.0, 0.3)
-     months = st.slider("Khoảng thời gian dự báo (tháng)", 6, 60, 24)
-
-df_cf = cash_flow_forecast(
-    initial_cash,
-    monthly_revenue,
-    monthly_growth,
-    fixed_cost,
-    variable_cost_ratio,
-    months
+     months = st.slider("Khoảng thời gian dự báo (tháng)", 6, 120, 24)
+
+freq_labels = {"Tháng": "M", "Tuần": "W", "Ngày": "D"}
+col1, col2 = st.columns(2)
+with col1:
+     freq = freq_labels[st.selectbox("Bước thời gian dự báo", list(freq_labels))]
+with col2:
+     payment_day = None
+     if freq != "M":
+          if st.checkbox("Trả chi phí cố định một lần vào ngày cố định trong tháng"):
+               payment_day = st.number_input("Ngày trả chi phí cố định", 1, 31, 25)
+
+graph.set(
+    initial_cash=initial_cash,
+    monthly_revenue=monthly_revenue,
+    monthly_growth=monthly_growth,
+    cf_fixed_cost=fixed_cost,
+    variable_cost_ratio=variable_cost_ratio,
+    months=months,
+    freq=freq,
+    payment_day=payment_day,
+    # Dự báo theo ngày/tuần bắt đầu từ đầu tháng hiện tại để gộp đúng theo tháng
+    start=pd.Timestamp.today().normalize().replace(day=1)
 )
+cf_inputs = ["initial_cash", "monthly_revenue", "monthly_growth", "cf_fixed_cost", "variable_cost_ratio"]
+
+
+@graph.node("cash_forecast", cf_inputs + ["months", "freq", "payment_day", "start"])
+def compute_cash_forecast(initial_cash, monthly_revenue, monthly_growth, cf_fixed_cost, variable_cost_ratio, months, freq, payment_day, start):
+    return cash_flow_arrays(
+        initial_cash,
+        monthly_revenue,
+        monthly_growth,
+        cf_fixed_cost,
+        variable_cost_ratio,
+        months,
+        freq=freq,
+        start=start,
+        payment_day=payment_day
+    )
+
+
+@graph.node("runway", cf_inputs)
+def compute_runway(initial_cash, monthly_revenue, monthly_growth, cf_fixed_cost, variable_cost_ratio):
+    # Tháng đầu tiên số dư âm, giải trực tiếp từ tham số (tính cả tăng trưởng doanh thu)
+    return float(solve_runway(
+        initial_cash,
+        monthly_revenue,
+        monthly_growth,
+        cf_fixed_cost,
+        variable_cost_ratio
+    )["cash_out_month"])
+
+
+forecast = graph["cash_forecast"]
+df_cf = forecast.to_frame()
 
 df_display = df_cf.rename(columns={
     "Month": "Tháng",
+    "Date": "Ngày",
     "Revenue": "Doanh thu",
     "Total Cost": "Tổng chi phí",
     "Net Cash Flow": "Dòng tiền ròng",
@@ -182,13 +349,82 @@ df_display = df_cf.rename(columns={
 })
 
 st.dataframe(df_display)
-#Vẽ biểu đồ Cash Balance
-st.line_chart(df_display.set_index("Tháng")[["Số dư tiền mặt"]])
+#Vẽ biểu đồ Cash Balance (dự báo theo ngày được gộp theo tuần để vẽ)
+chart_forecast = forecast.resample("W") if freq == "D" else forecast
+df_chart = pd.DataFrame(
+    {"Số dư tiền mặt": chart_forecast.cash_balance},
+    index=pd.Index(chart_forecast.month if freq == "M" else chart_forecast.dates, name="Tháng" if freq == "M" else "Ngày")
+)
+st.line_chart(df_chart)
 
-avg_burn = df_cf["Net Cash Flow"].mean()
-runway = calculate_runway(initial_cash, avg_burn)
+monthly_forecast = forecast if freq == "M" else forecast.resample("M")
+avg_burn = monthly_forecast.net_cash_flow.mean()
+runway = graph["runway"]
 
 st.metric("Tiêu tiền hàng tháng trung bình", f"{avg_burn:,.0f}")
 #st.metric("Estimated Runway (months)", "∞ (Không cần gọi vốn để tồn tại)" if runway == float("inf") else f"{runway:.1f}")
-label = "∞ (Không cần gọi vốn để tồn tại)" if runway == float("inf") else f"{runway:.1f}"
+label = "∞ (Không cần gọi vốn để tồn tại)" if runway == float("inf") else f"{runway:.0f}"
 st.markdown(f"<p style='font-size:18px'><b>Ước tính Runway (tháng):</b> {label}</p>", unsafe_allow_html=True)
+
+
+@graph.node("growth_needed", cf_inputs + ["months", "cash_floor"])
+def compute_growth_needed(initial_cash, monthly_revenue, monthly_growth, cf_fixed_cost, variable_cost_ratio, months, cash_floor):
+    return required_growth(
+        cash_floor, initial_cash, monthly_revenue, cf_fixed_cost, variable_cost_ratio, months
+    )
+
+
+@graph.node("fixed_cost_max", cf_inputs + ["target_runway"])
+def compute_fixed_cost_max(initial_cash, monthly_revenue, monthly_growth, cf_fixed_cost, variable_cost_ratio, target_runway):
+    return max_fixed_cost(
+        target_runway, initial_cash, monthly_revenue, monthly_growth, variable_cost_ratio
+    )
+
+
+# Giải ngược mục tiêu kế hoạch
+with st.expander("🎯 Tìm ngưỡng mục tiêu (goal-seek)"):
+    col1, col2 = st.columns(2)
+    with col1:
+        cash_floor = st.number_input("Số dư tiền mặt tối thiểu cần giữ", 0.0)
+        graph.set(cash_floor=cash_floor)
+        growth_needed = graph["growth_needed"]
+        st.metric(
+            "Tăng trưởng doanh thu tối thiểu / tháng",
+            "Không có ngưỡng trong khoảng -50% … 100%" if np.isnan(growth_needed)
+            else "≤ -50% (không cần tăng trưởng)" if growth_needed <= -0.5
+            else f"{growth_needed*100:.2f}%"
+        )
+    with col2:
+        target_runway = st.number_input("Runway mục tiêu (tháng)", 1, 240, 18)
+        graph.set(target_runway=target_runway)
+        fixed_cost_max = graph["fixed_cost_max"]
+        st.metric(
+            "Chi phí cố định tối đa / tháng",
+            "Không có ngưỡng phù hợp" if np.isnan(fixed_cost_max) else f"{fixed_cost_max:,.0f}"
+        )
+
+
+@graph.node("cash_paths", cf_inputs + ["months", "n_paths"])
+def compute_cash_paths(initial_cash, monthly_revenue, monthly_growth, cf_fixed_cost, variable_cost_ratio, months, n_paths):
+    return simulate_cash_paths(
+        initial_cash,
+        monthly_revenue,
+        monthly_growth,
+        cf_fixed_cost,
+        variable_cost_ratio,
+        months,
+        n_simulations=n_paths,
+        seed=0
+    )
+
+
+# Phân phối runway theo mô phỏng đường tiền mặt
+st.markdown("#### 🎲 Phân phối Runway (mô phỏng đường tiền mặt)")
+n_paths = st.slider("Số đường mô phỏng", 1000, 100000, 10000, step=1000)
+graph.set(n_paths=n_paths)
+paths = graph["cash_paths"]
+
+st.line_chart(paths["cash_quantiles"].set_index("Month"))
+st.metric("Xác suất hết tiền trong kỳ dự báo", f"{paths['cash_out_probability']*100:.2f}%")
+median_runway = paths["runway_quantiles"][0.5]
+st.metric("Runway trung vị (tháng)", "∞" if median_runway == float("inf") else f"{median_runway:.0f}")
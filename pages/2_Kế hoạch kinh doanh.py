@@ -4,21 +4,69 @@
 # In[ ]:
 
 import streamlit as st
+import numpy as np
 import pandas as pd
+import plotly.express as px
 from modules.business import unit_economics, assess_unit_economics
 from modules.business import unit_economics_recommendations
-from modules.scenario import scenario_analysis
+from modules.business import ASSESSMENT_TIERS, UE_INPUTS, unit_economics_table
+from modules.cohort import cohort_analysis
+from modules.scenario import scenario_batch
+from modules.sensitivity import tornado, sensitivity_surface
 
 st.title("📈 Tính toán và lập kế hoạch kinh doanh")
 
 st.subheader("1️⃣ Tính toán các chỉ tiêu kinh doanh")
 
+# ARPU / CHURN TỪ DỮ LIỆU GIAO DỊCH
+cohort = None
+with st.expander("📂 Ước tính ARPU & Churn từ dữ liệu giao dịch (cohort)"):
+    tx_file = st.file_uploader("File CSV giao dịch: customer_id, date, amount", type=["csv"])
+    if tx_file:
+        # Kết quả được giữ theo file để các lần chạy lại trang không đọc lại log
+        cohort_key = (tx_file.name, tx_file.size)
+        if st.session_state.get("cohort_key") != cohort_key:
+            try:
+                with st.spinner("Đang dựng ma trận cohort..."):
+                    st.session_state["cohort"] = cohort_analysis(tx_file)
+            except (KeyError, ValueError) as exc:
+                st.session_state["cohort"] = None
+                st.error(f"Không đọc được file giao dịch: {exc}")
+            st.session_state["cohort_key"] = cohort_key
+        cohort = st.session_state["cohort"]
+
+        if cohort is not None and cohort.active.size:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Số cohort", len(cohort.cohorts))
+            col2.metric("ARPU tháng", f"{cohort.arpu():,.2f}")
+            col3.metric("Churn tháng", f"{cohort.churn():.2%}")
+            retention = cohort.retention()
+            retention.index = retention.index.astype(str)
+            st.plotly_chart(
+                px.imshow(retention, aspect="auto", color_continuous_scale="Blues",
+                          labels=dict(x="Tuổi (tháng)", y="Cohort", color="Retention")),
+                use_container_width=True
+            )
+        elif cohort is not None:
+            st.warning("Không có giao dịch hợp lệ trong file")
+
 # INPUT
-arpu = st.number_input("Doanh thu mỗi người dùng (ARPU)", 0.0)
+use_cohort = cohort is not None and cohort.active.size > 0
+arpu = st.number_input("Doanh thu mỗi người dùng (ARPU)", 0.0, value=float(cohort.arpu()) if use_cohort else 0.0)
 cac = st.number_input("Chi phí giành khách hàng (CAC)", 0.0)
-churn = st.number_input("Tỷ lệ rời bỏ (0–1)", 0.01)
+churn = st.number_input(
+    "Tỷ lệ rời bỏ (0–1)", 0.01,
+    value=float(min(max(cohort.churn(), 0.01), 1.0)) if use_cohort and np.isfinite(cohort.churn()) else 0.01
+)
 gross_margin = st.slider("Biên lợi nhuận gộp (Gross Margin)", 0.0, 1.0, 0.6)
 
+if use_cohort:
+    cohort_payback = cohort.payback(cac, gross_margin)
+    st.caption(
+        f"LTV thực nghiệm theo cohort: {cohort.ltv(gross_margin):,.2f} · Hoàn vốn CAC thực tế: "
+        + (f"{cohort_payback:.0f} tháng" if np.isfinite(cohort_payback) else "chưa hoàn vốn trong dữ liệu")
+    )
+
 # Khởi tạo ue = None
 ue = None
 recommendations = []
@@ -74,6 +122,47 @@ if recommendations:
 else:
     st.info("Nhấn nút '📌 Tính toán Unit Economics' để xem gợi ý")
 
+# Unit economics hàng loạt theo phân khúc x kênh
+with st.expander("📋 Unit Economics hàng loạt (phân khúc × kênh × tháng)"):
+    ue_file = st.file_uploader(
+        "File CSV có các cột arpu, cac, churn, gross_margin (các cột khác như Segment, Channel được giữ lại)",
+        type=["csv"],
+        key="ue_batch_file"
+    )
+    ue_table = None
+    if ue_file:
+        try:
+            ue_input = pd.read_csv(ue_file)
+            missing = [c for c in UE_INPUTS if c not in ue_input]
+            if missing:
+                st.error(f"Thiếu cột bắt buộc: {missing}")
+            else:
+                ue_table = unit_economics_table(ue_input)
+        except ValueError as exc:
+            st.error(f"Không đọc được file unit economics: {exc}")
+
+        if ue_table is not None:
+            st.bar_chart(ue_table["Assessment"].value_counts(sort=False))
+
+            tier_filter = st.multiselect("Lọc theo đánh giá", list(ASSESSMENT_TIERS), default=list(ASSESSMENT_TIERS))
+            shown = ue_table[ue_table["Assessment"].isin(tier_filter)]
+            st.dataframe(shown, use_container_width=True)
+
+            key_cols = [c for c in ue_input.columns if c not in UE_INPUTS]
+            if len(key_cols) >= 2:
+                row_key, col_key = key_cols[:2]
+                pivot = ue_table.pivot_table(index=row_key, columns=col_key, values="LTV/CAC", aggfunc="mean")
+                st.plotly_chart(
+                    px.imshow(pivot, text_auto=".2f", aspect="auto", title=f"LTV/CAC theo {row_key} × {col_key}"),
+                    use_container_width=True
+                )
+
+            st.download_button(
+                "⬇️ Tải bảng kết quả (CSV)",
+                shown.to_csv(index=False).encode("utf-8"),
+                file_name="unit_economics_batch.csv"
+            )
+
 # Scenario analysis
 st.divider()
 st.subheader("3️⃣ Phân tích kịch bản kinh doanh (Xấu nhất / Trung bình / Tốt nhất) 📊")
@@ -145,15 +234,98 @@ scenarios["Kịch bản xấu nhất 🧨"] = {
 }
 
 # ===== RUN SCENARIO =====
-results = scenario_analysis(initial_cash, scenarios, months)
+names = list(scenarios)
+combined_df = scenario_batch(
+    initial_cash,
+    [scenarios[name]["revenue"] for name in names],
+    [scenarios[name]["growth"] for name in names],
+    [scenarios[name]["fixed_cost"] for name in names],
+    [scenarios[name]["var_ratio"] for name in names],
+    months,
+    names=names
+)
 
-# ===== COMBINE INTO ONE DATAFRAME =====
-combined_df = pd.DataFrame({"Month": range(1, months + 1)})
+# ===== PLOT ONE CHART – THREE LINES =====
+st.line_chart(combined_df)
 
-for name, df in results.items():
-    combined_df[name] = df["Cash Balance"].values
+# Sensitivity analysis
+st.divider()
+st.subheader("4️⃣ Phân tích độ nhạy (dựa trên kịch bản trung bình) 🌪️")
+
+driver_labels = {
+    "initial_cash": "Tiền mặt ban đầu",
+    "revenue": "Doanh thu",
+    "growth": "Tỷ lệ tăng trưởng",
+    "fixed_cost": "Chi phí cố định",
+    "var_ratio": "Tỷ lệ chi phí biến đổi"
+}
+metric_labels = {
+    "ending_cash": "Tiền mặt cuối kỳ",
+    "min_cash": "Số dư tiền mặt thấp nhất",
+    "runway": "Runway (tháng)"
+}
 
-combined_df.set_index("Month", inplace=True)
+base_params = {
+    "initial_cash": initial_cash,
+    "revenue": base_revenue,
+    "growth": base_growth,
+    "fixed_cost": base_fixed_cost,
+    "var_ratio": base_var_ratio
+}
 
-# ===== PLOT ONE CHART – THREE LINES =====
-st.line_chart(combined_df)
+col1, col2 = st.columns(2)
+with col1:
+    metric = st.selectbox("Chỉ số đánh giá", list(metric_labels), format_func=metric_labels.get)
+with col2:
+    change = st.slider("Mức thay đổi mỗi driver (±%)", 5, 50, 20) / 100
+
+df_tornado = tornado(base_params, months, metric=metric, change=change)
+base_value = df_tornado.attrs["base_value"]
+# Runway không hết tiền (∞) được vẽ như months + 1
+df_tornado = df_tornado.replace(np.inf, months + 1)
+if base_value == float("inf"):
+    base_value = months + 1
+df_tornado["Driver"] = df_tornado["Driver"].map(driver_labels)
+df_tornado["Thấp"] = df_tornado["Result (Low)"] - base_value
+df_tornado["Cao"] = df_tornado["Result (High)"] - base_value
+
+fig_tornado = px.bar(
+    df_tornado.iloc[::-1],
+    x=["Thấp", "Cao"],
+    y="Driver",
+    orientation="h",
+    barmode="overlay",
+    title=f"Biểu đồ tornado – thay đổi {metric_labels[metric]} so với kịch bản gốc"
+)
+st.plotly_chart(fig_tornado, use_container_width=True)
+
+# Bề mặt độ nhạy hai chiều
+col1, col2 = st.columns(2)
+with col1:
+    x_driver = st.selectbox("Driver trục ngang", list(driver_labels), index=2, format_func=driver_labels.get)
+with col2:
+    y_driver = st.selectbox("Driver trục dọc", list(driver_labels), index=3, format_func=driver_labels.get)
+
+if x_driver == y_driver:
+    st.warning("⚠️ Chọn hai driver khác nhau để vẽ bề mặt độ nhạy.")
+else:
+    def driver_grid(name):
+        value = base_params[name]
+        if value == 0:
+            return np.linspace(-0.1, 0.1, 50) if name == "growth" else np.linspace(0, 1, 50)
+        return np.linspace(value * (1 - change), value * (1 + change), 50)
+
+    surface = sensitivity_surface(
+        base_params,
+        x_driver, driver_grid(x_driver),
+        y_driver, driver_grid(y_driver),
+        months,
+        metric=metric
+    )
+    fig_surface = px.imshow(
+        surface.replace(np.inf, months + 1),
+        labels={"x": driver_labels[x_driver], "y": driver_labels[y_driver], "color": metric_labels[metric]},
+        aspect="auto",
+        origin="lower"
+    )
+    st.plotly_chart(fig_surface, use_container_width=True)
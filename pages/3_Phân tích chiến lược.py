@@ -7,6 +7,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from modules.rules import load_rules
+
 st.set_page_config(page_title="Strategy & Market Fit", layout="wide")
 
 st.header("🧭 Phân tích chiến lược & mức độ phù hợp thị trường")
@@ -113,35 +115,24 @@ st.metric("PMF Score tổng hợp", f"{PMF_master_score:.1f}/100")
 
 # 🚦 5. PMF VERDICT ENGINE
 # =====================================================
-if emotional_fit_score >= 40 and value_fit_score >= 60 and economic_fit_score >= 60:
-    st.success("🚀 STRONG PMF – Có thể scale có kiểm soát")
-    pmf_stage = "Scale-ready"
-elif value_fit_score >= 50 and emotional_fit_score >= 30:
-    st.warning("🟡 PARTIAL PMF – Cần tối ưu sản phẩm trước khi scale")
-    pmf_stage = "Optimize"
-else:
-    st.error("🔴 WEAK PMF – Chưa phù hợp thị trường")
-    pmf_stage = "Fix"
+pmf_inputs = dict(
+    value_fit_score=value_fit_score,
+    emotional_fit_score=emotional_fit_score,
+    economic_fit_score=economic_fit_score,
+    retention_90d=retention_90d,
+    very_disappointed=very_disappointed,
+    ltv_cac_ratio=ltv_cac_ratio,
+    organic_revenue_growth=organic_revenue_growth
+)
+
+# Ngưỡng & thông điệp: bảng quy tắc modules/rules.py
+pmf_stage, pmf_verdict, pmf_severity = load_rules("pmf_verdict").apply(pmf_inputs)[0]
+getattr(st, pmf_severity)(pmf_verdict)
 
 # 🧭 6. ACTIONABLE STRATEGIC INSIGHTS
 st.subheader("🧭 Gợi ý hành động chiến lược")
 
-actions = []
-
-if retention_90d < 0.4:
-    actions.append("🔧 Cải thiện core value và onboarding để tăng retention")
-
-if very_disappointed < 0.4:
-    actions.append("🎯 Làm rõ ICP và pain point chính của khách hàng")
-
-if ltv_cac_ratio < 3:
-    actions.append("💰 Tối ưu pricing, packaging hoặc giảm CAC")
-
-if organic_revenue_growth < 0.05:
-    actions.append("📣 Đẩy mạnh referral, word-of-mouth và usage loop")
-
-if not actions:
-    actions.append("✅ Có thể bắt đầu scale từng kênh với ngân sách kiểm soát")
+actions = [message for _, message, _ in load_rules("pmf_actions").apply(pmf_inputs)]
 
 for action in actions:
     st.write(action)
@@ -173,28 +164,20 @@ growth_master_score = (
 st.metric("Growth Strategy Score", f"{growth_master_score:.1f}/100")
 
 # -------- Verdict đơn giản --------
-if growth_master_score >= 70:
-    st.success("🚀 Tăng trưởng hiệu quả – Có thể scale")
-    growth_stage = "Scale"
-elif growth_master_score >= 50:
-    st.warning("🟡 Tăng trưởng trung bình – Cần tối ưu")
-    growth_stage = "Optimize"
-else:
-    st.error("🔴 Tăng trưởng rủi ro – Không nên scale")
-    growth_stage = "Hold"
+growth_inputs = dict(
+    growth_master_score=growth_master_score,
+    organic_ratio=organic_ratio,
+    cac_growth_rate=cac_growth_rate,
+    revenue_growth_rate=revenue_growth_rate,
+    burn_rate_pressure=burn_rate_pressure
+)
+
+growth_stage, growth_verdict, growth_severity = load_rules("growth_verdict").apply(growth_inputs)[0]
+getattr(st, growth_severity)(growth_verdict)
 
 # -------- Actionable Insights --------
 st.markdown("#### 🧭 Gợi ý hành động tăng trưởng")
-growth_actions = []
-
-if organic_ratio < 0.5:
-    growth_actions.append("📣 Tăng referral & organic growth")
-if cac_growth_rate > revenue_growth_rate:
-    growth_actions.append("💸 CAC tăng nhanh hơn doanh thu – tối ưu funnel")
-if burn_rate_pressure > 0.6:
-    growth_actions.append("🔥 Kiểm soát burn rate trước khi scale")
-if not growth_actions:
-    growth_actions.append("✅ Chiến lược tăng trưởng ổn định")
+growth_actions = [message for _, message, _ in load_rules("growth_actions").apply(growth_inputs)]
 
 for a in growth_actions:
     st.write(a)
@@ -11,6 +11,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 
+from modules.kpi import page_frame, plot_frame, read_kpi_csv
+
 st.title("📈 Theo dõi KPI & cảnh báo sớm")
 st.header("1️⃣💾 Theo dõi KPI đa chỉ tiêu")
 
@@ -20,11 +22,33 @@ if uploaded_file:
     # ==============================
     # LOAD DATA
     # ==============================
-    df = pd.read_csv(uploaded_file, parse_dates=["date"])
-    df = df.sort_values("date").reset_index(drop=True)
+    # Đọc theo chunk, kiểu dữ liệu gọn; kết quả giữ theo file để các lần chạy lại trang không đọc lại
+    kpi_key = (uploaded_file.name, uploaded_file.size)
+    if st.session_state.get("kpi_key") != kpi_key:
+        try:
+            with st.spinner("Đang đọc dữ liệu KPI..."):
+                st.session_state["kpi_data"] = read_kpi_csv(uploaded_file)
+        except ValueError as exc:
+            st.session_state["kpi_data"] = None
+            st.error(f"Không đọc được file KPI: {exc}")
+        st.session_state["kpi_key"] = kpi_key
+    df = st.session_state["kpi_data"]
+    if df is None:
+        st.stop()
 
     st.subheader("📄 Dữ liệu gốc")
-    st.dataframe(df)
+    st.caption(
+        f"{len(df):,} dòng · {df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB · "
+        f"định dạng ngày: {', '.join(f or 'tự nhận dạng' for f in df.attrs.get('date_formats', [])) or 'tự nhận dạng'}"
+    )
+    if df.attrs.get("unparsed_dates"):
+        st.warning(f"⚠️ {df.attrs['unparsed_dates']:,} dòng có ngày không đọc được (để trống ngày).")
+    col_page, col_size = st.columns(2)
+    page_size = col_size.selectbox("Số dòng mỗi trang", [50, 100, 500, 1000], index=1)
+    page = col_page.number_input("Trang", min_value=1, value=1, step=1)
+    page_rows, n_pages = page_frame(df, page, page_size)
+    st.caption(f"Trang {min(page, n_pages):,} / {n_pages:,}")
+    st.dataframe(page_rows)
 
     # ==============================
     # PHÁT HIỆN CÁC TRƯỜNG DỮ LIỆU SỐ
@@ -45,8 +69,12 @@ if uploaded_file:
     # ==============================
     # BIỂU ĐỒ KPI
     # ==============================
+    # File lớn: vẽ trung bình theo nhóm dòng liên tiếp thay vì mọi điểm
+    chart_data, group_size = plot_frame(df, [kpi])
+    if group_size > 1:
+        st.caption(f"Biểu đồ: trung bình mỗi {group_size:,} dòng liên tiếp ({len(chart_data):,} điểm)")
     fig = px.line(
-        df,
+        chart_data,
         x="date",
         y=kpi,
         markers=True,
@@ -65,13 +93,20 @@ if uploaded_file:
         format_func=lambda x: f"{x} kỳ gần nhất"
     )
 
-    df["Giá trị trước"] = df[kpi].shift(period)
-    df["Tăng tuyệt đối"] = df[kpi] - df["Giá trị trước"]
-    df["Tăng tương đối (%)"] = df["Tăng tuyệt đối"] / df["Giá trị trước"].replace(0, np.nan) * 100
-    comparison_table = df[["date", kpi, "Giá trị trước", "Tăng tuyệt đối", "Tăng tương đối (%)"]].rename(columns={"date": "Ngày"})
+    # Không ghi cột mới vào df: df được giữ lại giữa các lần chạy trang
+    comparison_table = pd.DataFrame({"Ngày": df["date"], kpi: df[kpi]})
+    comparison_table["Giá trị trước"] = comparison_table[kpi].shift(period)
+    comparison_table["Tăng tuyệt đối"] = comparison_table[kpi] - comparison_table["Giá trị trước"]
+    comparison_table["Tăng tương đối (%)"] = comparison_table["Tăng tuyệt đối"] / comparison_table["Giá trị trước"].replace(0, np.nan) * 100
 
     st.write("📋 Bảng so sánh tăng trưởng")
-    st.dataframe(comparison_table.style.format({
+    # Chỉ định dạng & hiển thị trang đang xem (trang cuối = các kỳ gần nhất)
+    comparison_pages = max(1, -(-len(comparison_table) // page_size))
+    comparison_page = st.number_input(
+        f"Trang bảng so sánh (1 – {comparison_pages:,})",
+        min_value=1, max_value=comparison_pages, value=comparison_pages, step=1
+    )
+    st.dataframe(page_frame(comparison_table, comparison_page, page_size)[0].style.format({
         kpi: "{:.2f}",
         "Giá trị liền trước": "{:.2f}",
         "Tăng tuyệt đối": "{:.2f}",
@@ -105,8 +140,8 @@ if uploaded_file:
     if latest < avg:
         alerts.append(f"📉 {kpi} hiện tại thấp hơn mức trung bình lịch sử.")
 
-    if "Tăng tương đối (%)" in df.columns:
-        recent_change = df["Tăng tương đối (%)"].iloc[-1]
+    if "Tăng tương đối (%)" in comparison_table.columns:
+        recent_change = comparison_table["Tăng tương đối (%)"].iloc[-1]
         if recent_change < 0:
             alerts.append(f"🔻 {kpi} đang giảm so với kỳ trước ({recent_change:.2f}%).")
 
@@ -129,8 +164,9 @@ if uploaded_file:
 
     if multi_kpi:
     # Vẽ biểu đồ nhiều KPI
+       multi_data, group_size = plot_frame(df, multi_kpi)
        fig_multi = px.line(
-        df,
+        multi_data,
         x="date",
         y=multi_kpi,
         markers=True,
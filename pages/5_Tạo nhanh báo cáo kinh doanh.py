@@ -18,6 +18,8 @@ from reportlab.pdfbase import pdfmetrics
 from datetime import datetime
 import os
 
+from modules.finance import BUSINESS_REPORT_METRICS
+
 # ---------------------------------------------------------
 # STREAMLIT CONFIG
 # ---------------------------------------------------------
@@ -54,22 +56,8 @@ if uploaded_file:
 # ---------------------------------------------------------
    st.header("1.Tính toán lợi nhuận & chỉ tiêu tài chính")
 
-   df["Total_Cost"] = (
-     df["COGS"]
-    + df["Operating_Cost"]
-    + df["Marketing_Cost"]
-    + df["Other_Cost"]
-)
-
-   df["Gross_Profit"] = df["Revenue"] - df["COGS"]
-   df["Operating_Profit"] = df["Gross_Profit"] - df["Operating_Cost"]
-   df["Net_Profit"] = df["Revenue"] - df["Total_Cost"]
-
-# Financial Ratios
-   df["Gross_Margin"] = df["Gross_Profit"] / df["Revenue"]
-   df["Operating_Margin"] = df["Operating_Profit"] / df["Revenue"]
-   df["Net_Margin"] = df["Net_Profit"] / df["Revenue"]
-   df["Cost_to_Revenue"] = df["Total_Cost"] / df["Revenue"]
+   # Total_Cost, Gross/Operating/Net_Profit, các margin, Cost_to_Revenue (modules/finance.py)
+   BUSINESS_REPORT_METRICS.evaluate(df, inplace=True)
 
    st.subheader("📄 Bảng dữ liệu sau xử lý")
 
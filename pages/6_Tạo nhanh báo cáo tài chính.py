@@ -10,6 +10,10 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 import os
 
+from modules.finance import HEALTH_LABELS, HEALTH_PILLARS, financial_statement_ratios
+from modules.rolling import ROLLING_RATIOS, rolling_ratios
+from modules.screening import filter_screening, screen_directory
+
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 )
@@ -41,32 +45,21 @@ if data_file:
     df["Date"] = pd.to_datetime(df["Date"])
 
     # =========================
-    # INCOME STATEMENT
-    # =========================
-    df["Gross_Profit"] = df["Revenue"] - df["COGS"]
-    df["Operating_Profit"] = df["Gross_Profit"] - df["Operating_Expense"]
-    df["EBT"] = df["Operating_Profit"] - df["Financial_Expense"]
-    df["Net_Profit"] = df["EBT"] - df["Tax"]
-
-    df["Gross_Margin"] = df["Gross_Profit"] / df["Revenue"]
-    df["Operating_Margin"] = df["Operating_Profit"] / df["Revenue"]
-    df["Net_Margin"] = df["Net_Profit"] / df["Revenue"]
-
-    # =========================
-    # BALANCE SHEET
+    # INCOME STATEMENT / BALANCE SHEET
     # =========================
-    df["Total_Debt"] = df.get("Short_Term_Debt", 0) + df.get("Long_Term_Debt", 0)
+    # Cột Gross_Profit ... Total_Debt, các margin và tỷ số từng kỳ (modules/finance.py)
+    period_ratios = financial_statement_ratios(df)
 
     # =========================
     # FINANCIAL RATIOS
     # =========================
     ratios = {
-        "Current Ratio": (df["Total_Assets"] / df["Short_Term_Debt"]).mean() if "Short_Term_Debt" in df else np.nan,
-        "Debt to Equity": (df["Total_Debt"] / df["Equity"]).mean() if "Equity" in df else np.nan,
-        "Debt to Asset": (df["Total_Debt"] / df["Total_Assets"]).mean(),
-        "ROA": (df["Net_Profit"] / df["Total_Assets"]).mean(),
-        "ROE": (df["Net_Profit"] / df["Equity"]).mean() if "Equity" in df else np.nan,
-        "Asset Turnover": (df["Revenue"] / df["Total_Assets"]).mean(),
+        "Current Ratio": period_ratios["Current Ratio"].mean(),
+        "Debt to Equity": period_ratios["Debt-to-Equity"].mean(),
+        "Debt to Asset": period_ratios["Debt Ratio"].mean(),
+        "ROA": period_ratios["ROA"].mean(),
+        "ROE": period_ratios["ROE"].mean(),
+        "Asset Turnover": period_ratios["Asset Turnover"].mean(),
         "Receivable Turnover": (df["Revenue"] / df["Accounts_Receivable"]).mean() if "Accounts_Receivable" in df else np.nan,
         "Inventory Turnover": (df["COGS"] / df["Inventory"]).mean() if "Inventory" in df else np.nan,
     }
@@ -121,6 +114,14 @@ if data_file:
     st.subheader("📊 Tỷ số tài chính")
     st.table(ratio_df)
 
+    st.subheader("📈 Tỷ số trượt (TTM / rolling)")
+    ttm_window = st.slider("Số kỳ trong cửa sổ trượt", 2, 24, int(min(12, max(len(df), 2))))
+    rolling_df = rolling_ratios(df, window=ttm_window)
+    if rolling_df[list(ROLLING_RATIOS)].notna().any().any():
+        st.line_chart(rolling_df.set_index("Date")[list(ROLLING_RATIOS)])
+    else:
+        st.info(f"Cần ít nhất {ttm_window} kỳ dữ liệu để tính tỷ số trượt")
+
     # =========================
     # VISUALIZATION
     # =========================
@@ -430,3 +431,54 @@ if data_file:
                 os.remove(p)
 
         os.remove(pdf_file)
+
+# =========================
+# PORTFOLIO SCREENING
+# =========================
+st.header("📁 Sàng lọc danh mục nhiều công ty")
+
+with st.expander("Sàng lọc thư mục báo cáo (CSV / Excel, cùng cấu trúc cột như trên)"):
+    screen_dir = st.text_input("Đường dẫn thư mục")
+    use_all_cpus = st.checkbox("Chạy song song trên mọi CPU", value=True)
+
+    if st.button("🔎 Sàng lọc") and screen_dir:
+        if not os.path.isdir(screen_dir):
+            st.error("Không tìm thấy thư mục")
+        else:
+            st.session_state["screening_results"] = screen_directory(
+                screen_dir, n_workers=-1 if use_all_cpus else None
+            )
+
+    screening = st.session_state.get("screening_results")
+    if screening is not None:
+        st.caption(
+            f"{len(screening)} file trong {screening.attrs['elapsed']:.1f} giây "
+            f"({screening.attrs['files_per_second']:.0f} file/giây)"
+        )
+
+        min_score_pct = st.slider("Điểm sức khỏe tối thiểu (% điểm tối đa)", 0, 100, 0, step=5)
+        min_labels = {}
+        label_cols = st.columns(len(HEALTH_PILLARS))
+        for col, (pillar, _) in zip(label_cols, HEALTH_PILLARS):
+            # Trụ cột không file nào đủ dữ liệu (vd. Liquidity khi thiếu cột Cash) -> không lọc
+            unavailable = pillar not in screening or screening[pillar].isna().all()
+            label = col.selectbox(
+                pillar, HEALTH_LABELS, key=f"screen_{pillar}", disabled=bool(unavailable),
+                help="Không có dữ liệu cho trụ cột này" if unavailable else None
+            )
+            if label != HEALTH_LABELS[0] and not unavailable:
+                min_labels[pillar] = label
+
+        filtered = filter_screening(screening, min_score_pct=min_score_pct / 100, min_labels=min_labels)
+        st.dataframe(filtered, use_container_width=True)
+
+        errors = screening[screening["Error"].notna()]
+        if len(errors):
+            st.warning(f"{len(errors)} file không đọc được")
+            st.dataframe(errors[["Company", "File", "Error"]], use_container_width=True)
+
+        st.download_button(
+            "⬇️ Tải bảng xếp hạng (CSV)",
+            filtered.to_csv(index=False).encode("utf-8"),
+            file_name="portfolio_screening.csv"
+        )
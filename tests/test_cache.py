@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from modules.cache import SimulationCache, cached
+from modules.cashflow import cash_flow_forecast
+from modules.monte_carlo import monte_carlo_profit, monte_carlo_profit_stream
+from modules.scenario import scenario_analysis
+
+
+def test_cached_dataframe_not_shared():
+    first = cash_flow_forecast(1000, 100, 0.01, 50, 0.3, months=6)
+    first["Extra"] = 1
+    first.loc[0, "Cash Balance"] = -1
+    second = cash_flow_forecast(1000, 100, 0.01, 50, 0.3, months=6)
+    assert "Extra" not in second
+    assert second.loc[0, "Cash Balance"] != -1
+
+
+def test_cached_scenarios_not_shared():
+    scenarios = {"Base": {"revenue": 100, "growth": 0.01, "fixed_cost": 50, "var_ratio": 0.3}}
+    first = scenario_analysis(1000, scenarios, months=6)
+    first["Base"].loc[:, "Cash Balance"] = 0.0
+    second = scenario_analysis(1000, scenarios, months=6)
+    assert (second["Base"]["Cash Balance"] != 0).all()
+
+
+def test_cached_array_writeable():
+    args = (1000, 10, 2, 100, 20, 50, 5)
+    first = monte_carlo_profit(*args, seed=1)
+    first.sort()
+    first[0] = np.nan
+    second = monte_carlo_profit(*args, seed=1)
+    assert second.flags.writeable
+    assert not np.isnan(second).any()
+    second.sort()
+
+
+def test_cached_stats_not_shared():
+    args = (10_000, 10, 2, 100, 20, 50, 5)
+    first = monte_carlo_profit_stream(*args, chunk_size=5_000, seed=3)
+    count = first.count
+    first.merge(monte_carlo_profit_stream(*args, chunk_size=5_000, seed=4))
+    assert monte_carlo_profit_stream(*args, chunk_size=5_000, seed=3).count == count
+
+
+def test_resolved_start_in_key():
+    store = SimulationCache()
+
+    @cached(cache=store, resolve=lambda params: {"start": today[0]} if params["start"] is None else {})
+    def forecast(start=None):
+        return pd.Timestamp(start)
+
+    today = [pd.Timestamp("2025-01-01")]
+    assert forecast() == pd.Timestamp("2025-01-01")
+    today[0] = pd.Timestamp("2025-01-02")
+    assert forecast() == pd.Timestamp("2025-01-02")
+    assert store.info()["misses"] == 2
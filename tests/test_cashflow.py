@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cashflow import cash_flow_arrays, solve_runway
+
+COLUMNS = ["Month", "Revenue", "Total Cost", "Net Cash Flow", "Cash Balance"]
+PARAMS = (100_000, 20_000, 0.03, 15_000, 0.4)
+
+
+@pytest.mark.parametrize("start", ["2025-01-15", "2025-01-31", "2024-02-29", "2025-03-01"])
+@pytest.mark.parametrize("freq", ["D", "W"])
+@pytest.mark.parametrize("payment_day", [None, 25])
+def test_resample_to_months_matches_monthly(start, freq, payment_day):
+    monthly = cash_flow_arrays(*PARAMS, months=24, start=start).to_frame()
+    forecast = cash_flow_arrays(*PARAMS, months=24, freq=freq, start=start, payment_day=payment_day)
+    resampled = forecast.resample("M").to_frame()
+
+    assert len(resampled) == 24
+    pd.testing.assert_frame_equal(resampled[COLUMNS], monthly[COLUMNS], check_exact=False, rtol=1e-9)
+    assert (resampled["Date"] == monthly["Date"]).all()
+
+
+@pytest.mark.parametrize("start", ["2025-01-15", "2025-03-01"])
+def test_daily_to_weeks_matches_weekly(start):
+    weekly = cash_flow_arrays(*PARAMS, months=12, freq="W", start=start)
+    resampled = cash_flow_arrays(*PARAMS, months=12, freq="D", start=start).resample("W")
+
+    np.testing.assert_array_equal(resampled.month, weekly.month)
+    np.testing.assert_allclose(resampled.cash_balance, weekly.cash_balance, rtol=1e-12)
+    assert (pd.DatetimeIndex(resampled.dates) == pd.DatetimeIndex(weekly.dates)).all()
+
+
+def test_resample_batch():
+    forecast = cash_flow_arrays(100_000, [20_000, 30_000], 0.02, 15_000, 0.4, months=6, freq="D", start="2025-01-15")
+    monthly = cash_flow_arrays(100_000, [20_000, 30_000], 0.02, 15_000, 0.4, months=6, start="2025-01-15")
+    np.testing.assert_allclose(forecast.resample("M").cash_balance, monthly.cash_balance)
+
+
+def _brute_force_runway(c0, r0, g, f, v, months):
+    # Cộng dồn từng tháng: số dư sau tháng m = số dư trước + R0 (1 + g)^(m - 1) (1 - v) - F
+    k = np.arange(months)
+    net = r0[:, None] * (1 + g[:, None]) ** k * (1 - v[:, None]) - f[:, None]
+    balance = c0[:, None] + np.cumsum(net, axis=1)
+    below = balance < 0
+    cash_out = np.where(below.any(axis=1), below.argmax(axis=1) + 1, np.inf)
+    return cash_out, balance
+
+
+def test_solve_runway_matches_brute_force():
+    rng = np.random.default_rng(0)
+    n, months = 20_000, 240
+    c0 = rng.uniform(-20_000, 500_000, n)
+    r0 = rng.uniform(0, 50_000, n)
+    g = rng.choice([0.0, 0.02, -0.02, 0.1, -0.1], n) * rng.uniform(0, 1, n) ** rng.integers(0, 2, n)
+    f = rng.uniform(0, 40_000, n)
+    v = rng.uniform(0, 1, n)
+
+    result = solve_runway(c0, r0, g, f, v, months=months)
+    cash_out, balance = _brute_force_runway(c0, r0, g, f, v, months)
+
+    # Bỏ các bộ có số dư sát 0 ở một tháng nào đó (sai số làm tròn quyết định dấu)
+    clear = (np.abs(balance) > 1e-6 * (np.abs(c0) + 1)[:, None]).all(axis=1)
+    assert clear.mean() > 0.99
+    np.testing.assert_array_equal(result["cash_out_month"][clear], cash_out[clear])
+    np.testing.assert_allclose(result["min_cash"], balance.min(axis=1), rtol=1e-9, atol=1e-6)
+    picked = balance[np.arange(n), result["min_cash_month"] - 1]
+    np.testing.assert_allclose(picked, balance.min(axis=1), rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("c0, r0, g, f, v, expected", [
+    # Có lãi ngay từ tháng đầu: không bao giờ hết tiền
+    (10_000, 20_000, 0.03, 5_000, 0.4, np.inf),
+    # Đã âm từ đầu (dưới mức tối thiểu) và lỗ
+    (-1_000, 20_000, 0.03, 15_000, 0.4, 1),
+    # Đã âm từ đầu nhưng lãi tháng đầu đủ bù: số dư cuối tháng 1 >= 0 (như bảng dự báo)
+    (-1_000, 20_000, 0.03, 5_000, 0.4, np.inf),
+    # Không có tiền và lỗ ngay tháng đầu
+    (0, 1_000, 0.0, 5_000, 0.4, 1),
+    # Lỗ đều: hết tiền đúng sau 10_000 / 400 = 25 tháng -> tháng 26 âm
+    (10_000, 1_000, 0.0, 1_000, 0.4, 26),
+    # Lỗ nhưng doanh thu tăng đủ nhanh để hồi phục trước khi cạn tiền
+    (100_000, 10_000, 0.2, 12_000, 0.4, np.inf)
+])
+def test_solve_runway_edge_cases(c0, r0, g, f, v, expected):
+    result = solve_runway(c0, r0, g, f, v, months=600)
+    cash_out, balance = _brute_force_runway(*(np.array([x], dtype=float) for x in (c0, r0, g, f, v)), 600)
+    assert result["cash_out_month"] == expected == cash_out[0]
+    assert result["min_cash"] == pytest.approx(balance.min(), rel=1e-9, abs=1e-6)
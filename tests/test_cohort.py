@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cohort import cohort_analysis
+
+
+def _geometric_log(churn, arpu, n_cohorts=18, seed=0):
+    """
+    Log giao dịch tổng hợp: mỗi khách mua arpu (hoặc arpu[cohort]) mỗi tháng cho tới khi rời đi,
+    xác suất rời đi mỗi tháng = churn -> LTV đúng = arpu / churn.
+    """
+    rng = np.random.default_rng(seed)
+    last_month = n_cohorts - 1
+    rows = []
+    for cohort in range(n_cohorts):
+        # Quy mô cohort khác nhau: cohort mới lớn hơn (tăng trưởng khách hàng)
+        cohort_size = 1000 + 200 * cohort
+        lifetimes = rng.geometric(churn, cohort_size)
+        months = np.minimum(lifetimes, last_month - cohort + 1)
+        customers = np.repeat(np.arange(cohort_size), months)
+        ages = np.concatenate([np.arange(m) for m in months])
+        rows.append(pd.DataFrame({
+            "customer_id": cohort * 1_000_000 + customers,
+            "month": cohort + ages,
+            "amount": arpu[cohort] if np.ndim(arpu) else arpu
+        }))
+    log = pd.concat(rows, ignore_index=True)
+    log["date"] = pd.PeriodIndex(pd.Period("2023-01", "M") + log.pop("month").to_numpy()).to_timestamp() + pd.Timedelta(days=9)
+    return log
+
+
+@pytest.mark.parametrize("churn", [0.05, 0.1, 0.2])
+def test_ltv_matches_geometric_closed_form(churn):
+    log = _geometric_log(churn, 10.0)
+    cohorts = cohort_analysis(log)
+    assert cohorts.churn() == pytest.approx(churn, rel=0.05)
+    assert cohorts.ltv() == pytest.approx(10.0 / churn, rel=0.05)
+
+
+def test_ltv_heterogeneous_cohorts():
+    # Cohort cũ chi tiêu nhiều hơn: LTV bình quân theo quy mô = bình quân gia quyền arpu / churn
+    arpu = np.linspace(20.0, 5.0, 18)
+    sizes = 1000 + 200 * np.arange(18)
+    cohorts = cohort_analysis(_geometric_log(0.1, arpu))
+    assert cohorts.ltv() == pytest.approx(np.average(arpu, weights=sizes) / 0.1, rel=0.05)
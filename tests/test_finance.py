@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.finance import (
+    HEALTH_PILLARS,
+    financial_health_assessment,
+    financial_health_assessment_frame
+)
+
+RATIO_NAMES = [name for _, checks in HEALTH_PILLARS for name, *_ in checks]
+
+
+def _assert_parity(ratios):
+    frame = financial_health_assessment_frame(ratios)
+    for i, row in enumerate(ratios.to_dict("records")):
+        assessment, score = financial_health_assessment(row)
+        assert frame["Score"].iloc[i] == score, row
+        for pillar, label in assessment.items():
+            assert frame[pillar].iloc[i] == label, (pillar, row)
+
+
+def test_health_frame_matches_scalar_random():
+    rng = np.random.default_rng(0)
+    n = 2000
+    ratios = pd.DataFrame({
+        "Gross Margin": rng.uniform(-0.2, 0.8, n),
+        "Cost-to-Revenue": rng.uniform(0.3, 1.2, n),
+        "Current Ratio": rng.uniform(0, 3, n),
+        "Cash Ratio": rng.uniform(0, 1, n),
+        "Debt-to-Equity": rng.uniform(0, 3, n),
+        "Debt Ratio": rng.uniform(0, 1, n),
+        "ROE": rng.uniform(-0.1, 0.3, n),
+        "ROA": rng.uniform(-0.05, 0.1, n)
+    })
+    _assert_parity(ratios)
+
+
+def test_health_frame_matches_scalar_on_thresholds():
+    # Mỗi tỷ số nhận đúng các ngưỡng, giá trị sát hai bên ngưỡng, inf và NaN
+    rng = np.random.default_rng(1)
+    values = {}
+    for _, checks in HEALTH_PILLARS:
+        for name, _, _, strong_at, acceptable_at in checks:
+            edges = [strong_at, acceptable_at]
+            values[name] = np.array(
+                edges + [np.nextafter(e, np.inf) for e in edges] + [np.nextafter(e, -np.inf) for e in edges]
+                + [0.0, np.inf, -np.inf, np.nan],
+                dtype=np.float64
+            )
+    n = 5000
+    ratios = pd.DataFrame({name: rng.choice(values[name], n) for name in RATIO_NAMES})
+    _assert_parity(ratios)
+
+
+@pytest.mark.parametrize("dropped", RATIO_NAMES)
+def test_health_frame_missing_column_uses_default(dropped):
+    ratios = pd.DataFrame({name: [0.3, 1.0, 2.0] for name in RATIO_NAMES}).drop(columns=dropped)
+    _assert_parity(ratios)
+
+
+def test_health_frame_skips_missing_pillar():
+    ratios = pd.DataFrame({name: [0.3, 0.3] for name in RATIO_NAMES})
+    ratios["Current Ratio"] = 2.0
+    ratios.loc[0, "Cash Ratio"] = np.nan
+    ratios.loc[1, "Cash Ratio"] = 0.6
+
+    weak = financial_health_assessment_frame(ratios)
+    skip = financial_health_assessment_frame(ratios, missing="skip")
+
+    assert weak["Liquidity"].iloc[0] == "Weak"
+    assert pd.isna(skip["Liquidity"].iloc[0])
+    assert skip["Liquidity"].iloc[1] == "Strong"
+    assert skip["Score"].iloc[0] == weak["Score"].iloc[0]
+    assert list(skip["Max Score"]) == [6, 8]
+    assert list(weak["Max Score"]) == [8, 8]
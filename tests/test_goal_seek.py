@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from modules.goal_seek import goal_seek, max_fixed_cost, required_growth
+from modules.sensitivity import evaluate_metric
+
+
+def _min_cash(growth, initial_cash, revenue, fixed_cost, var_ratio, months=24):
+    params = {
+        "initial_cash": initial_cash, "revenue": revenue, "growth": growth,
+        "fixed_cost": fixed_cost, "var_ratio": var_ratio
+    }
+    return float(evaluate_metric(params, months, "min_cash"))
+
+
+def test_required_growth_hits_floor():
+    growth = required_growth(0.0, 50_000, 10_000, 9_000, 0.4)
+    assert -0.5 < growth < 1.0
+    assert _min_cash(growth, 50_000, 10_000, 9_000, 0.4) >= 0
+    assert _min_cash(growth - 1e-4, 50_000, 10_000, 9_000, 0.4) < 0
+
+
+def test_required_growth_returns_lower_when_already_enough():
+    # Có lãi ngay cả khi doanh thu giảm 50%/tháng -> mọi mức trong khoảng đều đủ
+    assert required_growth(0.0, 100_000, 10_000, 1_000, 0.4) == -0.5
+    assert required_growth(0.0, 100_000, 10_000, 1_000, 0.4, lower=0.0) == 0.0
+
+
+def test_required_growth_nan_when_unreachable():
+    assert np.isnan(required_growth(0.0, 0, 1_000, 50_000, 0.4))
+
+
+def test_goal_seek_vectorized_mixed_cases():
+    result = goal_seek(
+        "min_cash", 0.0, "growth",
+        {"initial_cash": [100_000, 50_000, 0], "revenue": [10_000, 10_000, 1_000],
+         "fixed_cost": [1_000, 9_000, 50_000], "var_ratio": 0.4},
+        -0.5, 1.0
+    )
+    assert result[0] == -0.5
+    assert result[1] == pytest.approx(required_growth(0.0, 50_000, 10_000, 9_000, 0.4))
+    assert np.isnan(result[2])
+
+
+def test_max_fixed_cost_keeps_cash_non_negative():
+    cost = max_fixed_cost(18, 100_000, 20_000, 0.02, 0.4)
+    params = {"initial_cash": 100_000, "revenue": 20_000, "growth": 0.02, "var_ratio": 0.4}
+    assert evaluate_metric({**params, "fixed_cost": cost}, 18, "min_cash") >= 0
+    assert evaluate_metric({**params, "fixed_cost": cost * (1 + 1e-4)}, 18, "min_cash") < 0
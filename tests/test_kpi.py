@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.kpi import plot_frame, read_kpi_csv
+
+
+def _mixed_csv(tmp_path, n=20_000, switch=15_000):
+    # Ngày ISO ở phần đầu file, dd/mm/yyyy ở phần sau; một ô rác và một ô trống
+    dates = pd.date_range("2020-01-01", periods=n, freq="h")
+    values = np.where(
+        np.arange(n) < switch, dates.strftime("%Y-%m-%d %H:%M:%S"), dates.strftime("%d/%m/%Y %H:%M:%S")
+    ).astype(object)
+    values[10] = "không rõ"
+    values[20] = None
+    path = tmp_path / "kpi.csv"
+    pd.DataFrame({"date": values, "revenue": np.arange(n, dtype=float)}).to_csv(path, index=False)
+    return path, dates
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+def test_format_change_mid_file_is_redetected(tmp_path, engine):
+    path, dates = _mixed_csv(tmp_path)
+    df = read_kpi_csv(str(path), engine=engine, chunksize=4_000, block_size=1 << 16)
+
+    assert df.attrs["date_formats"] == ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S"]
+    assert df.attrs["unparsed_dates"] == 1
+    assert df["date"].isna().sum() == 2
+    parsed = df.dropna(subset=["date"]).set_index("revenue")["date"]
+    expected = pd.Series(dates, index=np.arange(len(dates), dtype=float)).drop([10.0, 20.0])
+    assert (parsed.sort_index().to_numpy() == expected.to_numpy()).all()
+
+
+def test_path_source_falls_back_to_c_engine(tmp_path):
+    # Cột số ở block đầu nhưng có chuỗi ở block sau -> pyarrow lỗi, đọc lại bằng C engine
+    rows = "".join(f"2024-01-{i % 28 + 1:02d},{i}\n" for i in range(5_000)) + "2024-02-01,abc\n"
+    path = tmp_path / "kpi.csv"
+    path.write_text("date,x\n" + rows)
+
+    for source in (str(path), path, io.BytesIO(path.read_bytes())):
+        df = read_kpi_csv(source, block_size=4096)
+        assert df.attrs["engine"] == "c"
+        assert len(df) == 5_001
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+def test_header_only_file_same_error_on_both_engines(tmp_path, engine):
+    path = tmp_path / "kpi.csv"
+    path.write_text("date,revenue\n")
+    with pytest.raises(ValueError, match="không có dòng dữ liệu"):
+        read_kpi_csv(str(path), engine=engine)
+
+    path.write_text("day,revenue\n")
+    with pytest.raises(ValueError, match="Thiếu cột"):
+        read_kpi_csv(str(path), engine=engine)
+
+
+def test_plot_frame_downsamples_large_frames():
+    df = pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=10_000, freq="h"),
+        "revenue": np.arange(10_000, dtype=float),
+        "cost": np.ones(10_000)
+    })
+    small, size = plot_frame(df.head(500), ["revenue"])
+    assert size == 1 and len(small) == 500
+
+    chart, size = plot_frame(df, ["revenue", "cost"], max_points=1_000)
+    assert size == 10 and len(chart) == 1_000
+    assert chart["date"].iloc[1] == df["date"].iloc[10]
+    assert chart["revenue"].iloc[0] == pytest.approx(4.5)
+    assert (chart["cost"] == 1).all()
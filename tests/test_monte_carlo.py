@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from modules.monte_carlo import monte_carlo_profit_auto, monte_carlo_profit_stream
+
+ARGS = (100, 10, 1_000, 200, 50_000, 40)
+
+
+def test_stream_identical_for_any_worker_count():
+    # Mỗi chunk có SeedSequence con riêng và được gộp theo thứ tự -> kết quả giống hệt từng bit
+    serial = monte_carlo_profit_stream(400_000, *ARGS, chunk_size=50_000, seed=7, n_workers=1)
+    parallel = monte_carlo_profit_stream(400_000, *ARGS, chunk_size=50_000, seed=7, n_workers=4)
+
+    assert parallel.count == serial.count == 400_000
+    assert parallel.mean == serial.mean
+    assert parallel.m2 == serial.m2
+    assert parallel.losses == serial.losses
+    assert (parallel.min, parallel.max) == (serial.min, serial.max)
+    assert np.array_equal(parallel.counts, serial.counts)
+
+
+def test_stream_depends_on_seed():
+    first = monte_carlo_profit_stream(100_000, *ARGS, chunk_size=50_000, seed=1)
+    second = monte_carlo_profit_stream(100_000, *ARGS, chunk_size=50_000, seed=2)
+    assert first.mean != second.mean
+
+
+@pytest.mark.parametrize("sampling", ["sobol", "lhs", "random"])
+def test_auto_converges_at_break_even(sampling):
+    # Nhu cầu kỳ vọng = điểm hòa vốn (như trang 1) -> lợi nhuận kỳ vọng đúng bằng 0
+    result = monte_carlo_profit_auto(100, 10, 250, 20, 10_000, 60, sampling=sampling, seed=0)
+
+    assert result["converged"]
+    assert result["n_simulations"] < 1_000_000
+    assert abs(result["mean"]) <= 3 * result["mean_ci"] + 1e-9
+    assert result["stats"].count == result["n_simulations"]
+    assert result["stats"].mean == pytest.approx(result["mean"])
+
+
+def test_auto_needs_far_fewer_draws_than_fixed_n():
+    result = monte_carlo_profit_auto(100, 10, 250, 20, 10_000, 60, sampling="sobol", seed=0)
+    # Số lần Monte Carlo thường (cố định n) cần để có cùng nửa độ rộng khoảng tin cậy
+    fixed_n = (norm.ppf(0.975) * result["stats"].std / result["mean_ci"]) ** 2
+    assert result["n_simulations"] * 10 < fixed_n
@@ -0,0 +1,179 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.business import (
+    assess_unit_economics,
+    assess_unit_economics_frame,
+    unit_economics_recommendation_codes,
+    unit_economics_recommendations
+)
+from modules.rules import load_rules
+
+# Logic cố định trước khi chuyển sang bảng quy tắc (giữ nguyên văn để so sánh)
+
+
+def _old_assessment(ue):
+    ltv_cac, payback, gross_margin, churn = ue["LTV/CAC"], ue["Payback (tháng)"], ue["Gross Margin"], ue["Churn"]
+    if ltv_cac >= 3 and payback <= 12 and gross_margin >= 0.5 and churn <= 0.08:
+        return "✅ RẤT KHẢ THI", "success"
+    elif ltv_cac >= 2 and payback <= 18 and gross_margin >= 0.3 and churn <= 0.15:
+        return "⚠ CHẤP NHẬN ĐƯỢC (Early-stage)", "warning"
+    return "❌ RỦI RO CAO", "error"
+
+
+def _old_recommendations(ue):
+    suggestions = []
+    ltv_cac, payback, churn = ue["LTV/CAC"], ue["Payback (tháng)"], ue["Churn"]
+    gross_margin, net_profit = ue["Gross Margin"], ue["Net Unit Profit"]
+    if ltv_cac < 1:
+        suggestions.append("🚨 Mô hình đang đốt tiền trên mỗi khách hàng (LTV < CAC). Cần dừng scale và tái cấu trúc ngay.")
+    elif ltv_cac < 3:
+        suggestions.append("⚠️ LTV/CAC thấp. Ưu tiên **giảm CAC** (kênh acquisition, tối ưu funnel) trước khi scale.")
+    else:
+        suggestions.append("✅ LTV/CAC tốt. Có thể xem xét **tăng ngân sách marketing để scale**.")
+    if payback > 12:
+        suggestions.append("⏳ Thời gian hoàn vốn CAC dài (>12 tháng). Rủi ro dòng tiền cao → cần cải thiện retention hoặc pricing.")
+    elif payback > 6:
+        suggestions.append("⚠️ Payback ở mức trung bình. Theo dõi chặt dòng tiền khi mở rộng.")
+    else:
+        suggestions.append("⚡ Hoàn vốn CAC nhanh → phù hợp tăng trưởng nhanh.")
+    if churn > 0.1:
+        suggestions.append("🔥 Churn cao. Cần tập trung vào **product-market fit**, onboarding và customer success.")
+    elif churn > 0.05:
+        suggestions.append("⚠️ Churn trung bình. Có thể cải thiện bằng loyalty, subscription hoặc upsell.")
+    else:
+        suggestions.append("💎 Churn thấp. Lợi thế lớn để tăng LTV dài hạn.")
+    if gross_margin < 0.4:
+        suggestions.append("📉 Biên lợi nhuận thấp. Cần tối ưu chi phí biến đổi hoặc tăng giá trị sản phẩm.")
+    elif gross_margin < 0.6:
+        suggestions.append("⚠️ Biên lợi nhuận ổn nhưng chưa mạnh. Tăng hiệu quả vận hành & tự động hóa.")
+    else:
+        suggestions.append("🏆 Biên lợi nhuận cao. Phù hợp mô hình scale bằng vốn.")
+    if net_profit < 0:
+        suggestions.append("❌ Lợi nhuận đơn vị âm. Tuyệt đối không scale cho tới khi sửa được economics.")
+    else:
+        suggestions.append("💰 Mỗi khách hàng tạo lợi nhuận ròng. Có thể mở rộng quy mô có kiểm soát.")
+    return suggestions
+
+
+def _old_pmf(v):
+    if v["emotional_fit_score"] >= 40 and v["value_fit_score"] >= 60 and v["economic_fit_score"] >= 60:
+        stage = ("Scale-ready", "🚀 STRONG PMF – Có thể scale có kiểm soát", "success")
+    elif v["value_fit_score"] >= 50 and v["emotional_fit_score"] >= 30:
+        stage = ("Optimize", "🟡 PARTIAL PMF – Cần tối ưu sản phẩm trước khi scale", "warning")
+    else:
+        stage = ("Fix", "🔴 WEAK PMF – Chưa phù hợp thị trường", "error")
+    actions = []
+    if v["retention_90d"] < 0.4:
+        actions.append("🔧 Cải thiện core value và onboarding để tăng retention")
+    if v["very_disappointed"] < 0.4:
+        actions.append("🎯 Làm rõ ICP và pain point chính của khách hàng")
+    if v["ltv_cac_ratio"] < 3:
+        actions.append("💰 Tối ưu pricing, packaging hoặc giảm CAC")
+    if v["organic_revenue_growth"] < 0.05:
+        actions.append("📣 Đẩy mạnh referral, word-of-mouth và usage loop")
+    if not actions:
+        actions.append("✅ Có thể bắt đầu scale từng kênh với ngân sách kiểm soát")
+    return stage, actions
+
+
+def _old_growth(v):
+    if v["growth_master_score"] >= 70:
+        stage = ("Scale", "🚀 Tăng trưởng hiệu quả – Có thể scale", "success")
+    elif v["growth_master_score"] >= 50:
+        stage = ("Optimize", "🟡 Tăng trưởng trung bình – Cần tối ưu", "warning")
+    else:
+        stage = ("Hold", "🔴 Tăng trưởng rủi ro – Không nên scale", "error")
+    actions = []
+    if v["organic_ratio"] < 0.5:
+        actions.append("📣 Tăng referral & organic growth")
+    if v["cac_growth_rate"] > v["revenue_growth_rate"]:
+        actions.append("💸 CAC tăng nhanh hơn doanh thu – tối ưu funnel")
+    if v["burn_rate_pressure"] > 0.6:
+        actions.append("🔥 Kiểm soát burn rate trước khi scale")
+    if not actions:
+        actions.append("✅ Chiến lược tăng trưởng ổn định")
+    return stage, actions
+
+
+def _edges(*thresholds):
+    # Đúng ngưỡng và sát hai bên ngưỡng
+    return sorted({x for t in thresholds for x in (t, np.nextafter(t, -np.inf), np.nextafter(t, np.inf))})
+
+
+UE_EDGES = {
+    "LTV/CAC": _edges(1, 2, 3) + [np.inf, np.nan],
+    "Payback (tháng)": _edges(6, 12, 18) + [np.inf, np.nan],
+    "Gross Margin": _edges(0.3, 0.4, 0.5, 0.6) + [np.nan],
+    "Churn": _edges(0.05, 0.08, 0.1, 0.15) + [np.nan],
+    "Net Unit Profit": _edges(0) + [np.nan]
+}
+
+
+def _ue_profiles(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({name: rng.choice(np.array(values, dtype=np.float64), n) for name, values in UE_EDGES.items()})
+
+
+def test_unit_economics_scalar_matches_previous_logic():
+    for ue in _ue_profiles(2000).to_dict("records"):
+        assert assess_unit_economics(ue) == _old_assessment(ue)
+        assert unit_economics_recommendations(ue) == _old_recommendations(ue)
+
+
+def test_unit_economics_batch_matches_previous_logic():
+    profiles = _ue_profiles()
+    tiers = assess_unit_economics_frame(profiles)
+    rules = load_rules("ue_recommendations")
+    codes = unit_economics_recommendation_codes(profiles)
+    for i, ue in enumerate(profiles.to_dict("records")):
+        assert tiers.iloc[i] == _old_assessment(ue)[0]
+        messages = [rules.messages(group)[codes[group].iloc[i]] for group in rules.groups]
+        assert messages == _old_recommendations(ue)
+
+
+PMF_EDGES = {
+    "value_fit_score": _edges(50, 60),
+    "emotional_fit_score": _edges(30, 40),
+    "economic_fit_score": _edges(60),
+    "retention_90d": _edges(0.4),
+    "very_disappointed": _edges(0.4),
+    "ltv_cac_ratio": _edges(3),
+    "organic_revenue_growth": _edges(0.05)
+}
+
+
+def test_pmf_rules_match_previous_logic():
+    verdict, actions = load_rules("pmf_verdict"), load_rules("pmf_actions")
+    rng = np.random.default_rng(1)
+    profiles = pd.DataFrame({name: rng.choice(values, 5000) for name, values in PMF_EDGES.items()})
+    verdict_codes, action_codes = verdict.codes(profiles), actions.codes(profiles)
+    for i, values in enumerate(profiles.to_dict("records")):
+        stage, old_actions = _old_pmf(values)
+        assert verdict.apply(values)[0] == stage
+        assert verdict_codes["PMF"].iloc[i] == stage[0]
+        assert [message for _, message, _ in actions.apply(values)] == old_actions
+        fired = [actions.messages()[code] for code in action_codes.columns if action_codes[code].iloc[i]]
+        assert fired == old_actions
+
+
+def test_growth_rules_match_previous_logic():
+    verdict, actions = load_rules("growth_verdict"), load_rules("growth_actions")
+    grid = itertools.product(
+        _edges(50, 70), _edges(0.5), [0.1, 0.2, 0.3], [0.1, 0.2, 0.3], _edges(0.6)
+    )
+    names = ("growth_master_score", "organic_ratio", "cac_growth_rate", "revenue_growth_rate", "burn_rate_pressure")
+    for combo in grid:
+        values = dict(zip(names, combo))
+        stage, old_actions = _old_growth(values)
+        assert verdict.apply(values)[0] == stage
+        assert [message for _, message, _ in actions.apply(values)] == old_actions
+
+
+def test_load_rules_is_cached():
+    assert load_rules("ue_assessment") is load_rules("ue_assessment")
+    with pytest.raises(KeyError):
+        load_rules("unknown")
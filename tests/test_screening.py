@@ -0,0 +1,66 @@
+import pandas as pd
+
+from modules.screening import RATIO_COLUMNS, SUMMARY_COLUMNS, filter_screening, screen_directory
+
+STATEMENT = {
+    "Date": ["2024-01-01", "2024-02-01"],
+    "Revenue": [200.0, 220.0],
+    "COGS": [100.0, 110.0],
+    "Operating_Expense": [40.0, 40.0],
+    "Financial_Expense": [2.0, 2.0],
+    "Tax": [5.0, 6.0],
+    "Short_Term_Debt": [40.0, 40.0],
+    "Long_Term_Debt": [20.0, 20.0],
+    "Total_Assets": [400.0, 420.0],
+    "Equity": [250.0, 260.0]
+}
+
+
+def _assert_full_schema(results):
+    for column in ("Rank", "Score", "Max Score", "Score %", "Liquidity", *SUMMARY_COLUMNS, *RATIO_COLUMNS):
+        assert column in results
+    assert results["Rank"].dtype == "Int64"
+
+
+def test_empty_directory(tmp_path):
+    results = screen_directory(tmp_path)
+    assert results.empty
+    _assert_full_schema(results)
+    assert filter_screening(results, min_score_pct=0.5).empty
+
+
+def test_all_files_invalid(tmp_path):
+    (tmp_path / "a.csv").write_text("x,y\n1,2\n")
+    (tmp_path / "b.csv").write_text("Date,Revenue\nnot a date,1\n")
+    results = screen_directory(tmp_path)
+
+    _assert_full_schema(results)
+    assert len(results) == 2
+    assert results["Error"].notna().all()
+    assert results["Rank"].isna().all()
+    assert filter_screening(results).empty
+    assert len(filter_screening(results, include_errors=True)) == 2
+
+
+def test_rank_stays_integer_with_error_rows(tmp_path):
+    pd.DataFrame(STATEMENT).to_csv(tmp_path / "ok.csv", index=False)
+    (tmp_path / "bad.csv").write_text("x,y\n1,2\n")
+    results = screen_directory(tmp_path)
+
+    _assert_full_schema(results)
+    assert results["Rank"].tolist()[0] == 1
+    assert results["Rank"].isna().tolist() == [False, True]
+
+
+def test_score_filter_uses_score_share(tmp_path):
+    # Không có cột Cash -> Liquidity bị bỏ qua: điểm thô thấp hơn nhưng Score % vẫn cao
+    pd.DataFrame({**STATEMENT, "Cash": [150.0, 160.0]}).to_csv(tmp_path / "with_cash.csv", index=False)
+    pd.DataFrame(STATEMENT).to_csv(tmp_path / "no_cash.csv", index=False)
+    results = screen_directory(tmp_path).set_index("Company")
+
+    assert pd.isna(results.loc["no_cash", "Liquidity"])
+    assert results.loc["no_cash", "Max Score"] < results.loc["with_cash", "Max Score"]
+
+    threshold = results.loc["no_cash", "Score %"]
+    kept = filter_screening(results.reset_index(), min_score_pct=threshold)
+    assert "no_cash" in set(kept["Company"])
@@ -0,0 +1,18 @@
+import numpy as np
+
+from modules.monte_carlo import monte_carlo_profit_stream, profit_chunks
+from modules.storage import monte_carlo_profit_to_disk, open_simulation
+
+ARGS = (100, 10, 1_000, 200, 50_000, 40)
+
+
+def test_disk_run_matches_stream(tmp_path):
+    path = tmp_path / "run.npy"
+    saved = monte_carlo_profit_to_disk(path, 250_000, *ARGS, chunk_size=60_000, seed=3)
+    streamed = monte_carlo_profit_stream(250_000, *ARGS, chunk_size=60_000, seed=3)
+
+    assert (saved.count, saved.mean, saved.m2) == (streamed.count, streamed.mean, streamed.m2)
+    assert np.array_equal(saved.counts, streamed.counts)
+
+    values = np.concatenate(list(profit_chunks(250_000, *ARGS, chunk_size=60_000, seed=3)))
+    assert np.array_equal(open_simulation(path), values)